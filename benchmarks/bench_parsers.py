@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+"""
+Micro-benchmark of the lxml and BeautifulSoup parser backends.
+
+Parses each of the saved sample pages in tests/ with both backends and
+prints the best per-parse time of each.
+
+    python -m benchmarks.bench_parsers
+"""
+import datetime
+import os
+import timeit
+
+from nhl_scraper import cbssports, espn, rotowire
+
+SAMPLES = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..",
+                       "tests")
+
+
+def sample_file(fn):
+    return os.path.join(SAMPLES, fn)
+
+
+def rotowire_parse(backend):
+    with open(sample_file("sample.rotowire.starting-goalies.html")) as f:
+        html = f.read()
+    today = datetime.date(2018, 1, 14)
+    return lambda: rotowire.Parser(html, backend).parse(today)
+
+
+CASES = [
+    ("espn skaters", lambda backend: lambda: espn.Parser(
+        sample_file("sample.espn.skaters.html"), backend).parse(0)),
+    ("espn goalies", lambda backend: lambda: espn.Parser(
+        sample_file("sample.espn.goalies.html"), backend).parse(0)),
+    ("cbssports forwards", lambda backend: lambda: cbssports.Parser(
+        sample_file("sample.cbssports.forwards.html"), backend).parse(0)),
+    ("cbssports goalies", lambda backend: lambda: cbssports.Parser(
+        sample_file("sample.cbssports.goalies.html"), backend).parse(0)),
+    ("rotowire goalies", rotowire_parse),
+]
+
+
+def main(number=20, repeat=5):
+    print("{:<20} {:>10} {:>10} {:>8}".format("page", "lxml ms", "bs4 ms",
+                                              "speedup"))
+    for name, case in CASES:
+        best = {}
+        for backend in ("lxml", "bs4"):
+            times = timeit.repeat(case(backend), number=number,
+                                  repeat=repeat)
+            best[backend] = min(times) / number * 1000
+        print("{:<20} {:>10.2f} {:>10.2f} {:>7.1f}x".format(
+            name, best["lxml"], best["bs4"], best["bs4"] / best["lxml"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+
+"""
+Benchmark of the per-call cost of parsing NHL schedule responses.
+
+Runs the Scraper's direct extractors over the sample schedules in tests/
+and over a synthetic full-season schedule (with linescores expanded).  If
+objectpath is installed, the recursive-descent queries the extractors
+replaced are timed too for comparison.
+
+    python -m benchmarks.bench_schedule
+"""
+import copy
+import datetime
+import json
+import os
+import timeit
+
+from nhl_scraper import nhl
+
+SAMPLES = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..",
+                       "tests")
+
+try:
+    import objectpath
+except ImportError:
+    objectpath = None
+
+
+def load_sample(fn):
+    with open(os.path.join(SAMPLES, fn), "r") as f:
+        return json.load(f)
+
+
+def season_schedule(days=186):
+    """Build a season's schedule by repeating the sample games
+
+    Each game gets a linescore like the ones returned with
+    expand=schedule.linescore.
+    """
+    samples = [load_sample("sample.nhl.schedule.2018011{}.json".format(d))
+               for d in (4, 6)]
+    games = [g for s in samples for d in s["dates"] for g in d["games"]]
+    linescore = {"currentPeriod": 3, "currentPeriodOrdinal": "3rd",
+                 "currentPeriodTimeRemaining": "Final",
+                 "periods": [{"periodType": "REGULAR", "num": n,
+                              "ordinalNum": "{}".format(n),
+                              "home": {"goals": 1, "shotsOnGoal": 10,
+                                       "rinkSide": "left"},
+                              "away": {"goals": 0, "shotsOnGoal": 9,
+                                       "rinkSide": "right"}}
+                             for n in (1, 2, 3)],
+                 "shootoutInfo": {"away": {"scores": 0, "attempts": 0},
+                                  "home": {"scores": 0, "attempts": 0}},
+                 "teams": {"home": {"goals": 3, "shotsOnGoal": 30},
+                           "away": {"goals": 0, "shotsOnGoal": 27}},
+                 "powerPlayStrength": "Even", "hasShootout": False}
+    dates = []
+    day = datetime.date(2017, 10, 4)
+    for n in range(days):
+        day_games = []
+        for g in games[:(n % len(games)) + 1]:
+            game = copy.deepcopy(g)
+            game["gamePk"] = 2017020000 + len(dates) * 20 + len(day_games)
+            game["linescore"] = linescore
+            day_games.append(game)
+        dates.append({"date": (day + datetime.timedelta(days=n)).isoformat(),
+                      "games": day_games})
+    return {"dates": dates}
+
+
+def objectpath_cases(teams, schedule):
+    def teams_query():
+        return list(objectpath.Tree(teams).execute(
+            "$..teams.(id,teamName,locationName,abbreviation)"))
+
+    def game_pks():
+        return list(objectpath.Tree(schedule).execute(
+            "$..dates..games.gamePk"))
+
+    def linescores():
+        return list(objectpath.Tree(schedule).execute("$..dates..games"))
+    return [("teams", teams_query), ("games", game_pks),
+            ("linescores", linescores)]
+
+
+def direct_cases(teams, schedule):
+    s = nhl.Scraper()
+
+    def linescores():
+        return [game for _, game in nhl._iter_games(schedule)]
+
+    def teams_playing():
+        s.schedule_cache = {}
+        s._cache_schedule(datetime.date(2017, 10, 4),
+                          datetime.date(2018, 4, 7), schedule)
+    return [("teams", lambda: s._parse_teams(teams)),
+            ("games", lambda: s._parse_games(schedule)),
+            ("linescores", linescores),
+            ("teams playing", teams_playing)]
+
+
+def best_ms(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    teams = load_sample("sample.nhl.teams.json")
+    payloads = [("sample day", load_sample(
+        "sample.nhl.schedule.20180116.json"), 200),
+        ("full season", season_schedule(), 5)]
+    print("{:<12} {:<14} {:>10} {:>12}".format(
+        "payload", "query", "direct ms", "objectpath ms"))
+    for name, schedule, number in payloads:
+        legacy = dict(objectpath_cases(teams, schedule)) if objectpath \
+            else {}
+        for query, fn in direct_cases(teams, schedule):
+            op = "{:.3f}".format(best_ms(legacy[query], number)) \
+                if query in legacy else "-"
+            print("{:<12} {:<14} {:>10.3f} {:>12}".format(
+                name, query, best_ms(fn, number), op))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/python
+
+"""
+Offline benchmark suite of the scrapers, for catching regressions.
+
+The NHL workloads run against a ReplayAdapter.  A synthetic full season
+(see bench_schedule.season_schedule) is recorded into a temporary directory
+once per session and every benchmark replays it, so nothing goes over the
+network.  Besides the timings collected by pytest-benchmark, each benchmark
+records in extra_info the number of endpoint requests one run issues and
+its peak memory as measured by tracemalloc.
+
+    python -m pytest benchmarks/bench_suite.py
+    python -m pytest benchmarks/bench_suite.py --benchmark-autosave
+    python -m pytest benchmarks/bench_suite.py --benchmark-compare
+"""
+import datetime
+import itertools
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_schedule import load_sample, season_schedule
+from nhl_scraper import cbssports, espn, nhl, rotowire
+from nhl_scraper.fantasy import FantasyProjector, weekly_windows
+from nhl_scraper.form import PlayerForm
+from nhl_scraper.replay import ReplayAdapter
+
+pytest.importorskip("pytest_benchmark")
+
+SAMPLES = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..",
+                       "tests")
+SEASON_START = datetime.date(2017, 10, 4)
+SEASON_END = datetime.date(2018, 4, 7)
+BOX_SCORE_GAMES = 50
+
+
+class SeasonEndpointAdapter:
+    """Serves the synthetic season, to be recorded by a ReplayAdapter"""
+    def __init__(self):
+        self.season = season_schedule()
+        self.teams = load_sample("sample.nhl.teams.json")
+        self.players = load_sample("sample.nhl.players.json")
+        self.boxscore = load_sample("sample.nhl.boxscore.2017020681.json")
+
+    def teams_endpoint(self):
+        return self.teams
+
+    def schedule_endpoint(self, startDate, endDate, **params):
+        return {"dates": [d for d in self.season["dates"]
+                          if startDate <= d["date"] <= endDate]}
+
+    def players_endpoint(self, team_ids):
+        return self.players
+
+    def boxscore_endpoint(self, game_id):
+        return self.boxscore
+
+
+def measure(benchmark, fn, adapter=None):
+    """Benchmark fn, recording its requests and peak memory
+
+    :param fn: Workload, which must start from a cold scraper each call
+    :param adapter: ReplayAdapter the workload's requests go through
+    """
+    if adapter is not None:
+        adapter.reset_counts()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_memory_kb"] = peak // 1024
+    if adapter is not None:
+        benchmark.extra_info["requests"] = adapter.calls
+    return benchmark(fn)
+
+
+def scraper(adapter):
+    sc = nhl.Scraper()
+    sc.set_endpoint_adapter(adapter)
+    return sc
+
+
+def test_teams(benchmark, replay):
+    df = measure(benchmark, lambda: scraper(replay).teams(), replay)
+    assert(len(df.index) > 0)
+
+
+def test_games_count_season(benchmark, replay):
+    counts = measure(benchmark, lambda: scraper(replay).games_count(
+        SEASON_START, SEASON_END), replay)
+    assert(benchmark.extra_info["requests"] == 2)
+    assert(len(counts) > 0)
+
+
+def test_players(benchmark, replay):
+    df = measure(benchmark, lambda: scraper(replay).players(), replay)
+    assert(len(df.index) > 0)
+
+
+def test_box_scores_batch(benchmark, replay, game_ids):
+    df = measure(benchmark, lambda: scraper(replay).box_scores_batch(
+        game_ids=game_ids), replay)
+    assert(df.gamePk.nunique() == BOX_SCORE_GAMES)
+
+
+def test_box_score_tables(benchmark, replay, game_ids):
+    skaters, _ = measure(benchmark, lambda: scraper(replay).box_score_tables(
+        game_ids=game_ids), replay)
+    assert(skaters.gamePk.nunique() == BOX_SCORE_GAMES)
+
+
+def test_fantasy_points_season(benchmark, replay):
+    sc = scraper(replay)
+    teams = sc.teams()
+    index = sc.schedule_index(SEASON_START, SEASON_END)
+    windows = weekly_windows(SEASON_START, SEASON_END)
+    projections = synthetic_projections(teams, 900)
+
+    def project():
+        fp = FantasyProjector({"G": 3, "A": 2, "SOG": 0.5, "HIT": 0.25},
+                              teams, index)
+        fp.add_source("espn", projections, weight=0.6)
+        fp.add_source("espn", projections, weight=0.4)
+        return fp.points(windows)
+    points = measure(benchmark, project)
+    assert(points.shape == (900, 3 + len(windows)))
+
+
+def synthetic_projections(teams, num_players):
+    abbrevs = teams.abbrev.tolist()
+    df = {"Name": ["Player {}".format(i) for i in range(num_players)],
+          "Tm": [abbrevs[i % len(abbrevs)] for i in range(num_players)]}
+    for i, stat in enumerate(espn.SKATER_COLUMNS):
+        df[stat] = [(i + j) % 60 for j in range(num_players)]
+    return pd.DataFrame(df)
+
+
+def test_player_form_game_night(benchmark):
+    form = PlayerForm()
+    form.add(*synthetic_game_night(range(82)))
+    night_skaters, night_goalies = synthetic_game_night([82])
+    nights = itertools.count(1)
+
+    def game_night():
+        # The same night of games, moved a day later each time
+        n = next(nights)
+        form.add(*[df.assign(gamePk=df.gamePk + n * 16,
+                             date=df.date + pd.Timedelta(days=n))
+                   for df in (night_skaters, night_goalies)])
+        return form.skaters(), form.goalies()
+    skaters, goalies = measure(benchmark, game_night)
+    assert(len(skaters.index) == 32 * 18)
+    assert(len(goalies.index) == 32)
+
+
+def synthetic_game_night(nights, num_teams=32, roster=18):
+    """Skater and goalie tables of every team playing on each night"""
+    skaters, goalies = [], []
+    for night in nights:
+        date = pd.Timestamp(SEASON_START) + pd.Timedelta(days=night)
+        for team in range(num_teams):
+            key = {"gamePk": 2017020000 + night * num_teams // 2 + team // 2,
+                   "date": date, "team_id": team, "position": "C"}
+            for k in range(roster):
+                skaters.append(dict(key, id=team * 100 + k, name="",
+                                    goals=(night + k) % 3, assists=k % 2,
+                                    shots=k % 5, hits=night % 4,
+                                    toi=900 + k * 10))
+            goalies.append(dict(key, id=team * 100 + 99, name="",
+                                position="G", shots=30, saves=27 + night % 4,
+                                ga=3 - night % 4, toi=3600))
+    return pd.DataFrame(skaters), pd.DataFrame(goalies)
+
+
+@pytest.mark.parametrize("fn", ["sample.espn.skaters.html",
+                                "sample.espn.goalies.html"])
+def test_espn_parser(benchmark, fn):
+    html = read_sample(fn)
+    measure(benchmark, lambda: espn.Parser(html=html).parse(0))
+
+
+@pytest.mark.parametrize("fn", ["sample.cbssports.forwards.html",
+                                "sample.cbssports.goalies.html"])
+def test_cbssports_parser(benchmark, fn):
+    html = read_sample(fn)
+    measure(benchmark, lambda: cbssports.Parser(html=html).parse(0))
+
+
+def test_rotowire_parser(benchmark):
+    html = read_sample("sample.rotowire.starting-goalies.html").decode()
+    today = datetime.date(2018, 1, 14)
+    measure(benchmark, lambda: rotowire.Parser(html).parse(today))
+
+
+@pytest.mark.parametrize("module", ["nhl_scraper.nhl", "nhl_scraper.espn"])
+def test_cold_import(benchmark, module):
+    """Time a new interpreter importing the module, as a worker would"""
+    benchmark.pedantic(subprocess.run, args=(
+        [sys.executable, "-c", "import {}".format(module)],),
+        kwargs={"cwd": os.path.join(SAMPLES, ".."), "check": True},
+        rounds=5)
+
+
+def read_sample(fn):
+    with open(os.path.join(SAMPLES, fn), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="session")
+def recordings(tmp_path_factory):
+    """Record every workload once against the synthetic season"""
+    root = str(tmp_path_factory.mktemp("recordings"))
+    recorder = ReplayAdapter(root, adapter=SeasonEndpointAdapter())
+    sc = scraper(recorder)
+    sc.teams()
+    sc.players()
+    sc.games_count(SEASON_START, SEASON_END)
+    sc.box_scores_batch(game_ids=season_game_ids())
+    return root
+
+
+@pytest.fixture
+def replay(recordings):
+    return ReplayAdapter(recordings)
+
+
+@pytest.fixture
+def game_ids():
+    return season_game_ids()
+
+
+def season_game_ids():
+    return [g["gamePk"] for d in season_schedule(10)["dates"]
+            for g in d["games"]][:BOX_SCORE_GAMES]
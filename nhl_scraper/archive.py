@@ -0,0 +1,108 @@
+#!/usr/bin/python
+
+"""
+A content-addressed archive of raw scraped pages.
+
+Pages are stored gzip compressed under the SHA-256 of their contents, so the
+same page captured twice is only stored once and concurrent scrapes never
+overwrite each other's files.  An append-only index records the name and
+capture time of every page put in the archive, so the latest capture of a
+page can be found again by name.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class HtmlArchive:
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, root, clock=time.time):
+        """
+        :param root: Directory to keep the archive in.  It is created if it
+            doesn't exist.
+        :type root: str
+        :param clock: Function returning the current time in seconds
+        """
+        self.root = root
+        self.clock = clock
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        """File name a page with the given digest is stored under"""
+        return os.path.join(self.root, digest[:2], digest[2:] + ".html.gz")
+
+    def put(self, html, name=None):
+        """Store a page
+
+        :param html: Page source
+        :type html: str or bytes
+        :param name: Name to record the page under in the index
+        :type name: str
+        :return: SHA-256 hex digest of the page, its key in the archive
+        :rtype: str
+        """
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        digest = hashlib.sha256(html).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a
+            # partially written page
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(html))
+            os.replace(tmp, path)
+        if name is not None:
+            line = json.dumps({"name": name, "digest": digest,
+                               "time": self.clock()})
+            with self.lock, open(os.path.join(self.root, self.INDEX_FILE),
+                                 "a") as f:
+                f.write(line + "\n")
+        return digest
+
+    def get(self, digest):
+        """Return the page stored under a digest
+
+        :rtype: bytes
+        :raises: KeyError if the page isn't in the archive
+        """
+        try:
+            with open(self.path(digest), "rb") as f:
+                return gzip.decompress(f.read())
+        except FileNotFoundError:
+            raise KeyError(digest)
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def index(self):
+        """Return every entry in the index, oldest first
+
+        :return: Dicts with the name, digest and time of each capture
+        :rtype: list(dict)
+        """
+        try:
+            with open(os.path.join(self.root, self.INDEX_FILE)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def latest(self, name):
+        """Return the most recent capture of a page
+
+        :param name: Name the page was put in the archive with
+        :type name: str
+        :rtype: bytes
+        :raises: KeyError if no page was recorded under the name
+        """
+        for entry in reversed(self.index()):
+            if entry["name"] == name:
+                return self.get(entry["digest"])
+        raise KeyError(name)
@@ -0,0 +1,316 @@
+#!/usr/bin/python
+
+"""
+Backfill of the boxscores of whole seasons into a storage.Store.
+
+Each season's schedule is read with one request and its final games are
+split into shards of consecutive days.  The shards are fetched by a pool of
+worker processes, each with its own scraper, and all of the processes share
+one rate limit.  The parent process writes each shard to the store as soon
+as it comes back and then records its games in a checkpoint file, so a run
+that is killed picks up where it left off without fetching those games
+again.
+
+Workers get their endpoint adapter from make_adapter, which can point them
+at another base URL (e.g. a local server replaying recorded responses) or
+at a directory of ReplayAdapter recordings.
+
+    nhl-scraper backfill --seasons 2010-2020 --store data/
+"""
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from nhl_scraper import nhl
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "_backfill.jsonl"
+
+
+def parse_seasons(text):
+    """Parse the seasons to backfill
+
+    A season is given by the year it starts in, or in full.  Ranges are
+    inclusive.
+
+    >>> parse_seasons("2016-2018,20202021")
+    [20162017, 20172018, 20182019, 20202021]
+
+    :param text: Comma separated seasons and ranges of seasons
+    :type text: str
+    :rtype: list(int)
+    """
+    seasons = []
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        first = _start_year(first)
+        last = _start_year(last) if last else first
+        if last < first:
+            raise ValueError("Backwards range of seasons: {}".format(part))
+        seasons.extend(year * 10000 + year + 1
+                       for year in range(first, last + 1))
+    return sorted(set(seasons))
+
+
+def _start_year(season):
+    season = season.strip()
+    if len(season) == 8:
+        return int(season[:4])
+    return int(season)
+
+
+class SharedRateLimiter:
+    def __init__(self, rate, slot=None, lock=None, clock=time.time,
+                 sleep=time.sleep):
+        """Limit the requests sent by all of the worker processes together
+
+        Same interface as session.RateLimiter, but the next free slot is kept
+        in shared memory so that it can be handed to worker processes.  The
+        limit applies to all hosts together.
+
+        :param rate: Maximum number of requests per second.  None disables
+            the limit.
+        :type rate: float
+        :param slot: Shared double to keep the next free slot in.  Defaults
+            to a new one.
+        :param lock: Lock guarding slot.  Defaults to a new one.
+        """
+        self.rate = rate
+        self.slot = slot if slot is not None else \
+            multiprocessing.Value("d", 0.0, lock=False)
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        self.clock = clock
+        self.sleep = sleep
+
+    def wait(self, host=None):
+        """Block until a request is allowed"""
+        delay = self.reserve(host)
+        if delay > 0:
+            self.sleep(delay)
+
+    def reserve(self, host=None):
+        """Take the next free slot and return the seconds to wait for it"""
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = self.clock()
+            slot = max(now, self.slot.value)
+            self.slot.value = slot + 1.0 / self.rate
+        return slot - now
+
+
+class Checkpoint:
+    def __init__(self, path):
+        """Record of the games that are already stored
+
+        Each finished shard is appended as one line of JSON, so a partly
+        written last line (from a run that was killed) is all that can be
+        lost, and it is ignored.
+
+        :param path: File to keep the checkpoint in
+        :type path: str
+        """
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        self.done.update(json.loads(line)["games"])
+                    except ValueError:
+                        logger.warning("Ignoring a partial line in %s", path)
+
+    def mark(self, shard, game_ids):
+        """Record that a shard's games are stored
+
+        :param shard: Name of the shard
+        :type shard: str
+        :param game_ids: gamePk of each game in the shard
+        :type game_ids: list(int)
+        """
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"shard": shard,
+                                "games": sorted(game_ids)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(game_ids)
+
+
+def make_adapter(base_url=None, replay=None, limiter=None):
+    """Create the endpoint adapter of a worker
+
+    :param base_url: URL of the NHL API to use instead of the public one
+    :type base_url: str
+    :param replay: Directory of ReplayAdapter recordings.  Calls that were
+        recorded are answered from it.  The others fail, unless base_url is
+        also given, in which case they are sent there and recorded.
+    :type replay: str
+    :param limiter: Rate limiter for the live requests
+    :type limiter: SharedRateLimiter
+    """
+    adapter = None
+    if replay is None or base_url is not None:
+        from nhl_scraper.session import Session
+        session = Session()
+        if limiter is not None:
+            session.limiter = limiter
+        adapter = nhl.EndpointAdapter(session=session)
+        if base_url is not None:
+            adapter.NHL_URL = base_url.rstrip("/")
+    if replay is not None:
+        from nhl_scraper.replay import ReplayAdapter
+        adapter = ReplayAdapter(replay, adapter=adapter)
+    return adapter
+
+
+def shards(season, games, shard_days=7):
+    """Split a season's games into runs of consecutive days
+
+    :param season: Season the games are in
+    :type season: int
+    :param games: (gamePk, date) of each game, in date order
+    :type games: list(tuple)
+    :param shard_days: Number of days in each shard
+    :type shard_days: int
+    :return: (name, games) of each shard
+    :rtype: list(tuple)
+    """
+    by_shard = {}
+    for game_id, day in games:
+        by_shard.setdefault(_shard_start(day, shard_days), []).append(
+            (game_id, day))
+    return [("{}.{}".format(season, start.isoformat()), shard_games)
+            for start, shard_games in sorted(by_shard.items())]
+
+
+def _shard_start(day, shard_days):
+    return day - datetime.timedelta(days=day.toordinal() % shard_days)
+
+
+def season_games(scraper, season):
+    """Return the final games of a season
+
+    :rtype: list(tuple)
+    :return: (gamePk, date) of each game that has finished
+    """
+    r = scraper.ea.schedule_endpoint(season=str(season))
+    return [(game["gamePk"], day) for day, game in nhl._iter_games(r)
+            if game["status"]["abstractGameState"] == "Final"]
+
+
+# The scraper of a worker process and the number of boxscores it fetches at
+# once, set by _init_worker
+_worker_scraper = None
+_worker_threads = 1
+
+
+def _init_worker(adapter_kwargs, threads):
+    global _worker_scraper, _worker_threads
+    _worker_scraper = nhl.Scraper()
+    _worker_scraper.set_endpoint_adapter(make_adapter(**adapter_kwargs))
+    _worker_threads = threads
+
+
+def _fetch_shard(name, games):
+    """Fetch the boxscores of one shard in a worker"""
+    _worker_scraper.game_dates.update(games)
+    skaters, goalies = _worker_scraper.box_score_tables(
+        game_ids=[game_id for game_id, _ in games],
+        max_workers=_worker_threads)
+    return name, [game_id for game_id, _ in games], skaters, goalies
+
+
+class Backfill:
+    def __init__(self, store, processes=4, threads=4, rate=None,
+                 shard_days=7, base_url=None, replay=None):
+        """
+        :param store: Store to write the skaters and goalies datasets to.
+            The checkpoint is kept in its root directory.
+        :type store: nhl_scraper.storage.Store
+        :param processes: Number of worker processes.  0 fetches in this
+            process, which is handy for debugging.
+        :type processes: int
+        :param threads: Number of boxscores each worker fetches at once
+        :type threads: int
+        :param rate: Maximum number of requests per second, over all of the
+            workers
+        :type rate: float
+        :param shard_days: Number of days of games in each shard
+        :type shard_days: int
+        :param base_url: URL of the NHL API to use instead of the public one
+        :type base_url: str
+        :param replay: Directory of ReplayAdapter recordings to use
+        :type replay: str
+        """
+        self.store = store
+        self.processes = processes
+        self.threads = threads
+        self.shard_days = shard_days
+        self.limiter = SharedRateLimiter(rate)
+        self.adapter_kwargs = {"base_url": base_url, "replay": replay,
+                               "limiter": self.limiter}
+        self.checkpoint = Checkpoint(os.path.join(store.root,
+                                                  CHECKPOINT_FILE))
+        self.scraper = nhl.Scraper()
+        self.scraper.set_endpoint_adapter(make_adapter(**self.adapter_kwargs))
+
+    def pending(self, seasons):
+        """Return the shards with games that aren't in the checkpoint
+
+        :param seasons: Seasons to backfill, e.g. [20172018]
+        :type seasons: list(int)
+        :rtype: list(tuple)
+        """
+        pending = []
+        for season in seasons:
+            games = [(game_id, day) for game_id, day in
+                     season_games(self.scraper, season)
+                     if game_id not in self.checkpoint.done]
+            pending.extend(shards(season, games, self.shard_days))
+        return pending
+
+    def run(self, seasons):
+        """Backfill the seasons
+
+        :param seasons: Seasons to backfill, e.g. [20172018]
+        :type seasons: list(int)
+        :return: Number of games stored by this run
+        :rtype: int
+        """
+        from nhl_scraper.storage import append_box_scores
+        pending = self.pending(seasons)
+        logger.info("%d shards with %d games to fetch", len(pending),
+                    sum(len(games) for _, games in pending))
+        stored = 0
+        for name, game_ids, skaters, goalies in self._fetch(pending):
+            append_box_scores(self.store, skaters, goalies)
+            self.checkpoint.mark(name, game_ids)
+            stored += len(game_ids)
+            logger.info("Stored shard %s of %d games", name, len(game_ids))
+        return stored
+
+    def _fetch(self, pending):
+        """Yield each shard's boxscores as they arrive"""
+        if self.processes == 0:
+            _init_worker(self.adapter_kwargs, self.threads)
+            for name, games in pending:
+                yield _fetch_shard(name, games)
+            return
+        with ProcessPoolExecutor(max_workers=self.processes,
+                                 initializer=_init_worker,
+                                 initargs=(self.adapter_kwargs,
+                                           self.threads)) as executor:
+            futures = [executor.submit(_fetch_shard, name, games)
+                       for name, games in pending]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # Don't wait for the rest of the shards after a failure
+                for future in futures:
+                    future.cancel()
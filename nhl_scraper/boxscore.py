@@ -0,0 +1,176 @@
+#!/usr/bin/python
+
+"""
+Normalization of NHL boxscore JSON documents into columnar tables.
+
+Many boxscores are flattened in a single pass into one list per column,
+and the skater and goalie tables are only built as DataFrames at the end.
+Times on ice are converted to integer seconds, shutouts are derived from
+the goalie stats, counts use the nullable Int64 dtype and repeated strings
+(names, positions, decisions) are categorical.  pandas is only loaded when
+the tables are built.
+"""
+
+KEY_COLUMNS = ["gamePk", "date", "team_id", "id", "name", "position"]
+
+# (column, key in the boxscore's skaterStats)
+SKATER_STATS = [("goals", "goals"),
+                ("assists", "assists"),
+                ("shots", "shots"),
+                ("hits", "hits"),
+                ("pim", "penaltyMinutes"),
+                ("ppg", "powerPlayGoals"),
+                ("ppa", "powerPlayAssists"),
+                ("shg", "shortHandedGoals"),
+                ("sha", "shortHandedAssists"),
+                ("fw", "faceOffWins"),
+                ("fo", "faceoffTaken"),
+                ("blk", "blocked"),
+                ("tk", "takeaways"),
+                ("gv", "giveaways"),
+                ("+/-", "plusMinus")]
+SKATER_TOI = [("toi", "timeOnIce"),
+              ("even_toi", "evenTimeOnIce"),
+              ("pp_toi", "powerPlayTimeOnIce"),
+              ("sh_toi", "shortHandedTimeOnIce")]
+
+# (column, key in the boxscore's goalieStats)
+GOALIE_STATS = [("goals", "goals"),
+                ("assists", "assists"),
+                ("pim", "pim"),
+                ("shots", "shots"),
+                ("saves", "saves"),
+                ("pp_saves", "powerPlaySaves"),
+                ("sh_saves", "shortHandedSaves"),
+                ("even_saves", "evenSaves")]
+GOALIE_TOI = [("toi", "timeOnIce")]
+
+CATEGORY_COLUMNS = ["name", "position", "decision"]
+
+
+def toi_seconds(toi):
+    """Convert a "MM:SS" time on ice into seconds
+
+    :param toi: Time on ice as reported in the boxscore
+    :type toi: str
+    :return: Number of seconds, or None if the time is missing
+    :rtype: int
+    """
+    if not toi:
+        return None
+    minutes, _, seconds = toi.partition(":")
+    return int(minutes) * 60 + int(seconds or 0)
+
+
+def goalie_result(stats):
+    """Derive goals against, the decision and a shutout from goalie stats
+
+    :param stats: A goalie's goalieStats from the boxscore
+    :type stats: dict
+    :return: Goals against (None if unknown), decision (None if the goalie
+        didn't get one) and 1 for a shutout win, else 0
+    :rtype: tuple(int, str, int)
+    """
+    shots, saves = stats.get("shots"), stats.get("saves")
+    ga = None if shots is None or saves is None else shots - saves
+    decision = stats.get("decision") or None
+    return ga, decision, int(decision == "W" and ga == 0)
+
+
+class Normalizer:
+    def __init__(self):
+        self.skater_columns = {col: [] for col in
+                               KEY_COLUMNS +
+                               [c for c, _ in SKATER_STATS + SKATER_TOI]}
+        self.goalie_columns = {col: [] for col in
+                               KEY_COLUMNS +
+                               [c for c, _ in GOALIE_STATS + GOALIE_TOI] +
+                               ["ga", "decision", "so"]}
+
+    def add(self, doc, gamePk=None, date=None):
+        """Flatten the players of one boxscore into the column lists
+
+        Scratched players, who have no stats, are skipped.
+
+        :param doc: Boxscore JSON document
+        :param gamePk: ID of the game the boxscore is for
+        :type gamePk: int
+        :param date: Date the game was played on
+        :type date: datetime.date
+        :return: self, so calls can be chained
+        """
+        sk = self.skater_columns
+        gl = self.goalie_columns
+        for team in doc["teams"].values():
+            team_id = team["team"]["id"]
+            for player in team["players"].values():
+                stats = player["stats"]
+                if "goalieStats" in stats:
+                    cols, the_stats = gl, stats["goalieStats"]
+                    stat_map, toi_map = GOALIE_STATS, GOALIE_TOI
+                elif "skaterStats" in stats:
+                    cols, the_stats = sk, stats["skaterStats"]
+                    stat_map, toi_map = SKATER_STATS, SKATER_TOI
+                else:
+                    continue
+                cols["gamePk"].append(gamePk)
+                cols["date"].append(date)
+                cols["team_id"].append(team_id)
+                cols["id"].append(player["person"]["id"])
+                cols["name"].append(player["person"]["fullName"])
+                cols["position"].append(player["position"]["abbreviation"])
+                for col, key in stat_map:
+                    cols[col].append(the_stats.get(key))
+                for col, key in toi_map:
+                    cols[col].append(toi_seconds(the_stats.get(key)))
+                if cols is gl:
+                    ga, decision, so = goalie_result(the_stats)
+                    gl["ga"].append(ga)
+                    gl["decision"].append(decision)
+                    gl["so"].append(so)
+        return self
+
+    def skaters(self):
+        """Return one row per skater per game
+
+        :rtype: pandas.DataFrame
+        """
+        return _frame(self.skater_columns)
+
+    def goalies(self):
+        """Return one row per goalie per game
+
+        :rtype: pandas.DataFrame
+        """
+        return _frame(self.goalie_columns)
+
+
+def _frame(columns):
+    import pandas as pd
+    data = {}
+    for col, values in columns.items():
+        if col == "date":
+            data[col] = pd.to_datetime(pd.Series(values, dtype="object"))
+        elif col in CATEGORY_COLUMNS:
+            data[col] = pd.Categorical(values)
+        else:
+            data[col] = pd.array(values, dtype="Int64")
+    return pd.DataFrame(data)
+
+
+def normalize(docs):
+    """Flatten many boxscores into skater and goalie tables
+
+    :param docs: Boxscores, each either a JSON document or a tuple of
+        (document, gamePk, date)
+    :type docs: iterable
+    :return: The skater and goalie tables
+    :rtype: tuple(pandas.DataFrame, pandas.DataFrame)
+    """
+    normalizer = Normalizer()
+    for doc in docs:
+        if isinstance(doc, tuple):
+            normalizer.add(*doc)
+        else:
+            normalizer.add(doc)
+    return normalizer.skaters(), normalizer.goalies()
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+
+"""
+Shared Selenium helpers for the scrapers that need a real browser.
+
+Instead of sleeping a fixed amount of time after each navigation, the
+scrapers wait for the rows of the stats table to show up (or to change,
+after moving to another page).  Drivers are started headless by default and
+come from a DriverPool, so one browser can be reused across scrapes and
+several can capture pages in parallel.
+"""
+import contextlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+from selenium.common.exceptions import StaleElementReferenceException, \
+    WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+
+ROW_SELECTOR = "table tbody tr"
+TIMEOUT = 15
+POLL_FREQUENCY = 0.1
+
+
+def chrome(headless=True):
+    """Start a Chrome driver
+
+    :param headless: Run without a window
+    :type headless: bool
+    :rtype: selenium.webdriver.Chrome
+    """
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=options)
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def _wait(driver, timeout):
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY,
+                         ignored_exceptions=[StaleElementReferenceException])
+
+
+def wait_for_rows(driver, selector=ROW_SELECTOR, min_rows=1,
+                  timeout=TIMEOUT):
+    """Wait until the page has table rows
+
+    :param selector: CSS selector of the rows
+    :type selector: str
+    :param min_rows: Number of rows that must be present
+    :type min_rows: int
+    :param timeout: Seconds to wait before raising TimeoutException
+    :type timeout: float
+    :return: The rows
+    :rtype: list(WebElement)
+    """
+    def rows_present(d):
+        rows = d.find_elements(By.CSS_SELECTOR, selector)
+        return rows if len(rows) >= min_rows else False
+    return _wait(driver, timeout).until(rows_present)
+
+
+def first_row_text(driver, selector=ROW_SELECTOR):
+    """Return the text of the first row, or None if there are no rows"""
+    rows = driver.find_elements(By.CSS_SELECTOR, selector)
+    return rows[0].text if rows else None
+
+
+def wait_for_change(driver, before, selector=ROW_SELECTOR, timeout=TIMEOUT):
+    """Wait until the table shows different rows
+
+    Use after clicking something that replaces the table's contents, such as
+    a next page button or a filter.
+
+    :param before: first_row_text from before the click
+    :type before: str
+    :return: The new rows
+    :rtype: list(WebElement)
+    """
+    def rows_changed(d):
+        rows = d.find_elements(By.CSS_SELECTOR, selector)
+        return rows if rows and rows[0].text != before else False
+    return _wait(driver, timeout).until(rows_changed)
+
+
+def click(driver, by, value, timeout=TIMEOUT):
+    """Click an element as soon as it is clickable
+
+    :param by: Locator strategy, one of selenium's By values
+    :param value: Locator
+    :type value: str
+    """
+    _wait(driver, timeout).until(
+        expected_conditions.element_to_be_clickable((by, value))).click()
+
+
+class DriverPool:
+    def __init__(self, size=1, headless=True, factory=None):
+        """Pool of browsers that are started on demand and kept open
+
+        :param size: Most drivers open at once
+        :type size: int
+        :param headless: Run the browsers without a window
+        :type headless: bool
+        :param factory: Called with no arguments to start a driver.
+            Defaults to a Chrome driver.
+        :type factory: callable
+        """
+        self.size = size
+        self.factory = factory or functools.partial(chrome, headless)
+        self.drivers = []
+        self._idle = []
+        # Notified whenever a driver is released or a slot is freed
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def acquire(self):
+        """Take an idle driver, starting one if the pool isn't full yet
+
+        Blocks until a driver is released or discarded if all of them are
+        in use.
+        """
+        with self._cond:
+            while not self._idle and len(self.drivers) >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            # Hold the slot while the browser starts up
+            self.drivers.append(None)
+        try:
+            driver = self.factory()
+        except Exception:
+            self._free_slot(None)
+            raise
+        with self._cond:
+            self.drivers[self.drivers.index(None)] = driver
+        return driver
+
+    def release(self, driver):
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def discard(self, driver):
+        """Quit a driver that is no longer usable and free its slot"""
+        self._free_slot(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _free_slot(self, driver):
+        with self._cond:
+            self.drivers.remove(driver)
+            # A waiting thread can start a new driver in the slot
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def driver(self):
+        """Borrow a driver for the duration of a with block
+
+        A driver that raised a WebDriverException (e.g. the browser crashed)
+        is quit rather than put back in the pool.  After any other exception
+        the driver is put back.
+        """
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            if broken:
+                self.discard(driver)
+            else:
+                self.release(driver)
+
+    def map(self, fn, items):
+        """Call fn(driver, item) for each item, using up to size drivers
+
+        :return: Results in the same order as items
+        :rtype: list
+        """
+        def run(item):
+            with self.driver() as driver:
+                return fn(driver, item)
+        items = list(items)
+        if self.size <= 1 or len(items) <= 1:
+            return [run(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        """Quit all of the drivers"""
+        with self._cond:
+            drivers, self.drivers = self.drivers, []
+            self._idle = []
+            self._cond.notify_all()
+        for driver in drivers:
+            if driver is None:
+                continue
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
@@ -0,0 +1,169 @@
+#!/usr/bin/python
+
+"""
+A persistent cache of API responses.
+
+Responses are stored as zlib compressed JSON in a sqlite database so that
+they survive process restarts.  Each entry has its own expiry time, and the
+total size of the store is bounded by evicting the least recently used
+entries.  The access times of cache hits are written in batches rather than
+on every hit, so reading from the cache doesn't write to disk each time.
+
+The database also keeps the gamePks of the games known to be final, so a
+new process knows which boxscores can be kept for good without first
+fetching a schedule.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+    # Number of cache hits whose access times are held before writing them
+    ACCESS_BATCH = 100
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, clock=time.time):
+        """Open (or create) a cache database
+
+        :param path: File name of the sqlite database.  Use ":memory:" for a
+            cache that only lives as long as the process.
+        :type path: str
+        :param max_bytes: Upper bound on the compressed size of all entries
+        :type max_bytes: int
+        :param clock: Function returning the current time in seconds
+        """
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.accessed = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                          "key TEXT PRIMARY KEY, body BLOB, "
+                          "size INTEGER, expires REAL, accessed REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS final_games ("
+                          "gamePk INTEGER PRIMARY KEY)")
+        self.conn.commit()
+
+    def get(self, key):
+        """Look up a response in the cache
+
+        :param key: Key the response was stored under
+        :type key: str
+        :return: The decoded JSON response or None if it isn't cached or it
+            has expired
+        """
+        now = self.clock()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, expires FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            self.accessed[key] = now
+            if len(self.accessed) >= self.ACCESS_BATCH:
+                self._write_accessed()
+                self.conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def _write_accessed(self):
+        self.conn.executemany(
+            "UPDATE responses SET accessed = ? WHERE key = ?",
+            [(t, key) for key, t in self.accessed.items()])
+        self.accessed = {}
+
+    def put(self, key, value, ttl=None):
+        """Store a response in the cache
+
+        :param key: Key to store the response under
+        :type key: str
+        :param value: JSON document to store
+        :param ttl: Number of seconds until the entry expires.  None means
+            the entry never expires.
+        :type ttl: float
+        """
+        now = self.clock()
+        body = zlib.compress(json.dumps(value).encode("utf-8"))
+        expires = None if ttl is None else now + ttl
+        with self.lock:
+            self.accessed.pop(key, None)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), expires, now))
+            # Evict by the latest access times
+            self._write_accessed()
+            self._evict(now)
+            self.conn.commit()
+
+    def final_games(self):
+        """Return the gamePks stored with add_final_games
+
+        :rtype: set(int)
+        """
+        with self.lock:
+            return {row[0] for row in self.conn.execute(
+                "SELECT gamePk FROM final_games")}
+
+    def add_final_games(self, game_ids):
+        """Remember games that are final
+
+        :param game_ids: gamePks of the games
+        :type game_ids: list(int)
+        """
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO final_games VALUES (?)",
+                [(game_id,) for game_id in game_ids])
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.evictions += self.conn.execute(
+            "DELETE FROM responses WHERE expires IS NOT NULL "
+            "AND expires <= ?", (now,)).rowcount
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def _total_bytes(self):
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def stats(self):
+        """Return the hit/miss counters and the current size of the cache
+
+        :return: Counters keyed by name
+        :rtype: dict
+        """
+        with self.lock:
+            entries = self.conn.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "entries": entries,
+                    "bytes": self._total_bytes()}
+
+    def clear(self):
+        with self.lock:
+            self.accessed = {}
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("DELETE FROM final_games")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self._write_accessed()
+            self.conn.commit()
+        self.conn.close()
@@ -6,85 +6,201 @@ format.  It produces the following files:
     cbssports.skaters.proj.csv   : Projections for all skaters
     cbssports.goalies.proj.csv   : Projections for all goalies
 """
-from selenium import webdriver
-import time
-from bs4 import BeautifulSoup
-import pandas as pd
+from nhl_scraper import tables
+from nhl_scraper.tables import to_numeric_columns
 
 
 class ProjectionScraper:
-    def __init__(self):
-        pass
+    # (position filter, name used in the file name)
+    POSITIONS = [("D", "defense"), ("F", "forwards"), ("G", "goalies")]
+
+    def __init__(self, pool=None, headless=True):
+        """
+        :param pool: Browsers to scrape with.  Defaults to a pool of one
+            driver that is kept open across calls to scrape until close().
+            With a pool of two or more drivers the positions are captured
+            in parallel.
+        :type pool: nhl_scraper.browser.DriverPool
+        :param headless: Run the default pool's browser without a window
+        :type headless: bool
+        """
+        # selenium is only loaded by the scrapers that drive a browser
+        from nhl_scraper import browser
+        self.pool = pool or browser.DriverPool(headless=headless)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.close()
 
     def scrape(self):
-        driver = webdriver.Chrome()
-        file_names = []
-        try:
-            driver.maximize_window()
-            driver.implicitly_wait(15)
-            driver.get(self.url())
-            file_names.append(self.scrape_pos(driver, "D", "defense"))
-            file_names.append(self.scrape_pos(driver, "F", "forwards"))
-            file_names.append(self.scrape_pos(driver, "G", "goalies"))
-        finally:
-            driver.close()
-        return file_names
+        return self.pool.map(
+            lambda driver, pos: self.scrape_pos(driver, *pos),
+            self.POSITIONS)
 
     def scrape_pos(self, driver, pos_abrev, pos_long):
-        driver.find_element_by_id("Dropdown-selectedText").click()
-        driver.find_element_by_link_text(pos_abrev).click()
-        time.sleep(5)
         fn = "cbs_sports.{}.html".format(pos_long)
         with open(fn, "w") as f:
-            soup = BeautifulSoup(driver.page_source, "lxml")
-            f.write(soup.prettify())
+            f.write(self.page_source(driver, pos_abrev, pos_long))
         return fn
 
+    def projections(self, archive=None):
+        """Scrape and parse each position without going through files
+
+        With a pool of two or more drivers the positions are captured in
+        parallel.
+
+        :param archive: Archive to also store the raw pages in
+        :type archive: nhl_scraper.archive.HtmlArchive
+        :return: Projections keyed by the position's name in POSITIONS
+        :rtype: dict(str, pandas.DataFrame)
+        """
+        frames = self.pool.map(
+            lambda driver, pos: Parser(html=self.page_source(
+                driver, *pos, archive=archive)).parse(0),
+            self.POSITIONS)
+        return {pos_long: df for (_, pos_long), df in
+                zip(self.POSITIONS, frames)}
+
+    def page_source(self, driver, pos_abrev, pos_long, archive=None):
+        """Show one position's stats and return the page's source
+
+        :rtype: str
+        """
+        from selenium.webdriver.common.by import By
+        from nhl_scraper import browser
+        if not driver.current_url.startswith(self.url()):
+            driver.get(self.url())
+            browser.wait_for_rows(driver)
+        selected = driver.find_element(By.ID, "Dropdown-selectedText")
+        already_selected = selected.text.strip() == pos_abrev
+        before = browser.first_row_text(driver)
+        browser.click(driver, By.ID, "Dropdown-selectedText")
+        browser.click(driver, By.LINK_TEXT, pos_abrev)
+        if already_selected:
+            browser.wait_for_rows(driver)
+        else:
+            browser.wait_for_change(driver, before)
+        html = driver.page_source
+        if archive is not None:
+            archive.put(html, "cbssports.{}".format(pos_long))
+        return html
+
     def url(self):
         return "https://www.cbssports.com/fantasy/hockey/stats"
 
 
 class Parser:
-    def __init__(self, file_name):
-        with open(file_name, "rb") as f:
-            self.soup = BeautifulSoup(f, "lxml")
+    PLAYER_SPAN = tables.XPath(
+        ".//span[{}]".format(tables.has_class("CellPlayerName--long")))
+    TEAM_SPAN = tables.XPath(
+        "./span[{}]".format(tables.has_class("CellPlayerName-team")))
+
+    def __init__(self, file_name=None, backend="lxml", html=None):
+        """
+        :param file_name: Saved stats page
+        :type file_name: str
+        :param backend: "lxml" to extract just the stats table with lxml,
+            falling back to BeautifulSoup if the page doesn't have the
+            expected layout.  "bs4" to always use BeautifulSoup.
+        :type backend: str
+        :param html: Source of the page, instead of a file name
+        :type html: str or bytes
+        """
+        if html is None:
+            with open(file_name, "rb") as f:
+                html = f.read()
+        self.html = html
+        self.backend = backend
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.html, "lxml")
+        return self._soup
 
     def parse(self, index_offset):
+        if self.backend == "lxml":
+            try:
+                return self._parse_lxml(index_offset)
+            except (IndexError, AttributeError):
+                pass
         table = self.soup.find_all('table')[0]
         headings = ["name", "Tm"] + \
-            [th.get_text().strip().split("\n")[0] for th in
+            [self._heading(th) for th in
              table.find("thead").find_all("th")[1:]]
         table_body = table.find('tbody')
-        df = pd.DataFrame(data=[], columns=headings)
-        rows = table_body.find_all('tr')
-        for i, row in enumerate(rows):
-            plyr_cols = self.parse_name_team(row.find('td'))
-            stat_cols = [ele.text.strip() for ele in row.find_all('td')[1:]]
-            df = df.append(pd.DataFrame(data=[plyr_cols + stat_cols],
-                                        columns=headings,
-                                        index=[i + index_offset]))
-        return df
+        data = []
+        for row in table_body.find_all('tr'):
+            tds = row.find_all('td')
+            data.append(self.parse_name_team(tds[0]) +
+                        [ele.text.strip() for ele in tds[1:]])
+        return self._frame(headings, data, index_offset)
+
+    def _parse_lxml(self, index_offset):
+        table = tables.find_tables(self.html, [0])[0]
+        headings = ["name", "Tm"] + \
+            [self._heading_lxml(th) for th in
+             table.xpath(".//thead")[0].xpath(".//th")[1:]]
+        data = []
+        for row in tables.body_rows(table):
+            tds = row.findall("td")
+            data.append(self._name_team_lxml(tds[0]) +
+                        [tables.text(td) for td in tds[1:]])
+        return self._frame(headings, data, index_offset)
+
+    def _frame(self, headings, data, index_offset):
+        import pandas as pd
+        df = pd.DataFrame(data=data, columns=headings,
+                          index=range(index_offset, index_offset + len(data)))
+        return to_numeric_columns(df, headings[2:])
+
+    def _heading(self, th):
+        # The heading is followed by a tooltip with the full stat name
+        tooltip = th.find("div")
+        if tooltip is None or not tooltip.contents:
+            return th.get_text().strip().split("\n")[0]
+        return str(tooltip.contents[0]).strip()
+
+    def _heading_lxml(self, th):
+        tooltip = th.find("div")
+        if tooltip is None:
+            return tables.text(th).split("\n")[0]
+        return (tooltip.text or "").strip()
+
+    def _name_team_lxml(self, td):
+        player = self.PLAYER_SPAN(td)
+        if not player:
+            return self._split_name_team("".join(td.itertext()))
+        return [tables.text(player[0].xpath(".//a")[0]),
+                tables.text(self.TEAM_SPAN(player[0])[0])]
 
     def parse_name_team(self, td):
-        attrs = td.text.strip().split('\n')
+        player = td.find("span", {"class": "CellPlayerName--long"})
+        if player is None:
+            return self._split_name_team(td.text)
+        return [player.find("a").text.strip(),
+                player.find("span", {"class": "CellPlayerName-team"},
+                            recursive=False).text.strip()]
+
+    def _split_name_team(self, td_text):
+        attrs = td_text.strip().split('\n')
         return [attrs[13].strip(), attrs[6].strip()]
 
 
 if __name__ == "__main__":
-    sc = ProjectionScraper()
-    file_names = sc.scrape()
-
-    skaters = None
-    goalies = None
-    for fn in file_names:
-        p = Parser(fn)
-        if "goalies" in fn:
-            goalies = p.parse(0)
-        else:
-            if skaters is None:
-                skaters = p.parse(0)
-            else:
-                skaters = skaters.append(p.parse(len(skaters.index)))
+    import pandas as pd
+    from nhl_scraper import browser
+    with ProjectionScraper(pool=browser.DriverPool(size=3)) as sc:
+        frames = sc.projections()
 
+    skaters = pd.concat([frames["defense"], frames["forwards"]],
+                        ignore_index=True)
     skaters.to_csv("cbssports.skaters.proj.csv")
-    goalies.to_csv("cbssports.goalies.proj.csv")
+    frames["goalies"].to_csv("cbssports.goalies.proj.csv")
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+"""
+Command line entry point, installed as nhl-scraper.
+
+    nhl-scraper backfill --seasons 2010-2020 --store data/
+    nhl-scraper backfill --seasons 2017 --store /tmp/data \\
+        --base-url http://localhost:8000/api/v1
+"""
+import argparse
+import logging
+import sys
+
+
+def backfill(args):
+    from nhl_scraper.backfill import Backfill, parse_seasons
+    from nhl_scraper.storage import Store
+    store = Store(args.store, format=args.format)
+    stored = Backfill(store, processes=args.processes, threads=args.threads,
+                      rate=args.rate, shard_days=args.shard_days,
+                      base_url=args.base_url,
+                      replay=args.replay).run(parse_seasons(args.seasons))
+    print("Stored {} games in {}".format(stored, args.store))
+
+
+def parser():
+    p = argparse.ArgumentParser(prog="nhl-scraper")
+    p.add_argument("-v", "--verbose", action="store_true",
+                   help="Log the progress")
+    commands = p.add_subparsers(dest="command", required=True)
+
+    bf = commands.add_parser(
+        "backfill", help="Store the boxscores of past seasons",
+        description="Fetch the boxscores of every final game in the seasons "
+        "into the skaters and goalies datasets of a store.  Finished games "
+        "are checkpointed, so running the same command again resumes.")
+    bf.add_argument("--seasons", required=True,
+                    help="Seasons by starting year, e.g. 2010-2020 or "
+                    "2015,2017")
+    bf.add_argument("--store", required=True,
+                    help="Directory of the store to write to")
+    bf.add_argument("--format", choices=["parquet", "feather"],
+                    default="parquet")
+    bf.add_argument("--processes", type=int, default=4,
+                    help="Worker processes.  0 runs in this process.")
+    bf.add_argument("--threads", type=int, default=4,
+                    help="Boxscores each worker fetches at once")
+    bf.add_argument("--rate", type=float, default=10,
+                    help="Maximum requests per second over all workers.  0 "
+                    "for no limit.")
+    bf.add_argument("--shard-days", type=int, default=7,
+                    help="Days of games in each shard")
+    bf.add_argument("--base-url",
+                    help="NHL API URL to use instead of the public one")
+    bf.add_argument("--replay",
+                    help="Directory of recorded responses to replay")
+    bf.set_defaults(func=backfill)
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
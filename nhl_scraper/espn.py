@@ -5,105 +5,470 @@ A script that scrapes projections from ESPNs and outputs them to csv format.
 It produces two files:
     espn.skaters.proj.csv   : Projections for all skaters
     espn.goalies.proj.csv   : Projections for all goalies
+
+Pass --api to read the projections from ESPN's JSON API instead of rendering
+the pages in a browser.
 """
-from selenium import webdriver
-from bs4 import BeautifulSoup
-import time
-import pandas as pd
+import datetime
+import json
+import sys
+from nhl_scraper import metrics, tables
+from nhl_scraper.tables import to_numeric_columns
+
+# Columns of the projection tables, in the order the site shows them
+SKATER_COLUMNS = ["G", "A", "+/-", "PIM", "PPG", "PPA", "SHG", "SHA", "GWG",
+                  "SOG", "HIT", "BLK"]
+GOALIE_COLUMNS = ["GS", "W", "L", "SV", "GA", "SO", "GAA", "SV%"]
+# Decimal places shown on the site for the columns that aren't counts
+DECIMALS = {"GAA": 2, "SV%": 3}
+
+# Stat IDs used in the API's stats dictionaries
+STAT_IDS = {
+    "0": "GS", "1": "W", "2": "L", "4": "GA", "6": "SV", "7": "SO",
+    "10": "GAA", "11": "SV%", "13": "G", "14": "A", "15": "+/-",
+    "17": "PIM", "18": "PPG", "20": "SHG", "21": "SHA", "22": "GWG",
+    "29": "SOG", "31": "HIT", "32": "BLK", "39": "PPA",
+}
+
+# The API's proTeamId mapped to the team code shown on the site
+PRO_TEAMS = {
+    1: "Bos", 2: "Buf", 3: "Cgy", 4: "Chi", 5: "Det", 6: "Edm", 7: "Car",
+    8: "LA", 9: "Dal", 10: "Mtl", 11: "NJ", 12: "NYI", 13: "NYR",
+    14: "Ott", 15: "Phi", 16: "Pit", 17: "Col", 18: "SJ", 19: "StL",
+    20: "TB", 21: "Tor", 22: "Van", 23: "Wsh", 24: "Ari", 25: "Ana",
+    26: "Fla", 27: "Nsh", 28: "Wpg", 29: "CBJ", 37: "VGK", 124292: "Sea",
+}
+
+GOALIE_POSITION = 5
+# Lineup slots to filter the players on
+SKATER_SLOTS = [0, 1, 2, 3, 4, 6]
+GOALIE_SLOTS = [5]
+# statSourceId and statSplitTypeId of a season long projection
+PROJECTED = 1
+SEASON_TOTAL = 0
 
 
 class ProjectionScraper:
-    def __init__(self):
-        pass
+    def __init__(self, pool=None, headless=True):
+        """
+        :param pool: Browsers to scrape with.  Defaults to a pool of one
+            driver that is kept open across calls to scrape until close().
+        :type pool: nhl_scraper.browser.DriverPool
+        :param headless: Run the default pool's browser without a window
+        :type headless: bool
+        """
+        # selenium is only loaded by the scrapers that drive a browser
+        from nhl_scraper import browser
+        self.pool = pool or browser.DriverPool(headless=headless)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.close()
 
     def scrape(self, pick_goalies, num_pages):
-        driver = webdriver.Chrome()
+        with self.pool.driver() as driver:
+            return self.scrape_pages(driver, pick_goalies, num_pages)
+
+    def scrape_all(self, num_skater_pages=5, num_goalie_pages=3):
+        """Scrape the skater and the goalie projections
+
+        With a pool of two or more drivers both are captured in parallel.
+
+        :return: File names of the skater pages and of the goalie pages
+        :rtype: tuple(list, list)
+        """
+        return tuple(self.pool.map(
+            lambda driver, job: self.scrape_pages(driver, *job),
+            [(False, num_skater_pages), (True, num_goalie_pages)]))
+
+    def scrape_pages(self, driver, pick_goalies, num_pages):
         file_names = []
-        try:
-            driver.maximize_window()
-            driver.implicitly_wait(15)
-            driver.get(self.url())
-            driver.find_element_by_css_selector(".btn:nth-child(1) > span") \
-                .click()
-            if pick_goalies:
-                driver.find_element_by_css_selector(
-                    ".control:nth-child(4)").click()
-            for pg_num in range(num_pages):
-                time.sleep(5)
-                fn = "espn_proj.{}.pg{}.html".format(
-                    "goalies" if pick_goalies else "skaters", pg_num)
-                with open(fn, "w") as f:
-                    soup = BeautifulSoup(driver.page_source, "lxml")
-                    f.write(soup.prettify())
-                file_names.append(fn)
-                driver.find_element_by_css_selector(
-                    ".btn__icon:nth-child(3)").click()
-        finally:
-            driver.close()
+        for pg_num, html in enumerate(
+                self._iter_pages(driver, pick_goalies, num_pages)):
+            fn = "espn_proj.{}.pg{}.html".format(
+                "goalies" if pick_goalies else "skaters", pg_num)
+            with open(fn, "w") as f:
+                f.write(html)
+            file_names.append(fn)
         return file_names
 
+    def iter_pages(self, pick_goalies, num_pages, archive=None):
+        """Yield the source of each page as soon as it has loaded
+
+        Nothing is written to disk unless an archive is given.
+
+        :param archive: Archive to also store the raw pages in
+        :type archive: nhl_scraper.archive.HtmlArchive
+        :rtype: generator of str
+        """
+        with self.pool.driver() as driver:
+            yield from self._iter_pages(driver, pick_goalies, num_pages,
+                                        archive)
+
+    def projections(self, pick_goalies, num_pages, archive=None):
+        """Scrape and parse the projections without going through files
+
+        :rtype: pandas.DataFrame
+        """
+        return parse_pages(self.iter_pages(pick_goalies, num_pages, archive))
+
+    def projections_all(self, num_skater_pages=5, num_goalie_pages=3,
+                        archive=None):
+        """Scrape and parse the skater and the goalie projections
+
+        With a pool of two or more drivers both are captured in parallel.
+
+        :return: The skater and the goalie projections
+        :rtype: tuple(pandas.DataFrame, pandas.DataFrame)
+        """
+        return tuple(self.pool.map(
+            lambda driver, job: parse_pages(
+                self._iter_pages(driver, *job, archive=archive)),
+            [(False, num_skater_pages), (True, num_goalie_pages)]))
+
+    def _iter_pages(self, driver, pick_goalies, num_pages, archive=None):
+        from selenium.webdriver.common.by import By
+        from nhl_scraper import browser
+        driver.get(self.url())
+        browser.wait_for_rows(driver)
+        before = browser.first_row_text(driver)
+        browser.click(driver, By.CSS_SELECTOR, ".btn:nth-child(1) > span")
+        browser.wait_for_change(driver, before)
+        if pick_goalies:
+            before = browser.first_row_text(driver)
+            browser.click(driver, By.CSS_SELECTOR, ".control:nth-child(4)")
+            browser.wait_for_change(driver, before)
+        for pg_num in range(num_pages):
+            html = driver.page_source
+            if archive is not None:
+                archive.put(html, "espn.{}.pg{}".format(
+                    "goalies" if pick_goalies else "skaters", pg_num))
+            yield html
+            if pg_num + 1 < num_pages:
+                before = browser.first_row_text(driver)
+                browser.click(driver, By.CSS_SELECTOR,
+                              ".btn__icon:nth-child(3)")
+                browser.wait_for_change(driver, before)
+
     def url(self):
         return "https://fantasy.espn.com/hockey/players/projections"
 
 
 class Parser:
-    def __init__(self, file_name):
-        with open(file_name, "rb") as f:
-            self.soup = BeautifulSoup(f, "lxml")
+    NAME_TABLE = 1
+    PROJECTION_TABLE = 3
+    TEAM_SPAN = tables.XPath(
+        ".//span[{}]".format(tables.has_class("playerinfo__playerteam")))
+    NAME_LINK = tables.XPath(".//a")
+
+    def __init__(self, file_name=None, backend="lxml", html=None):
+        """
+        :param file_name: Saved projections page
+        :type file_name: str
+        :param backend: "lxml" to extract just the tables we need with lxml,
+            falling back to BeautifulSoup if the page doesn't have the
+            expected layout.  "bs4" to always use BeautifulSoup.
+        :type backend: str
+        :param html: Source of the page, instead of a file name
+        :type html: str or bytes
+        """
+        if html is None:
+            with open(file_name, "rb") as f:
+                html = f.read()
+        self.html = html
+        self.backend = backend
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.html, "lxml")
+        return self._soup
 
     def parse(self, index_offset):
-        names = self.parse_name(index_offset)
-        proj = self.parse_projection(index_offset)
+        names = proj = None
+        if self.backend == "lxml":
+            try:
+                names, proj = self._parse_lxml(index_offset)
+            except (IndexError, AttributeError):
+                pass
+        if names is None:
+            names = self.parse_name(index_offset)
+            proj = self.parse_projection(index_offset)
         df = names.join(proj)
         # Remove any players with missing projections
         if 'G' in df:
-            df = df[df.G != '--']
+            df = df[df.G.notna()]
         elif 'W' in df:
-            df = df[df.W != '--']
+            df = df[df.W.notna()]
         return df
 
+    def _parse_lxml(self, index_offset):
+        found = tables.find_tables(
+            self.html, [self.NAME_TABLE, self.PROJECTION_TABLE])
+        names = []
+        for row in tables.body_rows(found[self.NAME_TABLE]):
+            td = row.findall("td")[1]
+            links = self.NAME_LINK(td)
+            name = tables.text(links[0]) if links else \
+                tables.text(td).split("\n")[0]
+            names.append([name, tables.text(self.TEAM_SPAN(td)[0])])
+        table = found[self.PROJECTION_TABLE]
+        headings = [tables.text(th) for th in
+                    table.xpath(".//thead")[1].xpath(".//th")]
+        proj = [[tables.text(td) for td in row.findall("td")]
+                for row in tables.body_rows(table)]
+        return (self._name_frame(names, index_offset),
+                self._projection_frame(headings, proj, index_offset))
+
     def parse_projection(self, index_offset):
-        table = self.soup.find_all('table')[3]
+        table = self.soup.find_all('table')[self.PROJECTION_TABLE]
         headings = [th.get_text().strip() for th in
                     table.find_all("thead")[1].find_all("th")]
         table_body = table.find('tbody')
-        df = pd.DataFrame(data=[], columns=headings)
-        rows = table_body.find_all('tr')
-        for i, row in enumerate(rows):
-            cols = [ele.text.strip() for ele in row.find_all('td')]
-            df = df.append(pd.DataFrame(data=[cols], columns=headings,
-                                        index=[i + index_offset]))
-        return df
+        data = [[ele.text.strip() for ele in row.find_all('td')]
+                for row in table_body.find_all('tr')]
+        return self._projection_frame(headings, data, index_offset)
 
     def parse_name(self, index_offset):
-        table = self.soup.find_all('table')[1]
-        headings = ["Name", "Tm"]
+        table = self.soup.find_all('table')[self.NAME_TABLE]
         table_body = table.find('tbody')
-        df = pd.DataFrame(data=[], columns=headings)
-        rows = table_body.find_all('tr')
-        for i, row in enumerate(rows):
-            name = row.find_all('td')[1].text.strip().split("\n")[0]
-            tm = row.find_all('td')[1].find_all(
-                'span', {"class": "playerinfo__playerteam"})[0].text.strip()
-            df = df.append(pd.DataFrame(data=[[name, tm]], columns=headings,
-                                        index=[i + index_offset]))
+        data = []
+        for row in table_body.find_all('tr'):
+            td = row.find_all('td')[1]
+            link = td.find('a')
+            name = link.text.strip() if link is not None else \
+                td.text.strip().split("\n")[0]
+            tm = td.find('span', {"class": "playerinfo__playerteam"}) \
+                .text.strip()
+            data.append([name, tm])
+        return self._name_frame(data, index_offset)
+
+    def _name_frame(self, data, index_offset):
+        import pandas as pd
+        return pd.DataFrame(data=data, columns=["Name", "Tm"],
+                            index=range(index_offset,
+                                        index_offset + len(data)))
+
+    def _projection_frame(self, headings, data, index_offset):
+        import pandas as pd
+        df = pd.DataFrame(data=data, columns=headings,
+                          index=range(index_offset, index_offset + len(data)))
+        return to_numeric_columns(df)
+
+
+class EndpointAdapter:
+    ESPN_URL = "https://lm-api-reads.fantasy.espn.com/apis/v3/games/fhl"
+
+    def __init__(self, session=None):
+        """
+        :param session: HTTP session to send requests through.  Defaults to
+            the session shared by all of the adapters.
+        :type session: nhl_scraper.session.Session
+        """
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from nhl_scraper.session import default_session
+            self._session = default_session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def players_endpoint(self, season, slot_ids, offset, limit):
+        """Request one page of players with their projections
+
+        :param season: Year the season ends in
+        :type season: int
+        :param slot_ids: Lineup slots the players must be eligible for
+        :type slot_ids: list(int)
+        :param offset: Number of players to skip
+        :type offset: int
+        :param limit: Most players to return
+        :type limit: int
+        :return: JSON document of the reponse
+        """
+        fantasy_filter = {"players": {
+            "filterSlotIds": {"value": slot_ids},
+            "filterStatsForSourceIds": {"value": [PROJECTED]},
+            "filterStatsForSplitTypeIds": {"value": [SEASON_TOTAL]},
+            "sortPercOwned": {"sortAsc": False, "sortPriority": 1},
+            "offset": offset,
+            "limit": limit}}
+        with metrics.timer("latency", "espn_players"):
+            response = self.session.get(
+                "{}/seasons/{}/segments/0/leaguedefaults/1".format(
+                    self.ESPN_URL, season),
+                params={"view": "kona_player_info"},
+                headers={"X-Fantasy-Filter": json.dumps(fantasy_filter)})
+        metrics.emit("bytes", "espn_players", len(response.content))
+        return response.json()
+
+
+class ApiScraper:
+    PAGE_SIZE = 1000
+
+    def __init__(self, season=None):
+        """
+        :param season: Year the season ends in.  Defaults to the current or
+            upcoming season.
+        :type season: int
+        """
+        self.season = season or current_season()
+        self.ea = EndpointAdapter()
+
+    def set_endpoint_adapter(self, ea):
+        self.ea = ea
+
+    def players(self, pick_goalies):
+        """Fetch every player of one kind, a page of PAGE_SIZE at a time
+
+        :return: The player entries of the responses
+        :rtype: list(dict)
+        """
+        slot_ids = GOALIE_SLOTS if pick_goalies else SKATER_SLOTS
+        players = []
+        while True:
+            r = self.ea.players_endpoint(self.season, slot_ids,
+                                         len(players), self.PAGE_SIZE)
+            page = r.get("players", [])
+            players += page
+            if len(page) < self.PAGE_SIZE:
+                return players
+
+    def projections(self, pick_goalies, index_offset=0):
+        """Return the projections in the same layout as Parser.parse
+
+        :param pick_goalies: True for the goalies, False for the skaters
+        :type pick_goalies: bool
+        :rtype: pandas.DataFrame
+        """
+        players = self.players(pick_goalies)
+        with metrics.timer("parse", "espn_projections"):
+            df = ApiParser(players, self.season).parse(pick_goalies,
+                                                       index_offset)
+        metrics.emit("rows", "espn_projections", len(df.index))
         return df
 
 
-def scrape_and_parse(pick_goalies, csv_file_name):
-    sc = ProjectionScraper()
-    file_names = sc.scrape(pick_goalies, 3 if pick_goalies else 5)
+class ApiParser:
+    def __init__(self, players, season):
+        """
+        :param players: Player entries of kona_player_info responses
+        :type players: list(dict)
+        :param season: Year the season ends in
+        :type season: int
+        """
+        self.players = players
+        self.season = season
+
+    def parse(self, pick_goalies, index_offset=0):
+        import pandas as pd
+        columns = GOALIE_COLUMNS if pick_goalies else SKATER_COLUMNS
+        data = {col: [] for col in ["Name", "Tm"] + columns}
+        for entry in self.players:
+            player = entry.get("player", entry)
+            is_goalie = player.get("defaultPositionId") == GOALIE_POSITION
+            if is_goalie != pick_goalies:
+                continue
+            stats = self._projection(player)
+            # Same as the pages, players without projections are left out
+            if stats is None:
+                continue
+            data["Name"].append(player["fullName"])
+            data["Tm"].append(PRO_TEAMS.get(player.get("proTeamId")))
+            for col in columns:
+                data[col].append(stats.get(col))
+        df = pd.DataFrame(index=range(index_offset,
+                                      index_offset + len(data["Name"])))
+        for col, values in data.items():
+            if col in DECIMALS:
+                df[col] = pd.Series(values, index=df.index, dtype="float64") \
+                    .round(DECIMALS[col])
+            elif col in columns:
+                df[col] = pd.array(
+                    [None if v is None else int(round(v)) for v in values],
+                    dtype="Int64")
+            else:
+                df[col] = values
+        return df
+
+    def _projection(self, player):
+        for entry in player.get("stats", []):
+            if entry.get("statSourceId") == PROJECTED and \
+                    entry.get("statSplitTypeId") == SEASON_TOTAL and \
+                    entry.get("seasonId", self.season) == self.season:
+                return {STAT_IDS[k]: v for k, v in entry["stats"].items()
+                        if k in STAT_IDS}
+        return None
+
+
+def current_season(today=None):
+    """Year the current season ends in, moving on to the next in July
+
+    :rtype: int
+    """
+    today = today or datetime.date.today()
+    return today.year + 1 if today.month >= 7 else today.year
+
+
+def scrape_and_parse(pick_goalies, csv_file_name, scraper=None):
+    if scraper is None:
+        with ProjectionScraper() as sc:
+            file_names = sc.scrape(pick_goalies, 3 if pick_goalies else 5)
+    else:
+        file_names = scraper.scrape(pick_goalies, 3 if pick_goalies else 5)
+    parse_to_csv(file_names, csv_file_name)
+
+
+def parse_pages(pages):
+    """Parse pages as they come in and combine them into one frame
+
+    :param pages: Source of each page, e.g. from ProjectionScraper.iter_pages
+    :type pages: iterable of str
+    :rtype: pandas.DataFrame
+    """
+    return _concat(Parser(html=html) for html in pages)
+
+
+def parse_to_csv(file_names, csv_file_name):
+    _concat(Parser(fn) for fn in file_names).to_csv(csv_file_name)
+
+
+def _concat(parsers):
+    import pandas as pd
+    frames = []
+    index_offset = 0
+    for p in parsers:
+        with metrics.timer("parse", "espn_page"):
+            df = p.parse(index_offset)
+        metrics.emit("rows", "espn_page", len(df.index))
+        index_offset += len(df.index)
+        frames.append(df)
+    return pd.concat(frames)
+
 
-    df = None
-    for fn in file_names:
-        p = Parser(fn)
-        if df is None:
-            df = p.parse(0)
-        else:
-            df = df.append(p.parse(len(df.index)))
-    df.to_csv(csv_file_name)
+def api_to_csv(season=None):
+    sc = ApiScraper(season)
+    sc.projections(False).to_csv("espn.skaters.proj.csv")
+    sc.projections(True).to_csv("espn.goalies.proj.csv")
 
 
-if __name__ == "__main__":
-    scrape_and_parse(False, "espn.skaters.proj.csv")
-    scrape_and_parse(True, "espn.goalies.proj.csv")
+if __name__ == "__main__" and "--api" in sys.argv:
+    api_to_csv()
+elif __name__ == "__main__":
+    from nhl_scraper import browser
+    with ProjectionScraper(pool=browser.DriverPool(size=2)) as sc:
+        skaters, goalies = sc.projections_all()
+    skaters.to_csv("espn.skaters.proj.csv")
+    goalies.to_csv("espn.goalies.proj.csv")
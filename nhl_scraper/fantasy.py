@@ -0,0 +1,264 @@
+#!/usr/bin/python
+
+"""
+Fantasy points projections from the projection sites and the schedule.
+
+The projections scraped by espn.Parser and cbssports.Parser are season
+totals.  FantasyProjector turns them into per-game rates, blends the
+sources with a weight per source, and multiplies the rates by the number of
+games each player's team plays in any number of date windows.  Everything
+after loading the sources is array arithmetic:
+
+* rates: players x stats, blended from sources x players x stats
+* games: players x windows, gathered from ScheduleIndex.games_count_windows
+* projections: rates[:, :, None] * games[:, None, :], players x stats x
+  windows
+* points: the projections weighted by the league's scoring
+
+>>> index = s.schedule_index(season="20192020")
+>>> resolver = PlayerResolver.from_scraper(s)
+>>> fp = FantasyProjector({"G": 3, "A": 2, "SOG": 0.5}, s.teams(), index,
+...                       resolver=resolver)
+>>> fp.add_source("espn", espn_df, weight=0.6)
+>>> fp.add_source("cbssports", cbs_df, weight=0.4)
+>>> fp.points(weekly_windows(index.start_date, index.end_date))
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from nhl_scraper.nhl import _as_date
+from nhl_scraper.resolver import SOURCE_COLUMNS, normalize_name, \
+    normalize_team
+
+# Number of team games the sites' season projections are spread over
+SEASON_GAMES = 82
+# Stats that are averages rather than counts, so they can't be added up
+# over a window
+RATE_STATS = ("GAA", "SV%")
+
+
+def weekly_windows(start_date, end_date):
+    """Split a range of dates into Monday to Sunday scoring periods
+
+    The first and last periods are cut short to fit the range.
+
+    :param start_date: First date
+    :type start_date: datetime.date
+    :param end_date: Last date (inclusive)
+    :type end_date: datetime.date
+    :return: (start_date, end_date) of each period
+    :rtype: list(tuple)
+    """
+    start_date = _as_date(start_date)
+    end_date = _as_date(end_date)
+    windows = []
+    while start_date <= end_date:
+        sunday = start_date + datetime.timedelta(days=6 - start_date.weekday())
+        windows.append((start_date, min(sunday, end_date)))
+        start_date = sunday + datetime.timedelta(days=1)
+    return windows
+
+
+class FantasyProjector:
+    def __init__(self, scoring, teams, index, resolver=None):
+        """
+        :param scoring: Fantasy points for one of each stat, keyed by the
+            column names of the projection tables, e.g. {"G": 3, "A": 2}
+        :type scoring: dict
+        :param teams: Output of nhl.Scraper.teams
+        :type teams: pandas.DataFrame
+        :param index: Schedule of the dates to project
+        :type index: nhl_scraper.schedule.ScheduleIndex
+        :param resolver: If given, players are matched across sources on
+            their NHL playerId
+        :type resolver: nhl_scraper.resolver.PlayerResolver
+        """
+        averages = [stat for stat in scoring if stat in RATE_STATS]
+        if averages:
+            raise ValueError("Can't project averages over a window: {}"
+                             .format(", ".join(averages)))
+        self.stats = list(scoring)
+        self.weights = np.array([scoring[s] for s in self.stats],
+                                dtype="float64")
+        self.team_ids = dict(zip(teams["abbrev"], teams["id"]))
+        self.index = index
+        self.resolver = resolver
+        self.sources = []
+        self.names = []
+        self.teams = []
+        self.player_ids = []
+        self.by_id = {}
+        self.by_key = {}
+        self.by_name = {}
+        self._rates = None
+
+    def add_source(self, source, df, weight=1.0, games=SEASON_GAMES,
+                   name_col=None, team_col=None):
+        """Add the projections of one site
+
+        Players are matched across sources on their NHL playerId when the
+        projector has a resolver and the player resolves, and otherwise on
+        their normalized name and team.  Rows of a source without teams are
+        matched on the name alone when it's unique.  A stat a source
+        doesn't have, or doesn't have for a player, is left out of that
+        player's blend instead of counting as 0.
+
+        :param source: One of resolver.SOURCE_COLUMNS, to find the name and
+            team columns
+        :type source: str
+        :param df: Output of the source's Parser.parse
+        :type df: pandas.DataFrame
+        :param weight: Weight of the source in the blend
+        :type weight: float
+        :param games: Number of team games the projections cover
+        :type games: int
+        :param name_col: Name column, overriding the source's
+        :param team_col: Team column, overriding the source's
+        """
+        default_name, default_team = SOURCE_COLUMNS[source]
+        name_col = name_col or default_name
+        team_col = team_col or default_team
+        teams = df[team_col] if team_col is not None else \
+            [None] * len(df.index)
+        if self.resolver is not None:
+            player_ids = [None if pd.isna(p) else int(p) for p in
+                          self.resolver.resolve_frame(
+                              df, name_col=name_col, team_col=team_col)]
+        else:
+            player_ids = [None] * len(df.index)
+        rows = np.array([self._player_row(name, team, player_id)
+                         for name, team, player_id in zip(
+                             df[name_col], teams, player_ids)],
+                        dtype=np.intp)
+        values = np.full((len(df.index), len(self.stats)), np.nan)
+        for i, stat in enumerate(self.stats):
+            if stat in df.columns:
+                values[:, i] = df[stat].to_numpy(dtype="float64",
+                                                 na_value=np.nan)
+        self.sources.append((source, rows, values / games, float(weight)))
+        self._rates = None
+
+    def _player_row(self, name, team, player_id=None):
+        key = normalize_name(name)
+        team = normalize_team(team)
+        row = self.by_id.get(player_id)
+        if row is None:
+            row = self._match(key, team, player_id)
+        if row is None:
+            row = len(self.names)
+            self.names.append(name)
+            self.teams.append(team)
+            self.player_ids.append(player_id)
+            self.by_name.setdefault(key, []).append(row)
+        if self.teams[row] is None:
+            self.teams[row] = team
+        if self.player_ids[row] is None:
+            self.player_ids[row] = player_id
+        if player_id is not None:
+            self.by_id[player_id] = row
+        if team is not None:
+            self.by_key.setdefault((key, team), row)
+        return row
+
+    def _match(self, key, team, player_id):
+        """Row of a player not found by playerId, or None"""
+        if (key, team) in self.by_key:
+            row = self.by_key[(key, team)]
+        else:
+            # Only a source without teams goes by the name alone, and a
+            # player first seen without a team takes the next source's
+            rows = self.by_name.get(key, [])
+            if len(rows) != 1 or (team is not None and
+                                  self.teams[rows[0]] is not None):
+                return None
+            row = rows[0]
+        if player_id is not None and \
+                self.player_ids[row] not in (None, player_id):
+            return None
+        return row
+
+    @property
+    def players(self):
+        """Every player in any of the sources
+
+        The rows are in the same order as the arrays returned by rates,
+        games and project.
+
+        :return: Frame with name, team (NHL abbreviation), team_id and
+            playerId (<NA> without a resolver or a match)
+        :rtype: pandas.DataFrame
+        """
+        return pd.DataFrame({
+            "name": self.names,
+            "team": self.teams,
+            "team_id": pd.array([self.team_ids.get(t) for t in self.teams],
+                                dtype="Int64"),
+            "playerId": pd.array(self.player_ids, dtype="Int64"),
+        })
+
+    def rates(self):
+        """Blended projections per team game
+
+        :return: players x stats
+        :rtype: numpy.ndarray
+        """
+        if self._rates is None:
+            num_players = len(self.names)
+            values = np.full((len(self.sources), num_players,
+                              len(self.stats)), np.nan)
+            for k, (_, rows, rates, _) in enumerate(self.sources):
+                values[k, rows] = rates
+            weights = np.array([w for _, _, _, w in self.sources])
+            present = ~np.isnan(values)
+            weights = np.where(present, weights[:, None, None], 0.0)
+            total = weights.sum(axis=0)
+            blended = np.where(present, values, 0.0) * weights
+            self._rates = np.divide(blended.sum(axis=0), total,
+                                    out=np.zeros_like(total),
+                                    where=total > 0)
+        return self._rates
+
+    def games(self, windows):
+        """Number of games each player's team plays in each window
+
+        Players whose team isn't in the schedule get 0 games.
+
+        :param windows: (start_date, end_date) of each window
+        :type windows: list(tuple)
+        :return: players x windows
+        :rtype: numpy.ndarray
+        """
+        counts = self.index.games_count_windows(windows)
+        # An extra row of zeros for the players without a scheduled team
+        counts = np.vstack([counts, np.zeros((1, len(windows)),
+                                             dtype=counts.dtype)])
+        team_rows = np.array([
+            self.index.team_pos.get(self.team_ids.get(t), -1)
+            for t in self.teams], dtype=np.intp)
+        return counts[team_rows]
+
+    def project(self, windows):
+        """Projected stats of every player in each window
+
+        :param windows: (start_date, end_date) of each window
+        :type windows: list(tuple)
+        :return: players x stats x windows
+        :rtype: numpy.ndarray
+        """
+        return self.rates()[:, :, None] * self.games(windows)[:, None, :]
+
+    def points(self, windows):
+        """Projected fantasy points of every player in each window
+
+        :param windows: (start_date, end_date) of each window
+        :type windows: list(tuple)
+        :return: One row per player, in the order of players, and one
+            column per window, labelled by the window's start date
+        :rtype: pandas.DataFrame
+        """
+        per_game = self.rates() @ self.weights
+        points = per_game[:, None] * self.games(windows)
+        df = pd.DataFrame(points, columns=[s for s, _ in windows])
+        return pd.concat([self.players, df], axis=1)
@@ -0,0 +1,320 @@
+#!/usr/bin/python
+
+"""
+Rolling form of each player over their last games.
+
+PlayerForm keeps the last games of every player in a players x games x
+stats array, with the newest game in the last slot.  The form over the last
+5, 10 or 20 games is then a sum over the last slots of that array for the
+whole league at once.  Box score tables are added as they come, e.g. after
+each game night: a new game shifts its players' slots along by one, so
+adding a night costs the same however much of the season is already in.
+
+>>> form = PlayerForm.from_store(store, seasons=[20192020])
+>>> sync_box_scores(s, store, yesterday, yesterday)
+>>> form.update(store)
+>>> form.skaters(players=s.players(), teams=s.teams())
+"""
+import numpy as np
+import pandas as pd
+
+from nhl_scraper.boxscore import KEY_COLUMNS
+
+WINDOWS = (5, 10, 20)
+
+# Columns of the box score tables that are kept.  The form tables give
+# each of them per game played, with toi in seconds.
+SKATER_STATS = ["goals", "assists", "shots", "hits", "toi"]
+GOALIE_STATS = ["shots", "saves", "ga", "toi"]
+
+
+class _LastGames:
+    def __init__(self, stats, depth):
+        """The last games of each player, newest last
+
+        :param stats: Columns of the box score table to keep
+        :type stats: list(str)
+        :param depth: Number of games to keep for each player
+        :type depth: int
+        """
+        self.stats = stats
+        self.depth = depth
+        self.rows = {}
+        self.ids = np.zeros(0, dtype="int64")
+        self.names = np.zeros(0, dtype="object")
+        self.positions = np.zeros(0, dtype="object")
+        self.team_ids = np.zeros(0, dtype="int64")
+        self.last_date = np.zeros(0, dtype="datetime64[ns]")
+        self.values = np.zeros((0, depth, len(stats)))
+        self.played = np.zeros((0, depth), dtype=bool)
+
+    def _player_rows(self, ids):
+        rows = np.empty(len(ids), dtype=np.intp)
+        for i, player_id in enumerate(ids):
+            row = self.rows.get(player_id)
+            if row is None:
+                row = self.rows[player_id] = len(self.rows)
+            rows[i] = row
+        if len(self.rows) > len(self.ids):
+            self._grow(len(self.rows))
+        return rows
+
+    def _grow(self, size):
+        """Make room for more players, doubling to keep appends cheap"""
+        extra = max(size, 2 * len(self.ids)) - len(self.ids)
+        self.ids = np.concatenate([self.ids, np.zeros(extra, "int64")])
+        self.names = np.concatenate([self.names, np.zeros(extra, "object")])
+        self.positions = np.concatenate([self.positions,
+                                         np.zeros(extra, "object")])
+        self.team_ids = np.concatenate([self.team_ids,
+                                        np.zeros(extra, "int64")])
+        self.last_date = np.concatenate([
+            self.last_date, np.full(extra, np.datetime64("NaT"),
+                                    dtype="datetime64[ns]")])
+        self.values = np.concatenate([
+            self.values, np.zeros((extra, self.depth, len(self.stats)))])
+        self.played = np.concatenate([
+            self.played, np.zeros((extra, self.depth), dtype=bool)])
+
+    def add(self, df):
+        """Shift the games of a box score table into the players' slots
+
+        :param df: Box score rows sorted by date
+        :type df: pandas.DataFrame
+        :return: False, without shifting anything, if one of the games is
+            older than its player's latest game
+        :rtype: bool
+        """
+        if not len(df.index):
+            return True
+        rows = self._player_rows(df["id"].tolist())
+        dates = df["date"].to_numpy(dtype="datetime64[ns]")
+        # NaT, for new players, never compares as later
+        if (dates < self.last_date[rows]).any():
+            return False
+        # Rows are sorted by date, so the last write of each player wins
+        self.ids[rows] = df["id"].to_numpy(dtype="int64")
+        self.names[rows] = df["name"].to_numpy(dtype="object")
+        self.positions[rows] = df["position"].to_numpy(dtype="object")
+        self.team_ids[rows] = df["team_id"].to_numpy(dtype="int64")
+        self.last_date[rows] = dates
+
+        values = df[self.stats].to_numpy(dtype="float64", na_value=np.nan)
+        # Number of newer games each player has in df.  Only the newest
+        # depth of them fit in the slots.
+        newer = pd.Series(rows).groupby(rows).cumcount(
+            ascending=False).to_numpy()
+        keep = newer < self.depth
+        rows, values, newer = rows[keep], values[keep], newer[keep]
+        # One shift per game, oldest first.  A player has at most one game
+        # in each pass, so every pass is a single vectorized shift.
+        for n in range(newer.max(), -1, -1):
+            in_pass = newer == n
+            r = rows[in_pass]
+            self.values[r, :-1] = self.values[r, 1:]
+            self.values[r, -1] = values[in_pass]
+            self.played[r, :-1] = self.played[r, 1:]
+            self.played[r, -1] = True
+        return True
+
+    def totals(self, window):
+        """Games played and stat totals over each player's last games
+
+        :param window: Number of games
+        :type window: int
+        :return: Games played (players) and totals (players x stats)
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+        size = len(self.rows)
+        gp = self.played[:size, -window:].sum(axis=1)
+        return gp, np.nansum(self.values[:size, -window:], axis=1)
+
+    def info(self):
+        size = len(self.rows)
+        return pd.DataFrame({"id": self.ids[:size],
+                             "name": self.names[:size],
+                             "position": self.positions[:size],
+                             "team_id": self.team_ids[:size]})
+
+
+class PlayerForm:
+    def __init__(self, windows=WINDOWS):
+        """
+        :param windows: Numbers of games to give the form over
+        :type windows: tuple(int)
+        """
+        self.windows = sorted(windows)
+        self.seasons = None
+        self.games = set()
+        self.history = []
+        self._reset()
+
+    def _reset(self):
+        depth = self.windows[-1]
+        self.last_skaters = _LastGames(SKATER_STATS, depth)
+        self.last_goalies = _LastGames(GOALIE_STATS, depth)
+
+    @classmethod
+    def from_store(cls, store, seasons=None, windows=WINDOWS):
+        """Load the box scores of a store
+
+        :param store: Store written by storage.sync_box_scores
+        :type store: nhl_scraper.storage.Store
+        :param seasons: Seasons to load, e.g. [20192020].  Defaults to all
+            of them.  Later calls to update keep to the same seasons.
+        :type seasons: list(int)
+        :param windows: Numbers of games to give the form over
+        :type windows: tuple(int)
+        :rtype: PlayerForm
+        """
+        form = cls(windows)
+        form.seasons = None if seasons is None else list(seasons)
+        form.update(store)
+        return form
+
+    def update(self, store):
+        """Add the games of a store that haven't been added yet
+
+        Only the rows of the new games are read.
+
+        :param store: Store written by storage.sync_box_scores
+        :type store: nhl_scraper.storage.Store
+        :return: Number of games added
+        :rtype: int
+        """
+        if not store.exists("skaters"):
+            return 0
+        filters = [] if self.seasons is None else \
+            [("season", "in", self.seasons)]
+        stored = store.read("skaters", columns=["gamePk"],
+                            filters=filters or None)
+        new_ids = sorted(set(stored["gamePk"].tolist()) - self.games)
+        if not new_ids:
+            return 0
+        filters = filters + [("gamePk", "in", new_ids)]
+        skaters = store.read("skaters", columns=KEY_COLUMNS + SKATER_STATS,
+                             filters=filters)
+        goalies = None
+        if store.exists("goalies"):
+            goalies = store.read("goalies",
+                                 columns=KEY_COLUMNS + GOALIE_STATS,
+                                 filters=filters)
+        return self.add(skaters, goalies)
+
+    def add(self, skaters, goalies=None):
+        """Add the box score tables of new games
+
+        Games that were already added are skipped.  Games are expected to
+        come in date order.  A game older than one of its players' latest
+        games is still added, by rebuilding the slots from every game added
+        so far, which is slower.
+
+        :param skaters: Skater table from boxscore.Normalizer
+        :type skaters: pandas.DataFrame
+        :param goalies: Goalie table from boxscore.Normalizer
+        :type goalies: pandas.DataFrame
+        :return: Number of games added
+        :rtype: int
+        """
+        skaters = self._new_rows(skaters, SKATER_STATS)
+        goalies = self._new_rows(goalies, GOALIE_STATS)
+        game_ids = set(skaters["gamePk"].tolist()) | \
+            set(goalies["gamePk"].tolist())
+        if not game_ids:
+            return 0
+        self.history.append((skaters, goalies))
+        if not (self.last_skaters.add(skaters) and
+                self.last_goalies.add(goalies)):
+            self._rebuild()
+        self.games.update(game_ids)
+        return len(game_ids)
+
+    def _new_rows(self, df, stats):
+        columns = KEY_COLUMNS + stats
+        if df is None:
+            return pd.DataFrame({c: [] for c in columns})
+        df = df.loc[~df["gamePk"].isin(self.games), columns]
+        return df.sort_values(["date", "gamePk"], kind="stable")
+
+    def _rebuild(self):
+        skaters, goalies = [
+            pd.concat(frames, ignore_index=True).sort_values(
+                ["date", "gamePk"], kind="stable")
+            for frames in zip(*self.history)]
+        self.history = [(skaters, goalies)]
+        self._reset()
+        self.last_skaters.add(skaters)
+        self.last_goalies.add(goalies)
+
+    def skaters(self, players=None, teams=None):
+        """Form of every skater over each window
+
+        :param players: Output of nhl.Scraper.players.  Skaters on a roster
+            get the roster's team instead of the team of their last game.
+        :type players: pandas.DataFrame
+        :param teams: Output of nhl.Scraper.teams, to add the team's
+            abbreviation
+        :type teams: pandas.DataFrame
+        :return: One row per skater with id, name, position, team_id (and
+            team), and for each window, e.g. 5: gp_5 and each of
+            SKATER_STATS per game played (goals_5, ..., toi_5)
+        :rtype: pandas.DataFrame
+        """
+        last = self.last_skaters
+        columns = {}
+        for window in self.windows:
+            gp, totals = last.totals(window)
+            columns["gp_{}".format(window)] = gp
+            per_game = _per_game(totals, gp)
+            for i, stat in enumerate(SKATER_STATS):
+                columns["{}_{}".format(stat, window)] = per_game[:, i]
+        return _join(last.info(), columns, players, teams)
+
+    def goalies(self, players=None, teams=None):
+        """Form of every goalie over each window
+
+        :param players: Output of nhl.Scraper.players.  Goalies on a roster
+            get the roster's team instead of the team of their last game.
+        :type players: pandas.DataFrame
+        :param teams: Output of nhl.Scraper.teams, to add the team's
+            abbreviation
+        :type teams: pandas.DataFrame
+        :return: One row per goalie with id, name, position, team_id (and
+            team), and for each window, e.g. 5: gp_5, each of GOALIE_STATS
+            per game played (shots_5, ..., toi_5) and the save percentage
+            sv_pct_5
+        :rtype: pandas.DataFrame
+        """
+        last = self.last_goalies
+        shots = GOALIE_STATS.index("shots")
+        saves = GOALIE_STATS.index("saves")
+        columns = {}
+        for window in self.windows:
+            gp, totals = last.totals(window)
+            columns["gp_{}".format(window)] = gp
+            per_game = _per_game(totals, gp)
+            for i, stat in enumerate(GOALIE_STATS):
+                columns["{}_{}".format(stat, window)] = per_game[:, i]
+            columns["sv_pct_{}".format(window)] = np.divide(
+                totals[:, saves], totals[:, shots],
+                out=np.full(len(gp), np.nan), where=totals[:, shots] > 0)
+        return _join(last.info(), columns, players, teams)
+
+
+def _per_game(totals, gp):
+    """Totals divided by games played, NaN for players without games"""
+    return np.divide(totals, gp[:, None],
+                     out=np.full(totals.shape, np.nan),
+                     where=gp[:, None] > 0)
+
+
+def _join(info, columns, players, teams):
+    if players is not None:
+        roster = players.drop_duplicates("playerId").set_index(
+            "playerId")["teamId"]
+        on_roster = info["id"].map(roster)
+        info["team_id"] = on_roster.fillna(info["team_id"]).astype("int64")
+    if teams is not None:
+        info["team"] = info["team_id"].map(
+            teams.set_index("id")["abbrev"])
+    return pd.concat([info, pd.DataFrame(columns)], axis=1)
@@ -0,0 +1,241 @@
+#!/usr/bin/python
+
+"""
+Live tracking of the games being played on a date.
+
+LiveTracker polls the day's schedule with linescores, and the boxscores of
+only the games that are in progress.  Boxscores are requested with
+If-None-Match / If-Modified-Since when the adapter supports it, and an
+unchanged boxscore is skipped without looking at its players.  Each player's
+counting stats are compared with the previous poll and only the players
+whose stats changed produce an event, so the work done per poll follows the
+number of changes rather than the number of players.
+
+The time between polls adapts to the state of the games: short near the
+end of a period, longer during intermissions and long while waiting for the
+first game to start.
+
+>>> tracker = LiveTracker(s)
+>>> tracker.run(print)                    # blocking, with a callback
+>>> async for event in tracker.events():  # or as an async iterator
+...     print(event)
+"""
+import asyncio
+import datetime
+import time
+from collections import namedtuple
+
+from nhl_scraper import boxscore, nhl
+
+# A player's counting stats that changed since the previous poll.  deltas
+# and totals are keyed by the column names used in boxscore.Normalizer.
+StatDelta = namedtuple("StatDelta", ["gamePk", "team_id", "player_id",
+                                     "name", "deltas", "totals"])
+# A change in a game's state, period, clock or score
+GameUpdate = namedtuple("GameUpdate", [
+    "gamePk", "state", "period", "time_remaining", "away_id", "away_goals",
+    "home_id", "home_goals"])
+
+SKATER_STATS = dict((key, col) for col, key in boxscore.SKATER_STATS)
+GOALIE_STATS = dict((key, col) for col, key in boxscore.GOALIE_STATS)
+
+
+def _clock_seconds(time_remaining):
+    """Seconds left in the period, or None if the clock isn't running"""
+    if not time_remaining or ":" not in time_remaining:
+        return None
+    minutes, _, seconds = time_remaining.partition(":")
+    return int(minutes) * 60 + int(seconds)
+
+
+class LiveTracker:
+    # Seconds between polls
+    FAST_INTERVAL = 10
+    LIVE_INTERVAL = 30
+    INTERMISSION_INTERVAL = 60
+    IDLE_INTERVAL = 300
+    # Poll at the fast interval with this many seconds left in a period
+    PERIOD_END_SECONDS = 120
+
+    def __init__(self, scraper, date=None, clock=time.time,
+                 sleep=time.sleep):
+        """
+        :param scraper: Scraper whose endpoint adapter is used for the
+            requests
+        :type scraper: nhl_scraper.nhl.Scraper
+        :param date: Date of the games to follow.  Defaults to today.
+        :type date: datetime.date
+        :param clock: Function returning the current time in seconds
+        :param sleep: Function to wait a number of seconds with
+        """
+        self.scraper = scraper
+        self.date = date or datetime.date.today()
+        self.clock = clock
+        self.sleep = sleep
+        self.games = {}
+        self.validators = {}
+        self.player_stats = {}
+        self.interval = self.LIVE_INTERVAL
+        self.done = False
+
+    @property
+    def ea(self):
+        return self.scraper.ea
+
+    def poll(self):
+        """Run one polling cycle
+
+        Sets interval to the number of seconds to wait before the next
+        cycle, and done once every game of the day is final.
+
+        :return: The events from this cycle, game updates first
+        :rtype: list
+        """
+        r = self.ea.schedule_endpoint(startDate=self.date.isoformat(),
+                                      endDate=self.date.isoformat(),
+                                      expand="schedule.linescore")
+        events = []
+        live = []
+        upcoming = []
+        for _, game in nhl._iter_games(r):
+            update = self._game_update(game)
+            if update != self.games.get(game["gamePk"]):
+                events.append(update)
+            was_live = self.games.get(game["gamePk"], update).state == "Live"
+            self.games[game["gamePk"]] = update
+            if game["status"]["detailedState"] in nhl.NOT_PLAYED_STATES:
+                # Still a Preview, but it won't start today
+                continue
+            if update.state == "Live" or \
+                    (update.state == "Final" and was_live):
+                # A game that just ended is polled once more for its final
+                # stats
+                live.append(game)
+            elif update.state == "Preview":
+                upcoming.append(game)
+        for game in live:
+            events.extend(self._poll_boxscore(game["gamePk"]))
+        self.interval = self._next_interval(live, upcoming)
+        self.done = not live and not upcoming
+        return events
+
+    def _game_update(self, game):
+        linescore = game.get("linescore", {})
+        return GameUpdate(
+            game["gamePk"], game["status"]["abstractGameState"],
+            linescore.get("currentPeriod"),
+            linescore.get("currentPeriodTimeRemaining"),
+            game["teams"]["away"]["team"]["id"],
+            game["teams"]["away"].get("score"),
+            game["teams"]["home"]["team"]["id"],
+            game["teams"]["home"].get("score"))
+
+    def _poll_boxscore(self, game_id):
+        if hasattr(self.ea, "boxscore_if_modified"):
+            etag, last_modified = self.validators.get(game_id, (None, None))
+            doc, etag, last_modified = self.ea.boxscore_if_modified(
+                game_id, etag, last_modified)
+            self.validators[game_id] = (etag, last_modified)
+            if doc is None:
+                return []
+        else:
+            doc = self.ea.boxscore_endpoint(game_id)
+        return self.diff(game_id, doc)
+
+    def diff(self, game_id, doc):
+        """Compare a boxscore with the previous one of the same game
+
+        :param game_id: gamePk of the game
+        :type game_id: int
+        :param doc: Boxscore JSON document
+        :return: A StatDelta for every player whose stats changed
+        :rtype: list(StatDelta)
+        """
+        events = []
+        for team in doc["teams"].values():
+            team_id = team["team"]["id"]
+            for player in team["players"].values():
+                stats = player["stats"]
+                if "goalieStats" in stats:
+                    raw, names = stats["goalieStats"], GOALIE_STATS
+                elif "skaterStats" in stats:
+                    raw, names = stats["skaterStats"], SKATER_STATS
+                else:
+                    continue
+                key = (game_id, player["person"]["id"])
+                previous = self.player_stats.get(key)
+                if previous is not None and previous[0] == raw:
+                    continue
+                totals = {col: raw[k] for k, col in names.items() if k in raw}
+                before = previous[1] if previous is not None else {}
+                deltas = {col: value - before.get(col, 0)
+                          for col, value in totals.items()
+                          if value != before.get(col, 0)}
+                self.player_stats[key] = (dict(raw), totals)
+                if deltas:
+                    events.append(StatDelta(game_id, team_id,
+                                            player["person"]["id"],
+                                            player["person"]["fullName"],
+                                            deltas, totals))
+        return events
+
+    def _next_interval(self, live, upcoming):
+        if live:
+            intervals = []
+            for game in live:
+                linescore = game.get("linescore", {})
+                if linescore.get("intermissionInfo", {}) \
+                        .get("inIntermission"):
+                    intervals.append(self.INTERMISSION_INTERVAL)
+                    continue
+                remaining = _clock_seconds(
+                    linescore.get("currentPeriodTimeRemaining"))
+                if remaining is None or remaining <= self.PERIOD_END_SECONDS:
+                    intervals.append(self.FAST_INTERVAL)
+                else:
+                    intervals.append(self.LIVE_INTERVAL)
+            return min(intervals)
+        if upcoming:
+            starts = [datetime.datetime.strptime(
+                g["gameDate"], "%Y-%m-%dT%H:%M:%SZ").replace(
+                    tzinfo=datetime.timezone.utc).timestamp()
+                for g in upcoming]
+            until_start = min(starts) - self.clock()
+            return max(self.FAST_INTERVAL,
+                       min(self.IDLE_INTERVAL, until_start))
+        return self.IDLE_INTERVAL
+
+    def run(self, callback, max_polls=None):
+        """Poll until every game is final, passing each event to callback
+
+        :param callback: Called with each StatDelta and GameUpdate
+        :param max_polls: Stop after this many polls
+        :type max_polls: int
+        """
+        polls = 0
+        while True:
+            for event in self.poll():
+                callback(event)
+            polls += 1
+            if self.done or (max_polls is not None and polls >= max_polls):
+                return
+            self.sleep(self.interval)
+
+    async def events(self, max_polls=None):
+        """Poll until every game is final, yielding each event
+
+        The requests are made on the default executor so the event loop
+        isn't blocked.
+
+        :param max_polls: Stop after this many polls
+        :type max_polls: int
+        """
+        loop = asyncio.get_running_loop()
+        polls = 0
+        while True:
+            for event in await loop.run_in_executor(None, self.poll):
+                yield event
+            polls += 1
+            if self.done or (max_polls is not None and polls >= max_polls):
+                return
+            await asyncio.sleep(self.interval)
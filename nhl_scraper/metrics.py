@@ -0,0 +1,274 @@
+#!/usr/bin/python
+
+"""
+Instrumentation hooks for the adapters and scrapers.
+
+The adapters and scrapers report what they do as events, which are passed
+to every registered callback.  Nothing is measured while no callback is
+registered.  The kinds of events are:
+
+* latency: seconds taken by a request, named after the endpoint
+* bytes: size of a response body, named after the endpoint
+* cache: one lookup in a cache, with a value of 1 for a hit and 0 for a miss
+* parse: seconds taken to turn a response into a table
+* rows: number of rows in a table that was built
+
+Summary collects the events into histograms and prints a report, and
+PrometheusExporter and StatsdExporter forward them to monitoring.
+
+>>> from nhl_scraper import metrics
+>>> summary = metrics.Summary()
+>>> metrics.add_callback(summary)
+>>> s.games_count(start, end)
+>>> print(summary.report())
+"""
+import bisect
+import contextlib
+import socket
+import threading
+import time
+from collections import namedtuple
+
+Event = namedtuple("Event", ["kind", "name", "value", "tags"])
+
+# Upper bounds of the histogram buckets for events measured in seconds
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+
+_callbacks = []
+_lock = threading.Lock()
+
+
+def add_callback(callback):
+    """Register a function to be called with every Event"""
+    with _lock:
+        _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    with _lock:
+        _callbacks.remove(callback)
+
+
+def enabled():
+    """Return True if anything is listening for events"""
+    return bool(_callbacks)
+
+
+def emit(kind, name, value, **tags):
+    """Pass an event to all of the callbacks
+
+    :param kind: One of latency, bytes, cache, parse or rows
+    :type kind: str
+    :param name: What was measured, e.g. the endpoint or the cache
+    :type name: str
+    :param value: Measurement
+    :type value: float
+    """
+    if not _callbacks:
+        return
+    event = Event(kind, name, value, tags)
+    for callback in list(_callbacks):
+        callback(event)
+
+
+@contextlib.contextmanager
+def timer(kind, name, **tags):
+    """Emit the number of seconds the with block takes
+
+    The time is only emitted if the block doesn't raise.
+    """
+    if not _callbacks:
+        yield
+        return
+    start = time.perf_counter()
+    yield
+    emit(kind, name, time.perf_counter() - start, **tags)
+
+
+def cache_lookup(name, hit):
+    """Emit a hit or a miss of a cache"""
+    emit("cache", name, 1 if hit else 0)
+
+
+class Histogram:
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        """
+        :param buckets: Upper bound of each bucket, in increasing order.
+            Values over the last bound fall in an extra overflow bucket.
+        :type buckets: tuple(float)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket holding it
+
+        :param q: Quantile between 0 and 1
+        :type q: float
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Summary:
+    """Callback keeping an in-process summary of every event"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.totals = {}
+        self.hits = {}
+        self.lookups = {}
+
+    def __call__(self, event):
+        key = (event.kind, event.name)
+        with self.lock:
+            if event.kind in ("latency", "parse"):
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].observe(event.value)
+            elif event.kind == "cache":
+                self.lookups[event.name] = self.lookups.get(event.name, 0) + 1
+                self.hits[event.name] = \
+                    self.hits.get(event.name, 0) + event.value
+            else:
+                self.totals[key] = self.totals.get(key, 0) + event.value
+
+    def hit_ratio(self, name):
+        """Fraction of the lookups in a cache that were hits"""
+        lookups = self.lookups.get(name, 0)
+        return self.hits.get(name, 0) / lookups if lookups else None
+
+    def report(self):
+        """Return the summary as a printable table
+
+        :rtype: str
+        """
+        lines = ["{:<8} {:<24} {:>7} {:>10} {:>10} {:>10}".format(
+            "kind", "name", "count", "mean ms", "p95 ms", "max ms")]
+        with self.lock:
+            for (kind, name), h in sorted(self.histograms.items()):
+                lines.append(
+                    "{:<8} {:<24} {:>7} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+                        kind, name, h.count, h.mean * 1000,
+                        h.quantile(0.95) * 1000, h.max * 1000))
+            for (kind, name), total in sorted(self.totals.items()):
+                lines.append("{:<8} {:<24} {:>7}".format(kind, name, total))
+            for name in sorted(self.lookups):
+                lines.append("{:<8} {:<24} {:>7} {:>9.0%} hit".format(
+                    "cache", name, self.lookups[name],
+                    self.hits[name] / self.lookups[name]))
+        return "\n".join(lines)
+
+
+class PrometheusExporter:
+    """Callback exposing the events in the Prometheus text format
+
+    Serve render() from the application's /metrics endpoint.
+    """
+    def __init__(self, prefix="nhl_scraper"):
+        self.prefix = prefix
+        self.summary = Summary()
+
+    def __call__(self, event):
+        self.summary(event)
+
+    def render(self):
+        """
+        :return: Metrics in the Prometheus exposition format
+        :rtype: str
+        """
+        s = self.summary
+        lines = []
+        with s.lock:
+            for kind in ("latency", "parse"):
+                metric = "{}_{}_seconds".format(self.prefix, kind)
+                lines.append("# TYPE {} histogram".format(metric))
+                for (k, name), h in sorted(s.histograms.items()):
+                    if k != kind:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append('{}_bucket{{name="{}",le="{}"}} {}'
+                                     .format(metric, name, bound,
+                                             cumulative))
+                    lines.append('{}_bucket{{name="{}",le="+Inf"}} {}'
+                                 .format(metric, name, h.count))
+                    lines.append('{}_sum{{name="{}"}} {}'.format(
+                        metric, name, h.sum))
+                    lines.append('{}_count{{name="{}"}} {}'.format(
+                        metric, name, h.count))
+            for kind in ("bytes", "rows"):
+                metric = "{}_{}_total".format(self.prefix, kind)
+                lines.append("# TYPE {} counter".format(metric))
+                for (k, name), total in sorted(s.totals.items()):
+                    if k == kind:
+                        lines.append('{}{{name="{}"}} {}'.format(
+                            metric, name, total))
+            for kind, counts in (("hits", s.hits), ("lookups", s.lookups)):
+                metric = "{}_cache_{}_total".format(self.prefix, kind)
+                lines.append("# TYPE {} counter".format(metric))
+                for name in sorted(counts):
+                    lines.append('{}{{name="{}"}} {}'.format(
+                        metric, name, counts[name]))
+        return "\n".join(lines) + "\n"
+
+
+class StatsdExporter:
+    """Callback sending each event to a StatsD server over UDP"""
+    TYPES = {"latency": "ms", "parse": "ms", "bytes": "c", "rows": "c",
+             "cache": "c"}
+
+    def __init__(self, host="localhost", port=8125, prefix="nhl_scraper"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def format(self, event):
+        """Return the StatsD line for an event
+
+        :rtype: str
+        """
+        name = event.name.replace(":", "_").replace("|", "_")
+        if event.kind == "cache":
+            return "{}.cache.{}.{}:1|c".format(
+                self.prefix, name, "hit" if event.value else "miss")
+        value = event.value
+        if self.TYPES[event.kind] == "ms":
+            value = round(value * 1000, 3)
+        return "{}.{}.{}:{}|{}".format(self.prefix, event.kind, name, value,
+                                       self.TYPES[event.kind])
+
+    def __call__(self, event):
+        try:
+            self.sock.sendto(self.format(event).encode("utf-8"),
+                             self.address)
+        except OSError:
+            # Metrics are best effort and must never break a scrape
+            pass
+
+    def close(self):
+        self.sock.close()
@@ -1,16 +1,111 @@
 #!/usr/bin/python
 
-import objectpath
-import requests
+"""
+Scraper of the NHL stats API.
+
+Importing this module is kept cheap for short lived workers.  pandas is
+only loaded when a DataFrame is built, the schedule index (and numpy) when
+schedule_index is used, and requests when the first request is sent.  With
+format="records" games_count, games and players never need pandas.
+"""
 import json
 import datetime
-import pandas as pd
+import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs
+from nhl_scraper import boxscore, metrics, records
+
+logger = logging.getLogger(__name__)
+
+# Games in these states are not going to be played on their listed date, so
+# they aren't counted by games_count or the schedule index
+NOT_PLAYED_STATES = ("Postponed",)
+
+
+def _as_date(date):
+    """Strip the time component off of a datetime.
+
+    Cache lookups are keyed by datetime.date so that callers can pass either
+    a date or a datetime.
+    """
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    return date
+
+
+def _date_runs(dates, max_days):
+    """Group a sorted list of dates into contiguous (start, end) ranges.
+
+    :param dates: Sorted dates to group
+    :type dates: list(datetime.date)
+    :param max_days: Maximum number of days in any one range
+    :type max_days: int
+    :return: Inclusive (start, end) tuples covering all of the dates
+    :rtype: list(tuple)
+    """
+    runs = []
+    for date in dates:
+        if runs and (date - runs[-1][1]).days == 1 and \
+                (date - runs[-1][0]).days < max_days:
+            runs[-1][1] = date
+        else:
+            runs.append([date, date])
+    return [(start, end) for start, end in runs]
+
+
+def _endpoint_kind(api):
+    """Classify an API call by the endpoint it goes to
+
+    :param api: API that was called
+    :type api: str
+    :return: One of boxscore, schedule, roster or teams
+    :rtype: str
+    """
+    if api.startswith("game/") and api.endswith("/boxscore"):
+        return "boxscore"
+    if api.startswith("schedule"):
+        return "schedule"
+    if "team.roster" in api:
+        return "roster"
+    return "teams"
+
+
+def _iter_games(r):
+    """Yield (date, game) for every game in a schedule response
+
+    :param r: Schedule JSON document
+    :return: Date of the game and its JSON document
+    :rtype: generator of tuple(datetime.date, dict)
+    """
+    for game_date in r.get("dates", []):
+        day = datetime.date.fromisoformat(game_date["date"])
+        for game in game_date["games"]:
+            yield day, game
 
 
 class EndpointAdapter:
     NHL_URL = "https://statsapi.web.nhl.com/api/v1"
 
+    def __init__(self, session=None):
+        """
+        :param session: HTTP session to send requests through.  Defaults to
+            the session shared by all of the adapters.
+        :type session: nhl_scraper.session.Session
+        """
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from nhl_scraper.session import default_session
+            self._session = default_session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
     def get(self, api):
         """Send an API request to the URI and return the response as JSON
 
@@ -19,22 +114,61 @@ class EndpointAdapter:
         :return: JSON document of the reponse
         :raises: RuntimeError if any response comes back with an error
         """
-        response = requests.get("{}/{}".format(self.NHL_URL, api),
-                                params={'format': 'json'})
-        jresp = response.json()
+        jresp = self._request(api).json()
         if "error" in jresp:
             raise RuntimeError(json.dumps(jresp))
         return jresp
 
+    def _request(self, api, headers=None):
+        kind = _endpoint_kind(api)
+        with metrics.timer("latency", kind):
+            response = self.session.get("{}/{}".format(self.NHL_URL, api),
+                                        params={'format': 'json'},
+                                        headers=headers or {})
+        metrics.emit("bytes", kind, len(response.content))
+        logger.debug("GET %s: %s, %d bytes", api, response.status_code,
+                     len(response.content))
+        return response
+
+    def boxscore_if_modified(self, game_id, etag=None, last_modified=None):
+        """Fetch a boxscore unless it hasn't changed since the last fetch
+
+        :param game_id: gamePk of the game
+        :type game_id: int
+        :param etag: ETag of the copy we already have
+        :type etag: str
+        :param last_modified: Last-Modified of the copy we already have
+        :type last_modified: str
+        :return: Boxscore, ETag and Last-Modified.  The boxscore is None if
+            the server says our copy is still current.
+        :rtype: tuple(dict, str, str)
+        """
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        response = self._request("game/{}/boxscore".format(game_id), headers)
+        if response.status_code == 304:
+            return None, etag, last_modified
+        jresp = response.json()
+        if "error" in jresp:
+            raise RuntimeError(json.dumps(jresp))
+        return (jresp, response.headers.get("ETag"),
+                response.headers.get("Last-Modified"))
+
     def teams_endpoint(self):
         return self.get("teams")
 
     def schedule_endpoint(self, **params):
+        return self.get(self.schedule_api(**params))
+
+    @staticmethod
+    def schedule_api(**params):
         parameters = "schedule?"
         for paramater in params.keys():
             parameters = parameters + f"&{paramater}={{{paramater}}}"
-        get_url = parameters.format(**params)
-        return self.get(get_url)
+        return parameters.format(**params)
 
     def players_endpoint(self, team_ids):
         team_str = ",".join(str(n) for n in team_ids)
@@ -44,12 +178,129 @@ class EndpointAdapter:
         return self.get("game/{}/boxscore".format(game_id))
 
 
+class CachingEndpointAdapter(EndpointAdapter):
+    """An EndpointAdapter that keeps its responses in a ResponseCache.
+
+    How long a response is kept depends on the kind of endpoint it came
+    from.  The TTLS are in seconds, and None means the response never
+    expires:
+
+    * boxscore: boxscores of games known to be final
+    * boxscore_live: boxscores of games that may still be in progress
+    * schedule_past: schedules that ended before today with every game final
+    * schedule: any other schedule
+    * roster: teams requests that expand the rosters
+    * teams: the team list
+
+    A boxscore is only known to be final if the game was seen in a schedule
+    response fetched through an adapter on the same cache.  The final games
+    are kept in the cache's database, so a later process can get their
+    boxscores without fetching a schedule first.
+
+    >>> from nhl_scraper.cache import ResponseCache
+    >>> s = Scraper()
+    >>> s.set_endpoint_adapter(CachingEndpointAdapter(
+    ...     ResponseCache("nhl.cache.db")))
+    """
+    TTLS = {"boxscore": None,
+            "boxscore_live": 60,
+            "schedule_past": None,
+            "schedule": 5 * 60,
+            "roster": 6 * 60 * 60,
+            "teams": 24 * 60 * 60}
+
+    def __init__(self, cache, ttls=None, session=None):
+        """
+        :param cache: Store to keep the responses in
+        :type cache: nhl_scraper.cache.ResponseCache
+        :param ttls: Overrides for any of the default TTLS
+        :type ttls: dict
+        :param session: HTTP session to send requests through
+        :type session: nhl_scraper.session.Session
+        """
+        super().__init__(session)
+        self.cache = cache
+        self.ttls = dict(self.TTLS, **(ttls or {}))
+        self.final_games = cache.final_games()
+
+    def get(self, api):
+        jresp = self.cache.get(api)
+        metrics.cache_lookup("response_cache", jresp is not None)
+        if jresp is None:
+            jresp = super().get(api)
+            self._learn_final_games(jresp)
+            ttl = self.ttl(api, jresp)
+            if ttl is None or ttl > 0:
+                self.cache.put(api, jresp, ttl)
+        else:
+            self._learn_final_games(jresp)
+        return jresp
+
+    def endpoint_kind(self, api):
+        """Classify an API call into one of the keys of TTLS
+
+        :param api: API that was called
+        :type api: str
+        :return: Kind of endpoint
+        :rtype: str
+        """
+        return _endpoint_kind(api)
+
+    def ttl(self, api, jresp):
+        """Return the number of seconds to keep a response for
+
+        :param api: API that was called
+        :type api: str
+        :param jresp: Response to the API call
+        :return: Seconds until expiry, or None if the response never expires
+        """
+        kind = self.endpoint_kind(api)
+        if kind == "boxscore":
+            game_id = int(api.split("/")[1])
+            if game_id not in self.final_games:
+                kind = "boxscore_live"
+        elif kind == "schedule" and self._is_past_schedule(api, jresp):
+            kind = "schedule_past"
+        return self.ttls[kind]
+
+    def _is_past_schedule(self, api, jresp):
+        params = parse_qs(api.partition("?")[2])
+        end_date = params.get("endDate", params.get("date"))
+        if end_date is None:
+            return False
+        end_date = datetime.date.fromisoformat(end_date[0][:10])
+        if end_date >= datetime.date.today():
+            return False
+        return all(game["status"]["abstractGameState"] == "Final"
+                   for game_date in jresp.get("dates", [])
+                   for game in game_date["games"])
+
+    def _learn_final_games(self, jresp):
+        final = {game["gamePk"]
+                 for game_date in jresp.get("dates", [])
+                 for game in game_date.get("games", [])
+                 if game["status"]["abstractGameState"] == "Final"}
+        new = final - self.final_games
+        if new:
+            self.final_games.update(new)
+            self.cache.add_final_games(sorted(new))
+
+
 class Scraper:
+    # Maximum number of days requested in a single schedule call
+    SCHEDULE_CHUNK_DAYS = 120
+    BOX_SCORE_COLUMNS = ['name', 'team_id', 'id', 'goals', 'assists', 'so',
+                         'shots', 'saves', 'pim', 'decision', 'hits', 'toi',
+                         'fw', '+/-']
+
     def __init__(self):
         self.ea = EndpointAdapter()
         self.teams_cache = None
         self.schedule_cache = {}
         self.players_cache = None
+        self.players_df = None
+        self.game_dates = {}
+        self.schedule_index_cache = None
 
     def set_endpoint_adapter(self, ea):
         self.ea = ea
@@ -94,18 +345,22 @@ class Scraper:
         29  53         Coyotes       Arizona    ARI
         30  54  Golden Knights         Vegas    VGK
         """
+        metrics.cache_lookup("teams_cache", self.teams_cache is not None)
         if self.teams_cache is None:
-            r = self.ea.teams_endpoint()
-            t = objectpath.Tree(r)
-            colmap = {"id": "id", "teamName": "name", "locationName": "city",
-                      "abbreviation": "abbrev"}
-            path = "$..teams.({})".format(",".join(colmap.keys()))
-            data = t.execute(path)
-            df = pd.DataFrame(data=data, columns=colmap.keys())
-            self.teams_cache = df.rename(columns=colmap)
+            self.teams_cache = self._parse_teams(self.ea.teams_endpoint())
         return self.teams_cache
 
-    def games_count(self, start_date, end_date):
+    def _parse_teams(self, r):
+        colmap = {"id": "id", "teamName": "name", "locationName": "city",
+                  "abbreviation": "abbrev"}
+        import pandas as pd
+        with metrics.timer("parse", "teams"):
+            data = [[team[key] for key in colmap] for team in r["teams"]]
+            df = pd.DataFrame(data=data, columns=list(colmap.values()))
+        metrics.emit("rows", "teams", len(df.index))
+        return df
+
+    def games_count(self, start_date, end_date, format='dict'):
         """Returns a count of games for each team between a range of dates.
 
         The range of dates is inclusive.  The result is a dictionary, where the
@@ -116,6 +371,9 @@ class Scraper:
         :type start_date: datetime.datetime
         :param end_date: Ending date (inclusive)
         :type end_date: datetime.datetime
+        :param format: "dict" for a dict, or "pandas" for a Series indexed
+            by team ID
+        :type format: str
         :return: dict of keys (teamID) to values (number of games played)
         :rtype: defaultdict
 
@@ -125,9 +383,30 @@ class Scraper:
              14: 3, 52: 3, 3: 2, 7: 2, 5: 2, 8: 2, 12: 3, 30: 2, 18: 2,
              6: 2, 25: 3, 20: 2, 21: 2, 53: 2, 24: 2, 16: 1, 4: 1, 1: 2,
              2: 2, 29: 2, 17: 2, 26: 1})
+        If a schedule index covering the range has been built with
+        schedule_index, the counts come from the index.
         """ # noqa
+        if format not in ('dict', 'pandas'):
+            raise ValueError("Supported formats are: dict,pandas")
+        return self._format_games_count(
+            self._games_count(start_date, end_date), format)
+
+    def _format_games_count(self, tot_gc, format):
+        if format == 'pandas':
+            import pandas as pd
+            return pd.Series(tot_gc, name="games", dtype="int64") \
+                .rename_axis("team_id")
+        return tot_gc
+
+    def _games_count(self, start_date, end_date):
         if start_date > end_date:
             raise RuntimeError("End date must be beyond start")
+        index = self.schedule_index_cache
+        if index is not None and index.covers(start_date, end_date):
+            tot_gc = defaultdict(int)
+            tot_gc.update(index.games_count(start_date, end_date))
+            return tot_gc
+        self._fill_schedule_cache(start_date, end_date)
         cur_date = start_date
         tot_gc = defaultdict(int)
         while cur_date <= end_date:
@@ -137,107 +416,502 @@ class Scraper:
             cur_date = cur_date + datetime.timedelta(days=1)
         return tot_gc
 
-    def players(self):
+    def players(self, format='pandas'):
         """Returns the full list of all players in the NHL.
 
         Each player is returned with their teamID and playerID.
 
+        The frame is built once and reused by later calls.  Use
+        refresh_players to pick up roster moves.
+
+        :param format: "pandas" for a DataFrame, or "records" for a list of
+            dicts with the same keys as the DataFrame's columns
+        :type format: str
         :return: All players
         :rtype: pandas.DataFrame
         """
-        if self.players_cache is None:
-            team_df = self.teams()
-            self.players_cache = self.ea.players_endpoint(
-                team_df["id"].tolist())
+        if format == 'records':
+            metrics.cache_lookup("players_cache",
+                                 self.players_cache is not None)
+            if self.players_cache is None:
+                self.players_cache = self.ea.players_endpoint(
+                    self._team_ids())
+            return self._player_records(self.players_cache)
+        elif format != 'pandas':
+            raise ValueError("Supported formats are: pandas,records")
+        metrics.cache_lookup("players_cache", self.players_df is not None)
+        if self.players_df is None:
+            if self.players_cache is None:
+                team_df = self.teams()
+                self.players_cache = self.ea.players_endpoint(
+                    team_df["id"].tolist())
+            self.players_df = self._parse_players(self.players_cache)
+        return self.players_df
 
-        columns = ["teamId", "playerId", "name", "position"]
+    def _team_ids(self):
+        """IDs of all of the teams, without building the teams frame"""
+        if self.teams_cache is not None:
+            return self.teams_cache["id"].tolist()
+        return [team["id"] for team in self.ea.teams_endpoint()["teams"]]
+
+    def refresh_players(self, team_ids=None):
+        """Re-pull rosters and apply the changes to the players list.
+
+        :param team_ids: Teams whose rosters to re-pull.  Defaults to all of
+            the teams.
+        :type team_ids: list
+        :return: Roster moves found.  Each move is a dict with the keys
+            type ("add", "remove" or "team_change"), playerId, name,
+            fromTeamId and toTeamId.  A player that leaves one of the
+            re-pulled teams for a team that wasn't re-pulled shows up as a
+            "remove".
+        :rtype: list(dict)
+        """
+        if team_ids is None:
+            team_ids = self.teams()["id"].tolist()
+        self.players()
+        return self._apply_rosters(team_ids,
+                                   self.ea.players_endpoint(team_ids))
+
+    def _apply_rosters(self, team_ids, r):
+        import pandas as pd
+        old = self.players_df
+        new = self._parse_players(r)
+        refreshed = old["teamId"].isin(team_ids)
+        old_by_id = old.drop_duplicates("playerId").set_index("playerId")
+        old_refreshed = old[refreshed].set_index("playerId")
+        moves = []
+        for row in new.itertuples(index=False):
+            if row.playerId not in old_by_id.index:
+                moves.append(self._roster_move("add", row.playerId, row.name,
+                                               None, row.teamId))
+            else:
+                from_team = old_by_id.at[row.playerId, "teamId"]
+                if from_team != row.teamId:
+                    moves.append(self._roster_move(
+                        "team_change", row.playerId, row.name, from_team,
+                        row.teamId))
+        new_ids = set(new["playerId"])
+        for player_id, row in old_refreshed.iterrows():
+            if player_id not in new_ids:
+                moves.append(self._roster_move(
+                    "remove", player_id, row["name"], row["teamId"], None))
+
+        keep = ~refreshed & ~old["playerId"].isin(new_ids)
+        self.players_df = pd.concat([old[keep], new], ignore_index=True)
+        self._patch_players_cache(team_ids, r, new_ids)
+        return moves
+
+    def _roster_move(self, type, player_id, name, from_team, to_team):
+        return {"type": type, "playerId": int(player_id), "name": name,
+                "fromTeamId": None if from_team is None else int(from_team),
+                "toTeamId": None if to_team is None else int(to_team)}
+
+    def _patch_players_cache(self, team_ids, r, new_ids):
+        """Keep the raw roster JSON in line with players_df"""
+        teams = [t for t in self.players_cache["teams"]
+                 if t["id"] not in team_ids]
+        for team in teams:
+            team["roster"]["roster"] = [
+                p for p in team["roster"]["roster"]
+                if p["person"]["id"] not in new_ids]
+        self.players_cache = {"teams": teams + r["teams"]}
+
+    def _player_records(self, r):
         all_players = []
-        for team in self.players_cache["teams"]:
+        for team in r["teams"]:
             team_id = team["id"]
             for plyr in team["roster"]["roster"]:
-                player_id = plyr["person"]["id"]
-                player_name = plyr["person"]["fullName"]
-                position = plyr["position"]["abbreviation"]
-                all_players.append({columns[0]: team_id,
-                                    columns[1]: player_id,
-                                    columns[2]: player_name,
-                                    columns[3]: position})
-        return pd.DataFrame(data=all_players, columns=columns)
+                all_players.append({
+                    "teamId": team_id,
+                    "playerId": plyr["person"]["id"],
+                    "name": plyr["person"]["fullName"],
+                    "position": plyr["position"]["abbreviation"]})
+        return all_players
+
+    def _parse_players(self, r):
+        import pandas as pd
+        columns = ["teamId", "playerId", "name", "position"]
+        with metrics.timer("parse", "players"):
+            df = pd.DataFrame(data=self._player_records(r), columns=columns)
+        metrics.emit("rows", "players", len(df.index))
+        return df
+
+    def schedule_index(self, start_date=None, end_date=None, season=None):
+        """Returns an index of the schedule for fast per-team lookups.
+
+        The index is built from one schedule pull (chunked like games_count)
+        and reused by later calls, and by games_count, as long as it covers
+        the dates asked for.  Use refresh_schedule to pick up postponed and
+        rescheduled games.
+
+        :param start_date: Starting date
+        :type start_date: datetime.datetime
+        :param end_date: Ending date (inclusive)
+        :type end_date: datetime.datetime
+        :param season: Season to index instead of a date range, e.g.
+            "20192020"
+        :type season: str
+        :rtype: nhl_scraper.schedule.ScheduleIndex
+        """
+        from nhl_scraper.schedule import ScheduleIndex
+        index = self.schedule_index_cache
+        if season is not None:
+            r = self.ea.schedule_endpoint(season=season)
+            self.schedule_index_cache = ScheduleIndex.from_schedule(r)
+            self._game_dates(r)
+            return self.schedule_index_cache
+        if start_date is None or end_date is None:
+            if index is None:
+                raise ValueError("Pass either a season or a date range")
+            return index
+        if index is not None:
+            if index.covers(start_date, end_date):
+                return index
+            start_date = min(_as_date(start_date), index.start_date)
+            end_date = max(_as_date(end_date), index.end_date)
+        index = ScheduleIndex(_as_date(start_date), _as_date(end_date))
+        for r in self._schedule_chunks(start_date, end_date):
+            index.update(r)
+        self.schedule_index_cache = index
+        return index
+
+    def refresh_schedule(self, start_date, end_date):
+        """Re-pull part of the schedule and apply the changes to the index.
+
+        The per-date schedule cache is refreshed for the range too.
+
+        :param start_date: Starting date
+        :type start_date: datetime.datetime
+        :param end_date: Ending date (inclusive)
+        :type end_date: datetime.datetime
+        """
+        index = self.schedule_index_cache
+        for chunk_start, chunk_end, r in self._schedule_chunk_responses(
+                start_date, end_date):
+            if index is not None:
+                # Dates that no longer have games aren't in the response
+                index.clear(chunk_start, chunk_end)
+                index.update(r)
+
+    def _schedule_chunks(self, start_date, end_date, **params):
+        """Fetch every date in a range, caching each chunk as it arrives"""
+        for _, _, r in self._schedule_chunk_responses(start_date, end_date,
+                                                      **params):
+            yield r
+
+    def _schedule_chunk_responses(self, start_date, end_date, **params):
+        """Like _schedule_chunks, with the first and last date of each"""
+        dates = []
+        cur_date = _as_date(start_date)
+        while cur_date <= _as_date(end_date):
+            dates.append(cur_date)
+            cur_date = cur_date + datetime.timedelta(days=1)
+        for chunk_start, chunk_end in _date_runs(dates,
+                                                 self.SCHEDULE_CHUNK_DAYS):
+            r = self.ea.schedule_endpoint(startDate=chunk_start.isoformat(),
+                                          endDate=chunk_end.isoformat(),
+                                          **params)
+            self._cache_schedule(chunk_start, chunk_end, r)
+            self._game_dates(r)
+            yield chunk_start, chunk_end, r
 
     def _teams_playing_one_day(self, date):
-        if date not in self.schedule_cache:
-            r = self.ea.schedule_endpoint(date=date)
-            t = objectpath.Tree(r)
-            data = t.execute("$..dates[0]..games.teams..(id)")
-            self.schedule_cache[date] = []
-            for team in data:
-                self.schedule_cache[date].append(team["id"])
-        return self.schedule_cache[date]
+        day = _as_date(date)
+        if day not in self.schedule_cache:
+            self._fill_schedule_cache(day, day)
+        return self.schedule_cache[day]
+
+    def _fill_schedule_cache(self, start_date, end_date):
+        """Populate the schedule cache for every date in a range.
+
+        Only the dates that are not already cached are requested.  Each
+        contiguous run of missing dates is fetched with a startDate/endDate
+        schedule call, split into chunks of at most SCHEDULE_CHUNK_DAYS.
+        Dates that come back without any games are cached as empty lists so
+        that later queries over the same range don't go back to the API.
+
+        :param start_date: Starting date
+        :type start_date: datetime.date
+        :param end_date: Ending date (inclusive)
+        :type end_date: datetime.date
+        """
+        for chunk_start, chunk_end in self._missing_schedule_ranges(
+                start_date, end_date):
+            r = self.ea.schedule_endpoint(startDate=chunk_start.isoformat(),
+                                          endDate=chunk_end.isoformat())
+            self._cache_schedule(chunk_start, chunk_end, r)
+
+    def _missing_schedule_ranges(self, start_date, end_date):
+        missing = []
+        cur_date = _as_date(start_date)
+        while cur_date <= _as_date(end_date):
+            cached = cur_date in self.schedule_cache
+            metrics.cache_lookup("schedule_cache", cached)
+            if not cached:
+                missing.append(cur_date)
+            cur_date = cur_date + datetime.timedelta(days=1)
+        return _date_runs(missing, self.SCHEDULE_CHUNK_DAYS)
+
+    def _cache_schedule(self, start_date, end_date, r):
+        cur_date = start_date
+        while cur_date <= end_date:
+            self.schedule_cache[cur_date] = []
+            cur_date = cur_date + datetime.timedelta(days=1)
+        for day, game in _iter_games(r):
+            if game["status"]["detailedState"] in NOT_PLAYED_STATES:
+                continue
+            self.schedule_cache.setdefault(day, []).extend(
+                game["teams"][side]["team"]["id"]
+                for side in ("away", "home"))
 
     def box_scores(self, game_id, team_id=None, date_range=None, format='pandas'):
-        if format == 'json':
-            return self.ea.boxscore_endpoint(game_id)
-        elif format == 'pandas':
-            columns = ['name', 'team_id', 'id']
-            player_stats = ['goals', 'assists', 'so', 'shots', 'saves','pim','decision','hits','toi','fw','+/-']
-            player_dict = []
-            r = self.ea.boxscore_endpoint(game_id)
-            for team in r['teams'].values():
-                players = team['players'].values()
-                for player in players:
-                    player_info = {}
-                    player_info['name'] = player['person']['fullName']
-                    player_info['id'] = player['person']['id']
-                    player_info['team_id'] = team['team']['id']
-                    if player['position']['code'] == 'G':
-                        the_stats = player['stats']['goalieStats']
-                        player_info[player_stats[0]] = the_stats['goals']
-                        player_info[player_stats[1]] = the_stats['assists']
-                        player_info[player_stats[2]] = "not implemented"
-                        player_info[player_stats[3]] = the_stats['shots']
-                        player_info[player_stats[4]] = the_stats["saves"]
-                        player_info[player_stats[5]] = the_stats['pim']
-                        player_info[player_stats[6]] = the_stats['decision']
-                        player_info[player_stats[8]] = the_stats['timeOnIce']
-                        player_dict.append(player_info)
-                    elif player['position']['code'] in ['C','LW','RW','D']:
-                        the_stats = player['stats']['skaterStats']
-                        player_info[player_stats[0]] = the_stats['goals']
-                        player_info[player_stats[1]] = the_stats['assists']
-                        player_info[player_stats[3]] = the_stats['shots']
-                        player_info[player_stats[5]] = the_stats['penaltyMinutes']
-                        player_info[player_stats[7]] = the_stats['hits']
-                        player_info[player_stats[8]] = the_stats['timeOnIce']
-                        player_info[player_stats[9]] = the_stats['faceOffWins']
-                        player_info[player_stats[10]] = the_stats['plusMinus']
-                        player_dict.append(player_info)
-            game_df = pd.DataFrame(player_dict,columns=columns + player_stats)
-            pass
-            # data = t.execute("$..dates[0]..games.teams..(id)")
-
-            print(game_df.head(100))
-            return game_df
+        """Returns the player stats of one game.
+
+        :param game_id: gamePk of the game
+        :type game_id: int
+        :param format: "pandas" for a single frame of skaters and goalies,
+            "tables" for separate (skaters, goalies) frames as produced by
+            boxscore.Normalizer, or "json" for the raw boxscore
+        :type format: str
+        """
+        if format not in ('json', 'pandas', 'tables'):
+            raise ValueError("Supported formats are: pandas,tables,json")
+        return self._format_box_score(self.ea.boxscore_endpoint(game_id),
+                                      game_id, format)
+
+    def _format_box_score(self, r, game_id, format):
+        if format == 'pandas':
+            return self._parse_box_score(r)
+        elif format == 'tables':
+            return boxscore.normalize([(r, game_id,
+                                        self.game_dates.get(game_id))])
+        return r
+
+    def _parse_box_score(self, r):
+        normalizer = boxscore.Normalizer().add(r)
+        return self._box_score_frame(normalizer)[self.BOX_SCORE_COLUMNS]
+
+    def _box_score_frame(self, normalizer):
+        """Combine the skater and goalie tables into a single frame
+
+        Stats that only apply to skaters (or goalies) are missing for the
+        other kind of player.
+        """
+        import pandas as pd
+        columns = ["gamePk", "date"] + self.BOX_SCORE_COLUMNS
+        with metrics.timer("parse", "boxscore"):
+            skaters = normalizer.skaters()
+            goalies = normalizer.goalies()
+            df = pd.concat([skaters[[c for c in columns if c in skaters]],
+                            goalies[[c for c in columns if c in goalies]]],
+                           ignore_index=True)
+            df = df.sort_values("gamePk", kind="stable", ignore_index=True)
+            df["name"] = df["name"].astype("str")
+            df = df.reindex(columns=columns)
+        metrics.emit("rows", "boxscore", len(df.index))
+        logger.debug("Built boxscore frame of %d rows from %d games",
+                     len(df.index), df["gamePk"].nunique())
+        return df
+
+    def iter_box_scores(self, game_ids=None, start_date=None, end_date=None,
+                        max_workers=8):
+        """Fetch boxscores in parallel, yielding each game as it completes.
+
+        Either pass the list of games, or a date range to fetch every game
+        in the range.
+
+        :param game_ids: gamePk of each game to fetch
+        :type game_ids: list
+        :param start_date: Starting date
+        :type start_date: datetime.datetime
+        :param end_date: Ending date (inclusive)
+        :type end_date: datetime.datetime
+        :param max_workers: Maximum number of boxscores fetched at once
+        :type max_workers: int
+        :return: Player stats of one game, with gamePk and date columns
+        :rtype: generator of pandas.DataFrame
+        """
+        for doc in self._iter_box_score_docs(game_ids, start_date, end_date,
+                                             max_workers):
+            yield self._box_score_frame(boxscore.Normalizer().add(*doc))
+
+    def box_scores_batch(self, game_ids=None, start_date=None, end_date=None,
+                         max_workers=8):
+        """Fetch the boxscores of many games into a single DataFrame.
+
+        Takes the same arguments as iter_box_scores.
+
+        :return: Player stats with gamePk and date columns
+        :rtype: pandas.DataFrame
+        """
+        normalizer = boxscore.Normalizer()
+        for doc in self._iter_box_score_docs(game_ids, start_date, end_date,
+                                             max_workers):
+            normalizer.add(*doc)
+        return self._box_score_frame(normalizer)
+
+    def box_score_tables(self, game_ids=None, start_date=None, end_date=None,
+                         max_workers=8):
+        """Fetch the boxscores of many games into skater and goalie tables.
+
+        Takes the same arguments as iter_box_scores.  See boxscore.Normalizer
+        for the columns of each table.
+
+        :return: The skater and goalie tables
+        :rtype: tuple(pandas.DataFrame, pandas.DataFrame)
+        """
+        return boxscore.normalize(self._iter_box_score_docs(
+            game_ids, start_date, end_date, max_workers))
+
+    def _iter_box_score_docs(self, game_ids, start_date, end_date,
+                             max_workers):
+        """Yield (boxscore, gamePk, date) for each game as it arrives"""
+        if game_ids is None:
+            if start_date is None or end_date is None:
+                raise ValueError("Pass either game_ids or a date range")
+            games = self._game_dates(self._raw_games(
+                startDate=_as_date(start_date).isoformat(),
+                endDate=_as_date(end_date).isoformat()))
         else:
-            raise ValueError("Supported formats are: pandas,json")
+            games = [(game_id, self.game_dates.get(game_id))
+                     for game_id in game_ids]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.ea.boxscore_endpoint, game_id):
+                       (game_id, date) for game_id, date in games}
+            for future in as_completed(futures):
+                game_id, date = futures[future]
+                yield future.result(), game_id, date
+
+    def _game_dates(self, r):
+        """Return (gamePk, date) of every game in a schedule response
+
+        The dates are remembered so that boxscores fetched by gamePk alone
+        can be labelled with their date.
+        """
+        games = []
+        for day, game in _iter_games(r):
+            self.game_dates[game["gamePk"]] = day
+            games.append((game["gamePk"], day))
+        return games
+
+    def games(self, start_date, end_date, format='list'):
+        """Returns the games in a range of dates.
 
-    def games(self, start_date, end_date):
+        :param start_date: Starting date, as YYYY-MM-DD
+        :type start_date: str
+        :param end_date: Ending date (inclusive), as YYYY-MM-DD
+        :type end_date: str
+        :param format: "list" for the gamePk of each game, "records" for a
+            dict per game with its gamePk, date, state and the away and home
+            team IDs, or "pandas" for the records as a DataFrame
+        :type format: str
+        """
+        if format not in ('list', 'records', 'pandas'):
+            raise ValueError("Supported formats are: list,records,pandas")
         the_games = self._raw_games(startDate=start_date, endDate=end_date)
-        t = objectpath.Tree(the_games)
-        data = t.execute("$..dates..games.gamePk")
-        return list(data)
+        self._game_dates(the_games)
+        return self._format_games(the_games, format)
+
+    def _format_games(self, the_games, format):
+        if format == 'list':
+            return self._parse_games(the_games)
+        elif format == 'records':
+            return self._game_records(the_games)
+        elif format == 'pandas':
+            import pandas as pd
+            return pd.DataFrame(self._game_records(the_games),
+                                columns=["gamePk", "date", "state",
+                                         "away_id", "home_id"])
+
+    def _parse_games(self, r):
+        return [game["gamePk"] for _, game in _iter_games(r)]
+
+    def _game_records(self, r):
+        return [{"gamePk": game["gamePk"], "date": day,
+                 "state": game["status"]["abstractGameState"],
+                 "away_id": game["teams"]["away"]["team"]["id"],
+                 "home_id": game["teams"]["home"]["team"]["id"]}
+                for day, game in _iter_games(r)]
+
+    def final_games(self, start_date, end_date):
+        """Returns the games that have finished in a range of dates.
+
+        :param start_date: First date to look at
+        :type start_date: datetime.date
+        :param end_date: Last date to look at (inclusive)
+        :type end_date: datetime.date
+        :return: (gamePk, date) of each finished game
+        :rtype: list(tuple)
+        """
+        r = self._raw_games(startDate=_as_date(start_date).isoformat(),
+                            endDate=_as_date(end_date).isoformat())
+        return self._final_games(r)
 
-    def linescores(self, start_date, end_date):
+    def _final_games(self, r):
+        self._game_dates(r)
+        return [(game["gamePk"], day) for day, game in _iter_games(r)
+                if game["status"]["abstractGameState"] == "Final"]
+
+    def linescores(self, start_date, end_date, format='json'):
+        """Returns the linescores of the games in a range of dates.
+
+        :param format: "json" for each game's schedule entry with its
+            linescore, or "records" for records.Linescore
+        :type format: str
+        """
+        if format not in ('json', 'records'):
+            raise ValueError("Supported formats are: json,records")
         the_games = self._raw_games(startDate=start_date, endDate=end_date,expand='schedule.linescore')
-        t = objectpath.Tree(the_games)
-        data = t.execute("$..dates..games")
-        return list(data)
-
-    def box_scores2(self,start_date, end_date):
-        the_games = self.games(start_date, end_date)
-        return self.box_scores(the_games)
-        # t = objectpath.Tree(the_games)
-        # data = t.execute("$..dates..games")
-        # return list(data)
+        return self._format_linescores(the_games, format)
+
+    def _format_linescores(self, the_games, format):
+        if format == 'records':
+            return list(records.linescores(the_games))
+        return [game for _, game in _iter_games(the_games)]
+
+    def iter_games(self, start_date, end_date):
+        """Yield the games in a range of dates as compact records.
+
+        The schedule is requested in chunks (like games_count) and only
+        one chunk's response is held at a time.
+
+        :param start_date: Starting date
+        :type start_date: datetime.date
+        :param end_date: Ending date (inclusive)
+        :type end_date: datetime.date
+        :rtype: generator of nhl_scraper.records.Game
+        """
+        for r in self._schedule_chunks(start_date, end_date):
+            yield from records.games(r)
+
+    def iter_linescores(self, start_date, end_date):
+        """Yield the linescores in a range of dates as compact records.
+
+        Takes the same arguments as iter_games.
+
+        :rtype: generator of nhl_scraper.records.Linescore
+        """
+        for r in self._schedule_chunks(start_date, end_date,
+                                       expand='schedule.linescore'):
+            yield from records.linescores(r)
+
+    def iter_player_lines(self, game_ids=None, start_date=None,
+                          end_date=None, max_workers=8):
+        """Yield every player's stats of many games as compact records.
+
+        Takes the same arguments as iter_box_scores.  Each boxscore is
+        dropped once its players have been yielded.
+
+        :rtype: generator of nhl_scraper.records.SkaterLine and
+            nhl_scraper.records.GoalieLine
+        """
+        for doc, game_id, date in self._iter_box_score_docs(
+                game_ids, start_date, end_date, max_workers):
+            yield from records.player_lines(doc, game_id, date)
+
+    def box_scores2(self, start_date, end_date):
+        return self.box_scores_batch(start_date=start_date, end_date=end_date)
 
     def _raw_games(self, **params):
         return self.ea.schedule_endpoint(**params)
\ No newline at end of file
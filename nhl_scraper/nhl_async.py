@@ -0,0 +1,394 @@
+#!/usr/bin/python
+
+"""
+Asynchronous versions of the NHL endpoint adapter and scraper.
+
+The AsyncScraper fans requests out concurrently, so fetching every boxscore
+for a night or a week of schedules costs about one round trip of latency.
+aiohttp is only needed by AsyncEndpointAdapter; an AsyncScraper can be run
+with any adapter, including the synchronous nhl.EndpointAdapter or a mock,
+whose calls are run on the default executor.
+"""
+import asyncio
+import datetime
+import functools
+import inspect
+import json
+from urllib.parse import urlsplit
+
+from nhl_scraper import boxscore, nhl
+
+
+class AsyncEndpointAdapter:
+    NHL_URL = nhl.EndpointAdapter.NHL_URL
+
+    def __init__(self, max_connections=16, timeout=30, policy=None):
+        """
+        :param max_connections: Maximum number of open connections
+        :type max_connections: int
+        :param timeout: Total timeout for each request in seconds
+        :type timeout: float
+        :param policy: Session whose retries, backoff and rate limiter are
+            applied to the requests.  Defaults to the session shared by the
+            synchronous adapters, so both count against the same rate limit.
+        :type policy: nhl_scraper.session.Session
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._policy = policy
+        self.sleep = asyncio.sleep
+        self.session = None
+        self._session_loop = None
+
+    @property
+    def policy(self):
+        if self._policy is None:
+            from nhl_scraper.session import default_session
+            self._policy = default_session()
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy):
+        self._policy = policy
+
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self.session is not None and self._session_loop is not loop:
+            # A session only works on the loop it was created on, and each
+            # asyncio.run has a new one.  The old loop is gone, so the old
+            # session can't be closed from here.
+            self.session = None
+        if self.session is None:
+            self._session_loop = loop
+            import aiohttp
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def get(self, api):
+        """Send an API request to the URI and return the response as JSON
+
+        Requests are throttled, and retried on connection errors, timeouts,
+        429 and 5xx responses, the same way as session.Session.get.
+
+        :param api: API to call
+        :type uri: str
+        :return: JSON document of the reponse
+        :raises: RuntimeError if any response comes back with an error
+        """
+        import aiohttp
+        session = await self._get_session()
+        policy = self.policy
+        url = "{}/{}".format(self.NHL_URL, api)
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            delay = policy.limiter.reserve(host)
+            if delay > 0:
+                await self.sleep(delay)
+            response = None
+            try:
+                async with session.get(url, params={'format': 'json'}) \
+                        as response:
+                    if response.status not in policy.RETRY_STATUS or \
+                            attempt >= policy.retries:
+                        jresp = await response.json(content_type=None)
+                        break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= policy.retries:
+                    raise
+            await self.sleep(policy._delay(attempt, response))
+            attempt += 1
+        if "error" in jresp:
+            raise RuntimeError(json.dumps(jresp))
+        return jresp
+
+    async def teams_endpoint(self):
+        return await self.get("teams")
+
+    async def schedule_endpoint(self, **params):
+        return await self.get(nhl.EndpointAdapter.schedule_api(**params))
+
+    async def players_endpoint(self, team_ids):
+        team_str = ",".join(str(n) for n in team_ids)
+        return await self.get(
+            "teams?teamId={}&expand=team.roster".format(team_str))
+
+    async def boxscore_endpoint(self, game_id):
+        return await self.get("game/{}/boxscore".format(game_id))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncScraper:
+    """A scraper whose methods are coroutines.
+
+    Requests are issued concurrently, with at most max_concurrency of them
+    in flight at once.  The responses are cached and parsed by an
+    nhl.Scraper, which never sends requests of its own, so the methods take
+    the same arguments and return the same results as nhl.Scraper's.
+
+    >>> async with AsyncEndpointAdapter() as ea:
+    ...     s = AsyncScraper()
+    ...     s.set_endpoint_adapter(ea)
+    ...     df = await s.box_scores_many(await s.games(start, end))
+    """
+    def __init__(self, max_concurrency=16):
+        self.scraper = nhl.Scraper()
+        # Every request goes through self.ea, never the scraper's adapter
+        self.scraper.set_endpoint_adapter(None)
+        self.ea = AsyncEndpointAdapter(max_connections=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self._loop = None
+
+    def set_endpoint_adapter(self, ea):
+        self.ea = ea
+
+    async def _call(self, endpoint, *args, **kwargs):
+        """Call an endpoint of the adapter under the concurrency cap
+
+        Coroutine endpoints are awaited.  Plain endpoints are run on the
+        default executor so they don't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Like the session, the semaphore is tied to one event loop
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        async with self.semaphore:
+            if inspect.iscoroutinefunction(endpoint):
+                return await endpoint(*args, **kwargs)
+            return await loop.run_in_executor(
+                None, functools.partial(endpoint, *args, **kwargs))
+
+    async def teams(self):
+        """Get list of teams in the NHL
+
+        :return: Team details
+        :rtype: pandas.DataFrame
+        """
+        sc = self.scraper
+        if sc.teams_cache is None:
+            sc.teams_cache = sc._parse_teams(
+                await self._call(self.ea.teams_endpoint))
+        return sc.teams_cache
+
+    async def games_count(self, start_date, end_date, format='dict'):
+        """Returns a count of games for each team between a range of dates.
+
+        Any chunks of the schedule that aren't cached are fetched
+        concurrently.  See nhl.Scraper.games_count.
+
+        :rtype: defaultdict
+        """
+        if format not in ('dict', 'pandas'):
+            raise ValueError("Supported formats are: dict,pandas")
+        if start_date > end_date:
+            raise RuntimeError("End date must be beyond start")
+        index = self.scraper.schedule_index_cache
+        if index is None or not index.covers(start_date, end_date):
+            await self._fill_schedule_cache(
+                self.scraper._missing_schedule_ranges(start_date, end_date))
+        return self.scraper.games_count(start_date, end_date, format)
+
+    async def _fill_schedule_cache(self, ranges):
+        """Fetch the ranges of the schedule concurrently and cache them
+
+        :return: The responses, in the order of ranges
+        :rtype: list(dict)
+        """
+        responses = await asyncio.gather(*[
+            self._call(self.ea.schedule_endpoint,
+                       startDate=chunk_start.isoformat(),
+                       endDate=chunk_end.isoformat())
+            for chunk_start, chunk_end in ranges])
+        for (chunk_start, chunk_end), r in zip(ranges, responses):
+            self.scraper._cache_schedule(chunk_start, chunk_end, r)
+            self.scraper._game_dates(r)
+        return responses
+
+    async def schedule_index(self, start_date=None, end_date=None,
+                             season=None):
+        """Returns an index of the schedule for fast per-team lookups.
+
+        The chunks of the schedule are fetched concurrently.  See
+        nhl.Scraper.schedule_index.
+
+        :rtype: nhl_scraper.schedule.ScheduleIndex
+        """
+        from nhl_scraper.schedule import ScheduleIndex
+        sc = self.scraper
+        index = sc.schedule_index_cache
+        if season is not None:
+            r = await self._call(self.ea.schedule_endpoint, season=season)
+            sc.schedule_index_cache = ScheduleIndex.from_schedule(r)
+            sc._game_dates(r)
+            return sc.schedule_index_cache
+        if start_date is None or end_date is None:
+            if index is None:
+                raise ValueError("Pass either a season or a date range")
+            return index
+        if index is not None:
+            if index.covers(start_date, end_date):
+                return index
+            start_date = min(nhl._as_date(start_date), index.start_date)
+            end_date = max(nhl._as_date(end_date), index.end_date)
+        start_date, end_date = nhl._as_date(start_date), \
+            nhl._as_date(end_date)
+        dates = [start_date + datetime.timedelta(days=n)
+                 for n in range((end_date - start_date).days + 1)]
+        index = ScheduleIndex(start_date, end_date)
+        for r in await self._fill_schedule_cache(
+                nhl._date_runs(dates, sc.SCHEDULE_CHUNK_DAYS)):
+            index.update(r)
+        sc.schedule_index_cache = index
+        return index
+
+    async def players(self, format='pandas'):
+        """Returns the full list of all players in the NHL.
+
+        See nhl.Scraper.players.
+
+        :return: All players
+        :rtype: pandas.DataFrame
+        """
+        if format not in ('pandas', 'records'):
+            raise ValueError("Supported formats are: pandas,records")
+        sc = self.scraper
+        if sc.players_cache is None:
+            if format == 'records' and sc.teams_cache is None:
+                # The team IDs, without building the teams frame
+                r = await self._call(self.ea.teams_endpoint)
+                team_ids = [team["id"] for team in r["teams"]]
+            else:
+                team_ids = (await self.teams())["id"].tolist()
+            sc.players_cache = await self._call(self.ea.players_endpoint,
+                                                team_ids)
+        return sc.players(format)
+
+    async def refresh_players(self, team_ids=None):
+        """Re-pull rosters and apply the changes to the players list.
+
+        See nhl.Scraper.refresh_players.
+
+        :rtype: list(dict)
+        """
+        if team_ids is None:
+            team_ids = (await self.teams())["id"].tolist()
+        await self.players()
+        return self.scraper._apply_rosters(
+            team_ids, await self._call(self.ea.players_endpoint, team_ids))
+
+    async def games(self, start_date, end_date, format='list'):
+        """Returns the games in a range of dates.
+
+        See nhl.Scraper.games.
+        """
+        if format not in ('list', 'records', 'pandas'):
+            raise ValueError("Supported formats are: list,records,pandas")
+        r = await self._call(self.ea.schedule_endpoint,
+                             startDate=_iso(start_date),
+                             endDate=_iso(end_date))
+        self.scraper._game_dates(r)
+        return self.scraper._format_games(r, format)
+
+    async def final_games(self, start_date, end_date):
+        """Returns the games that have finished in a range of dates.
+
+        :return: (gamePk, date) of each finished game
+        :rtype: list(tuple)
+        """
+        r = await self._call(self.ea.schedule_endpoint,
+                             startDate=_iso(start_date),
+                             endDate=_iso(end_date))
+        return self.scraper._final_games(r)
+
+    async def linescores(self, start_date, end_date, format='json'):
+        """Returns the linescores of the games in a range of dates.
+
+        See nhl.Scraper.linescores.
+        """
+        if format not in ('json', 'records'):
+            raise ValueError("Supported formats are: json,records")
+        r = await self._call(self.ea.schedule_endpoint,
+                             startDate=_iso(start_date),
+                             endDate=_iso(end_date),
+                             expand='schedule.linescore')
+        return self.scraper._format_linescores(r, format)
+
+    async def box_scores(self, game_id, team_id=None, date_range=None,
+                         format='pandas'):
+        """Returns the player stats of one game.
+
+        See nhl.Scraper.box_scores.
+        """
+        if format not in ('json', 'pandas', 'tables'):
+            raise ValueError("Supported formats are: pandas,tables,json")
+        r = await self._call(self.ea.boxscore_endpoint, game_id)
+        return self.scraper._format_box_score(r, game_id, format)
+
+    async def _box_score_docs(self, game_ids, start_date, end_date):
+        if game_ids is None:
+            if start_date is None or end_date is None:
+                raise ValueError("Pass either game_ids or a date range")
+            r = await self._call(self.ea.schedule_endpoint,
+                                 startDate=_iso(start_date),
+                                 endDate=_iso(end_date))
+            games = self.scraper._game_dates(r)
+        else:
+            games = [(game_id, self.scraper.game_dates.get(game_id))
+                     for game_id in game_ids]
+        responses = await asyncio.gather(*[
+            self._call(self.ea.boxscore_endpoint, game_id)
+            for game_id, _ in games])
+        return [(r, game_id, date)
+                for r, (game_id, date) in zip(responses, games)]
+
+    async def box_scores_many(self, game_ids=None, start_date=None,
+                              end_date=None):
+        """Fetch the boxscores of many games concurrently
+
+        Either pass the list of games, or a date range to fetch every game
+        in the range.
+
+        :param game_ids: gamePk of each game to fetch
+        :type game_ids: list
+        :return: Player stats of all of the games, with gamePk and date
+            columns
+        :rtype: pandas.DataFrame
+        """
+        normalizer = boxscore.Normalizer()
+        for doc in await self._box_score_docs(game_ids, start_date,
+                                              end_date):
+            normalizer.add(*doc)
+        return self.scraper._box_score_frame(normalizer)
+
+    async def box_score_tables(self, game_ids=None, start_date=None,
+                               end_date=None):
+        """Fetch the boxscores of many games into skater and goalie tables.
+
+        Takes the same arguments as box_scores_many.  See
+        nhl.Scraper.box_score_tables.
+
+        :return: The skater and goalie tables
+        :rtype: tuple(pandas.DataFrame, pandas.DataFrame)
+        """
+        return boxscore.normalize(
+            await self._box_score_docs(game_ids, start_date, end_date))
+
+
+def _iso(date):
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        return nhl._as_date(date).isoformat()
+    return date
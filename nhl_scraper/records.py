@@ -0,0 +1,155 @@
+#!/usr/bin/python
+
+"""
+Compact records of games, linescores and player game lines.
+
+Schedule and boxscore documents are deeply nested dicts, with the same
+keys repeated in every game and every player.  These functions pull out
+just the fields that are used, into namedtuples, which have no per-record
+dict.  Player names, positions, game types, states and decisions are
+interned, so a string seen in many games is stored once.  The functions
+are generators, so a caller that consumes the records as they come only
+keeps one response in memory at a time.
+
+>>> for line in s.iter_player_lines(start_date=start, end_date=end):
+...     totals[line.id] += line.goals
+"""
+import datetime
+import sys
+from collections import namedtuple
+
+from nhl_scraper import boxscore
+
+Game = namedtuple("Game", [
+    "gamePk", "date", "season", "game_type", "state", "away_id", "home_id",
+    "away_goals", "home_goals"])
+
+# Goals and shots of each team, with the goals per period as tuples
+Linescore = namedtuple("Linescore", [
+    "gamePk", "date", "away_id", "home_id", "away_goals", "home_goals",
+    "away_shots", "home_shots", "away_period_goals", "home_period_goals",
+    "periods", "shootout"])
+
+# Fields of the player lines named differently than the table columns,
+# since the column names aren't identifiers
+FIELD_NAMES = {"+/-": "plus_minus"}
+
+SkaterLine = namedtuple("SkaterLine", boxscore.KEY_COLUMNS + [
+    FIELD_NAMES.get(c, c)
+    for c, _ in boxscore.SKATER_STATS + boxscore.SKATER_TOI])
+
+GoalieLine = namedtuple("GoalieLine", boxscore.KEY_COLUMNS + [
+    FIELD_NAMES.get(c, c)
+    for c, _ in boxscore.GOALIE_STATS + boxscore.GOALIE_TOI] +
+    ["ga", "decision", "so"])
+
+# Fields holding repeated strings, made categorical by to_frame
+CATEGORY_FIELDS = ("game_type", "state", "name", "position", "decision")
+
+
+def _intern(s):
+    return None if s is None else sys.intern(s)
+
+
+def games(r):
+    """Yield a Game for every game in a schedule response
+
+    :param r: Schedule JSON document
+    :rtype: generator of Game
+    """
+    for game_date in r.get("dates", []):
+        day = datetime.date.fromisoformat(game_date["date"])
+        for game in game_date["games"]:
+            away, home = game["teams"]["away"], game["teams"]["home"]
+            yield Game(game["gamePk"], day, int(game["season"]),
+                       _intern(game["gameType"]),
+                       _intern(game["status"]["abstractGameState"]),
+                       away["team"]["id"], home["team"]["id"],
+                       away.get("score"), home.get("score"))
+
+
+def linescores(r):
+    """Yield a Linescore for every game in a schedule response
+
+    The response must have been requested with
+    expand=schedule.linescore.  Games without a linescore are skipped.
+
+    :param r: Schedule JSON document
+    :rtype: generator of Linescore
+    """
+    for game_date in r.get("dates", []):
+        day = datetime.date.fromisoformat(game_date["date"])
+        for game in game_date["games"]:
+            ls = game.get("linescore")
+            if ls is None:
+                continue
+            periods = ls.get("periods", [])
+            yield Linescore(
+                game["gamePk"], day,
+                game["teams"]["away"]["team"]["id"],
+                game["teams"]["home"]["team"]["id"],
+                ls["teams"]["away"].get("goals"),
+                ls["teams"]["home"].get("goals"),
+                ls["teams"]["away"].get("shotsOnGoal"),
+                ls["teams"]["home"].get("shotsOnGoal"),
+                tuple(p["away"].get("goals") for p in periods),
+                tuple(p["home"].get("goals") for p in periods),
+                len(periods), bool(ls.get("hasShootout")))
+
+
+def player_lines(doc, gamePk=None, date=None):
+    """Yield a SkaterLine or GoalieLine for every player in a boxscore
+
+    The fields are the columns of boxscore.Normalizer's tables, and
+    scratched players are skipped the same way.
+
+    :param doc: Boxscore JSON document
+    :param gamePk: ID of the game the boxscore is for
+    :type gamePk: int
+    :param date: Date the game was played on
+    :type date: datetime.date
+    :rtype: generator of SkaterLine and GoalieLine
+    """
+    for team in doc["teams"].values():
+        team_id = team["team"]["id"]
+        for player in team["players"].values():
+            stats = player["stats"]
+            key = [gamePk, date, team_id, player["person"]["id"],
+                   _intern(player["person"]["fullName"]),
+                   _intern(player["position"]["abbreviation"])]
+            if "goalieStats" in stats:
+                the_stats = stats["goalieStats"]
+                ga, decision, so = boxscore.goalie_result(the_stats)
+                yield GoalieLine._make(
+                    key +
+                    [the_stats.get(k) for _, k in boxscore.GOALIE_STATS] +
+                    [boxscore.toi_seconds(the_stats.get(k))
+                     for _, k in boxscore.GOALIE_TOI] +
+                    [ga, _intern(decision), so])
+            elif "skaterStats" in stats:
+                the_stats = stats["skaterStats"]
+                yield SkaterLine._make(
+                    key +
+                    [the_stats.get(k) for _, k in boxscore.SKATER_STATS] +
+                    [boxscore.toi_seconds(the_stats.get(k))
+                     for _, k in boxscore.SKATER_TOI])
+
+
+def to_frame(records, record_type):
+    """Build a DataFrame from records
+
+    The repeated string fields become categorical columns, and the fields
+    in FIELD_NAMES get their table column names back.
+
+    :param records: Records of one type
+    :type records: iterable
+    :param record_type: The records' namedtuple class, for the columns
+    :rtype: pandas.DataFrame
+    """
+    import pandas as pd
+    df = pd.DataFrame.from_records(list(records),
+                                   columns=list(record_type._fields))
+    for col in CATEGORY_FIELDS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df.rename(columns={f: c for c, f in FIELD_NAMES.items()})
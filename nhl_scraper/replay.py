@@ -0,0 +1,116 @@
+#!/usr/bin/python
+
+"""
+Record and replay of endpoint adapter responses.
+
+ReplayAdapter stands in for any of the endpoint adapters (nhl, rotowire, the
+ESPN API) through the scrapers' set_endpoint_adapter.  Each *_endpoint call
+is answered from a recording on disk, keyed by the method name and its
+arguments.  Given a live adapter, calls without a recording are forwarded
+to it and recorded, so a first run against the sites captures everything
+later runs need to work offline.
+
+Pages rendered in a browser (ESPN and CBS projections) are recorded with
+nhl_scraper.archive.HtmlArchive instead; replay_pages reads them back.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+def _key(method, args, kwargs):
+    """Canonical form of a call, used to look up its recording"""
+    return json.dumps([method, list(args), kwargs], sort_keys=True,
+                      default=str)
+
+
+class ReplayAdapter:
+    def __init__(self, root, adapter=None):
+        """
+        :param root: Directory the recordings are kept in
+        :type root: str
+        :param adapter: Live adapter to forward calls without a recording
+            to.  Its responses are recorded.  Without one, a call that
+            wasn't recorded raises KeyError.
+        """
+        self.root = root
+        self.adapter = adapter
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+        self.calls_by_method = {}
+
+    def __getattr__(self, name):
+        if not name.endswith("_endpoint"):
+            raise AttributeError(name)
+
+        def endpoint(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        endpoint.__name__ = name
+        return endpoint
+
+    def path(self, method, args=(), kwargs=None):
+        """File name the recording of a call is kept under"""
+        digest = hashlib.sha1(
+            _key(method, args, kwargs or {}).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, method, digest[:16] + ".json")
+
+    def call(self, method, *args, **kwargs):
+        """Answer a call from its recording, or record it
+
+        :param method: Name of the endpoint method
+        :type method: str
+        :return: The recorded response
+        :raises: KeyError if there is no recording and no live adapter
+        """
+        with self.lock:
+            self.calls += 1
+            self.calls_by_method[method] = \
+                self.calls_by_method.get(method, 0) + 1
+        path = self.path(method, args, kwargs)
+        try:
+            with open(path, "r") as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            if self.adapter is None:
+                raise KeyError("No recording of {}".format(
+                    _key(method, args, kwargs)))
+        with self.lock:
+            self.misses += 1
+        response = getattr(self.adapter, method)(*args, **kwargs)
+        self.record(method, args, kwargs, response)
+        return response
+
+    def record(self, method, args, kwargs, response):
+        """Save the response to a call"""
+        path = self.path(method, args, kwargs)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump({"method": method, "args": list(args),
+                       "kwargs": kwargs, "response": response}, f,
+                      default=str)
+        os.replace(tmp, path)
+
+    def reset_counts(self):
+        with self.lock:
+            self.calls = 0
+            self.misses = 0
+            self.calls_by_method = {}
+
+
+def replay_pages(archive, names):
+    """Read recorded page sources back out of an archive
+
+    :param archive: Archive the pages were recorded in
+    :type archive: nhl_scraper.archive.HtmlArchive
+    :param names: Names the pages were put in the archive with, e.g.
+        "espn.skaters.pg0"
+    :type names: list(str)
+    :return: The latest recording of each page
+    :rtype: generator of bytes
+    """
+    for name in names:
+        yield archive.latest(name)
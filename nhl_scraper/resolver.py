@@ -0,0 +1,240 @@
+#!/usr/bin/python
+
+"""
+Resolve player names from any of the sources to NHL playerIds.
+
+Each source identifies players differently: nhl.Scraper.players has the
+playerId, espn.Parser and cbssports.Parser have the name and a team code in
+the site's own format, and rotowire only has the name.  The resolver keeps
+a hash index of normalized name (accents, punctuation and suffixes folded
+away) and NHL team abbreviation, with fallbacks to a name-only match and
+then a fuzzy match.
+"""
+import difflib
+import json
+import os
+import re
+import time
+import unicodedata
+
+# Seconds a saved index is used for by PlayerResolver.from_scraper
+CACHE_MAX_AGE = 24 * 60 * 60
+
+# Team codes used by ESPN, CBS and others mapped to the NHL abbreviation
+TEAM_ALIASES = {
+    "ANH": "ANA", "ATL": "WPG", "CAL": "CGY", "CLB": "CBJ", "CLS": "CBJ",
+    "LA": "LAK", "LV": "VGK", "MON": "MTL", "NAS": "NSH", "NJ": "NJD",
+    "PHX": "ARI", "SJ": "SJS", "TB": "TBL", "VEG": "VGK", "VGS": "VGK",
+    "WAS": "WSH", "WIN": "WPG",
+}
+
+# (name column, team column) of the frames returned by each source
+SOURCE_COLUMNS = {
+    "espn": ("Name", "Tm"),
+    "cbssports": ("name", "Tm"),
+    "rotowire": ("name", None),
+    "nhl": ("name", None),
+}
+
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+_PUNCTUATION = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(name):
+    """Fold a player name into the form used as the index key
+
+    >>> normalize_name("Pierre-Édouard Bellemare Jr.")
+    'pierre edouard bellemare'
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _PUNCTUATION.sub(" ", name.lower().replace("'", "")
+                            .replace(".", ""))
+    return " ".join(w for w in name.split() if w not in SUFFIXES)
+
+
+def normalize_team(team):
+    """Map a team code from any source to the NHL abbreviation
+
+    :return: NHL abbreviation, or None for a missing team
+    :rtype: str
+    """
+    if team is None or (isinstance(team, float) and team != team):
+        return None
+    team = str(team).strip().upper()
+    return TEAM_ALIASES.get(team, team) or None
+
+
+class PlayerResolver:
+    def __init__(self, players, teams, fuzzy_cutoff=0.85):
+        """Build the index
+
+        :param players: Output of nhl.Scraper.players
+        :type players: pandas.DataFrame
+        :param teams: Output of nhl.Scraper.teams
+        :type teams: pandas.DataFrame
+        :param fuzzy_cutoff: Minimum similarity (0 to 1) for a fuzzy match
+        :type fuzzy_cutoff: float
+        """
+        import pandas as pd
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.abbrevs = dict(zip(teams["id"], teams["abbrev"]))
+        self.names = players["name"].tolist()
+        self.team_ids = players["teamId"].tolist()
+        self.index = pd.DataFrame({
+            "key": [normalize_name(n) for n in self.names],
+            "team": [self.abbrevs.get(t) for t in self.team_ids],
+            "playerId": players["playerId"].to_numpy(),
+        })
+        self.by_name_team = {(k, t): p for k, t, p in
+                             self.index.itertuples(index=False)}
+        self.by_name = {}
+        for k, p in zip(self.index["key"], self.index["playerId"]):
+            self.by_name.setdefault(k, set()).add(p)
+        self.names_by_team = {}
+        for k, t in zip(self.index["key"], self.index["team"]):
+            self.names_by_team.setdefault(t, []).append(k)
+        self.all_names = list(self.by_name)
+
+    @classmethod
+    def from_scraper(cls, scraper, cache_file=None, max_age=CACHE_MAX_AGE,
+                     **kwargs):
+        """Build the index from an nhl.Scraper, or load it from disk
+
+        :param scraper: Scraper to pull the players and teams from
+        :type scraper: nhl_scraper.nhl.Scraper
+        :param cache_file: If given, the index is loaded from this file when
+            it was saved less than max_age seconds ago, and rebuilt and
+            saved to it otherwise
+        :type cache_file: str
+        :param max_age: Seconds a saved index is used for before the rosters
+            are pulled again, to pick up trades and call-ups
+        :type max_age: float
+        :rtype: PlayerResolver
+        """
+        if cache_file is not None and os.path.exists(cache_file):
+            resolver = cls.load(cache_file, max_age, **kwargs)
+            if resolver is not None:
+                return resolver
+        resolver = cls(scraper.players(), scraper.teams(), **kwargs)
+        if cache_file is not None:
+            resolver.save(cache_file)
+        return resolver
+
+    def save(self, file_name):
+        """Save the players and teams the index was built from as JSON"""
+        doc = {"saved": time.time(),
+               "teams": [[int(t), a] for t, a in self.abbrevs.items()],
+               "players": [[n, int(t), int(p)] for n, t, p in zip(
+                   self.names, self.team_ids, self.index["playerId"])]}
+        tmp = file_name + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f)
+        os.replace(tmp, file_name)
+
+    @classmethod
+    def load(cls, file_name, max_age=None, **kwargs):
+        """Rebuild an index saved with save
+
+        :param max_age: Seconds after which a saved index is too old to use
+        :type max_age: float
+        :return: The index, or None if the file is older than max_age or
+            can't be read
+        :rtype: PlayerResolver
+        """
+        import pandas as pd
+        try:
+            with open(file_name, "r") as f:
+                doc = json.load(f)
+            if max_age is not None and time.time() - doc["saved"] > max_age:
+                return None
+            teams = pd.DataFrame(doc["teams"], columns=["id", "abbrev"])
+            players = pd.DataFrame(doc["players"],
+                                   columns=["name", "teamId", "playerId"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        return cls(players, teams, **kwargs)
+
+    def resolve(self, name, team=None):
+        """Find the playerId of a single player
+
+        :param name: Player's name as shown by any of the sources
+        :type name: str
+        :param team: Team code as shown by any of the sources
+        :type team: str
+        :return: NHL playerId, or None if there is no confident match
+        :rtype: int
+        """
+        key = normalize_name(name)
+        team = normalize_team(team)
+        player_id = self._exact(key, team)
+        if player_id is None:
+            player_id = self._fuzzy(key, team)
+        return player_id
+
+    def _exact(self, key, team):
+        if team is not None and (key, team) in self.by_name_team:
+            return int(self.by_name_team[(key, team)])
+        candidates = self.by_name.get(key, ())
+        if len(candidates) == 1:
+            return int(next(iter(candidates)))
+        return None
+
+    def _fuzzy(self, key, team):
+        names = self.names_by_team.get(team, self.all_names)
+        match = difflib.get_close_matches(key, names, n=1,
+                                          cutoff=self.fuzzy_cutoff)
+        if not match:
+            return None
+        return self._exact(match[0], team)
+
+    def resolve_frame(self, df, source=None, name_col=None, team_col=None):
+        """Map every row of a frame to an NHL playerId
+
+        Rows are matched in bulk with a join on (name, team) and then on
+        name alone.  Only rows left over after that go through the fuzzy
+        match.
+
+        :param df: Frame from one of the sources
+        :type df: pandas.DataFrame
+        :param source: One of SOURCE_COLUMNS to pick the name and team
+            columns.  A name column that is the frame's index is fine.
+        :type source: str
+        :param name_col: Name column, overriding the source's
+        :param team_col: Team column, overriding the source's
+        :return: playerId of each row, with <NA> where there is no match
+        :rtype: pandas.Series
+        """
+        import pandas as pd
+        if source is not None:
+            default_name, default_team = SOURCE_COLUMNS[source]
+            name_col = name_col or default_name
+            team_col = team_col or default_team
+        if name_col in df.columns:
+            names = df[name_col]
+        else:
+            names = df.index.to_series()
+        names = pd.Series(names.to_numpy(), dtype="object")
+        unique = names.unique()
+        keys = names.map(dict(zip(unique, map(normalize_name, unique))))
+        if team_col is not None:
+            teams = pd.Series(df[team_col].to_numpy(), dtype="object")
+            unique = teams.unique()
+            teams = teams.map(dict(zip(unique, map(normalize_team, unique))))
+        else:
+            teams = pd.Series([None] * len(df.index), dtype="object")
+
+        lookup = pd.DataFrame({"key": keys, "team": teams})
+        by_team = lookup.merge(
+            self.index.drop_duplicates(["key", "team"]),
+            on=["key", "team"], how="left")["playerId"]
+        unique_names = self.index.groupby("key")["playerId"] \
+            .agg(lambda p: p.iloc[0] if p.nunique() == 1 else None)
+        by_name = keys.map(unique_names)
+        result = pd.Series(by_team.to_numpy(), dtype="object") \
+            .where(by_team.notna().to_numpy(), by_name)
+
+        for i in result.index[result.isna()]:
+            result[i] = self._fuzzy(keys[i], teams[i])
+        return pd.Series(pd.array(result.tolist(), dtype="Int64"),
+                         index=df.index, name="playerId")
@@ -1,18 +1,33 @@
 #https://www.rotowire.com/hockey/starting-goalies.php?view=teams
 
-import objectpath
-import requests
-import json
+import time
 from datetime import date,timedelta
-import pandas as pd
-
-
-from bs4 import BeautifulSoup
+from nhl_scraper import metrics, tables
+from nhl_scraper.resolver import normalize_team
 
 
 class EndpointAdapter:
     ROTOWIRE_URL = "https://www.rotowire.com/hockey"
 
+    def __init__(self, session=None):
+        """
+        :param session: HTTP session to send requests through.  Defaults to
+            the session shared by all of the adapters.
+        :type session: nhl_scraper.session.Session
+        """
+        self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            from nhl_scraper.session import default_session
+            self._session = default_session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
     def get(self, api):
         """Send an API request to the URI and return the response as JSON
 
@@ -21,36 +36,223 @@ class EndpointAdapter:
         :return: JSON document of the reponse
         :raises: RuntimeError if any response comes back with an error
         """
-        response = requests.get("{}/{}".format(self.ROTOWIRE_URL, api))
+        response = self.session.get("{}/{}".format(self.ROTOWIRE_URL, api))
         return response.text
 
-    def starting_goalies_endpoint(self):
-        return self.get("starting-goalies.php?view=teams")
+    def starting_goalies_endpoint(self, etag=None, last_modified=None):
+        """Fetch the starting goalies page unless it hasn't changed
+
+        :param etag: ETag of the copy we already have
+        :type etag: str
+        :param last_modified: Last-Modified of the copy we already have
+        :type last_modified: str
+        :return: Page source, ETag and Last-Modified.  The page source is
+            None if the server says our copy is still current.
+        :rtype: tuple(str, str, str)
+        """
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        with metrics.timer("latency", "starting_goalies"):
+            response = self.session.get(
+                "{}/{}".format(self.ROTOWIRE_URL,
+                               "starting-goalies.php?view=teams"),
+                headers=headers)
+        metrics.emit("bytes", "starting_goalies", len(response.content))
+        if response.status_code == 304:
+            return None, etag, last_modified
+        return (response.text, response.headers.get("ETag"),
+                response.headers.get("Last-Modified"))
 
 
 class Scraper:
-    goalies_cache = None
-    def __init__(self):
+    TTL = 300
+
+    def __init__(self, ttl=TTL, clock=time.time):
+        """
+        :param ttl: Seconds to use the parsed page for before checking the
+            site for changes
+        :type ttl: float
+        :param clock: Function returning the current time in seconds
+        """
         self.ea = EndpointAdapter()
+        self.ttl = ttl
+        self.clock = clock
+        self.goalies_df = None
+        self.fetched_at = None
+        self.checked_at = None
+        self.etag = None
+        self.last_modified = None
+        self.by_team_date = {}
+        self.by_date = {}
 
+    def set_endpoint_adapter(self, ea):
+        self.ea = ea
 
-    def starting_goalies(self):
-        """Returns the full list of all players in the NHL.
+    def starting_goalies(self, backend="lxml"):
+        """Returns the projected starting goalies for the coming week.
 
-        Each player is returned with their teamID and playerID.
+        The parsed page is kept for ttl seconds.  After that the site is
+        asked for the page again, and it is only re-parsed if it changed.
+        The first day of the matrix is the date the page was fetched on.
 
-        :return: All players
+        :param backend: Parser backend, see Parser
+        :type backend: str
+        :return: Date, team, opponent and starting status of each goalie's
+            games, indexed by goalie name
         :rtype: pandas.DataFrame
         """
-        if Scraper.goalies_cache is None:
-            Scraper.goalies_cache = self.ea.starting_goalies_endpoint()
-        today = date.today()
-        soup = BeautifulSoup(Scraper.goalies_cache, 'html.parser')
+        now = self.clock()
+        expired = self.goalies_df is None or now - self.checked_at >= self.ttl
+        metrics.cache_lookup("goalies_cache", not expired)
+        if expired:
+            self.refresh(backend)
+        return self.goalies_df
+
+    def refresh(self, backend="lxml"):
+        """Check the site for a new page and parse it if there is one
+
+        :return: True if the page changed
+        :rtype: bool
+        """
+        etag = last_modified = None
+        if self.goalies_df is not None:
+            etag, last_modified = self.etag, self.last_modified
+        html, etag, last_modified = self.ea.starting_goalies_endpoint(
+            etag, last_modified)
+        self.checked_at = self.clock()
+        if html is None:
+            return False
+        self.fetched_at = self.checked_at
+        self.etag, self.last_modified = etag, last_modified
+        with metrics.timer("parse", "starting_goalies"):
+            self.goalies_df = Parser(html, backend).parse(
+                date.fromtimestamp(self.fetched_at))
+        metrics.emit("rows", "starting_goalies", len(self.goalies_df.index))
+        self._index()
+        return True
+
+    def _index(self):
+        self.by_team_date = {}
+        self.by_date = {}
+        for name, row in zip(self.goalies_df.index,
+                             self.goalies_df.itertuples(index=False)):
+            game = {"name": name, "team": row.team,
+                    "opponent_team": row.opponent_team,
+                    "starting_status": row.starting_status}
+            self.by_team_date[(normalize_team(row.team), row.date)] = game
+            self.by_date.setdefault(row.date, []).append(game)
+
+    def starter(self, team, day):
+        """Return the projected starter of a team on a date
+
+        :param team: Team code, from rotowire or any of the other sources
+        :type team: str
+        :param day: Date of the game
+        :type day: datetime.date
+        :return: Dict with the goalie's name, team, opponent_team and
+            starting_status, or None if the team doesn't play
+        :rtype: dict
+        """
+        self.starting_goalies()
+        return self.by_team_date.get((normalize_team(team), day))
+
+    def starters_on(self, day):
+        """Return the projected starters of every team playing on a date
+
+        :param day: Date of the games
+        :type day: datetime.date
+        :return: Name, opponent and starting status indexed by team
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+        self.starting_goalies()
+        df = pd.DataFrame(self.by_date.get(day, []),
+                          columns=["team", "name", "opponent_team",
+                                   "starting_status"])
+        return df.set_index("team").sort_index()
+
+
+class Parser:
+    MATRIX = tables.XPath(
+        "//div[{}]".format(tables.has_class("starters-matrix")))
+    ROWS = tables.XPath(".//div[{}]".format(tables.has_class("flex-row")))
+    GOALIES_ROWS = tables.XPath(
+        ".//div[{}]".format(tables.has_class("goalies-row")))
+    GOALIE_ITEMS = tables.XPath(
+        ".//div[{}]".format(tables.has_class("goalie-item")))
+    GAME_INFO = tables.XPath(".//div[{}]".format(tables.has_class("sm-text")))
+    TEAM = tables.XPath(
+        "./div[{}]".format(tables.has_class("starters-matrix__team")))
+
+    def __init__(self, html, backend="lxml"):
+        """
+        :param html: Source of the starting goalies page
+        :type html: str
+        :param backend: "lxml" to walk the starters matrix with compiled
+            XPath queries, falling back to BeautifulSoup if the page doesn't
+            have the expected layout.  "bs4" to always use BeautifulSoup.
+        :type backend: str
+        """
+        self.html = html
+        self.backend = backend
+
+    def parse(self, today):
+        """Parse the starters matrix
+
+        :param today: Date of the first day in the matrix
+        :type today: datetime.date
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+        searchable_data = None
+        if self.backend == "lxml":
+            try:
+                searchable_data = self._parse_lxml(today)
+            except (IndexError, AttributeError):
+                pass
+        if searchable_data is None:
+            searchable_data = self._parse_bs4(today)
+
+        return_value = pd.DataFrame(searchable_data, columns=[
+            'date', 'name', 'team', 'opponent_team', 'starting_status'])
+        return_value.set_index('name', inplace=True)
+        return_value.sort_index(inplace=True)
+        return return_value
+
+    def _parse_lxml(self, today):
+        from lxml import etree
+        matrix = self.MATRIX(etree.HTML(self.html))[0]
+        searchable_data = []
+        for row in self.ROWS(matrix)[1:]:
+            team = tables.text(self.TEAM(row)[0])
+            for goalies_row in self.GOALIES_ROWS(row):
+                items = self.GOALIE_ITEMS(goalies_row)
+                for day_index, day in enumerate(items):
+                    for child in day:
+                        if not isinstance(child.tag, str):
+                            # Skip comments
+                            continue
+                        game_info = self.GAME_INFO(child)
+                        searchable_data.append(self._game(
+                            today, day_index, team,
+                            tables.text(child.find('.//a')),
+                            tables.text(game_info[0]),
+                            tables.text(game_info[1])))
+        return searchable_data
+
+    def _parse_bs4(self, today):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(self.html, 'html.parser')
         starter_data = soup.findAll("div", {'class': 'starters-matrix'})
         tds = starter_data[0].findAll("div", {'class': 'flex-row'})
         searchable_data = []
 
         for i in range(1, len(tds)):
+            team = tds[i].find('div', {'class': 'starters-matrix__team'}) \
+                .text
             days = tds[i].findAll('div', {'class': 'goalies-row'})
             for week_index in range(0,len(days)):
                 each_day = days[week_index].findAll('div', {'class': 'goalie-item'})
@@ -61,14 +263,15 @@ class Scraper:
                             # we have a game
                             goalie_name = child.find('a').text
                             game_info = child.findAll('div', {'class': 'sm-text'})
-                            opponent = game_info[0].text[-3:]
-                            status = game_info[1].text
-                            searchable_data.append([today + timedelta(days=day_index),goalie_name,opponent,status])
+                            searchable_data.append(self._game(
+                                today, day_index, team, goalie_name,
+                                game_info[0].text, game_info[1].text))
+        return searchable_data
+
+    def _game(self, today, day_index, team, goalie_name, opponent, status):
+        return [today + timedelta(days=day_index), goalie_name.strip(),
+                team.strip(), opponent.strip()[-3:].strip(), status.strip()]
 
-        return_value = pd.DataFrame(searchable_data,columns=['date', 'name', 'opponent_team', 'starting_status'])
-        return_value.set_index('name', inplace=True)
-        return_value.sort_index(inplace=True)
-        return return_value
 
 if __name__ == "__main__":
     scraper = Scraper()
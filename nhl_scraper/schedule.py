@@ -0,0 +1,279 @@
+#!/usr/bin/python
+
+"""
+An index over a season's schedule for fast per-team and per-date lookups.
+
+The index is built once from a schedule response and keeps a team x date
+matrix of games played and of opponents, plus the list of games on each
+date.  Range queries use prefix sums over the date axis, so counting games
+for every team in any window is a single vectorized subtraction.
+"""
+import datetime
+
+import numpy as np
+
+from nhl_scraper.nhl import NOT_PLAYED_STATES, _as_date
+
+
+class ScheduleIndex:
+    def __init__(self, start_date, end_date, team_ids=()):
+        """Create an empty index covering a range of dates
+
+        :param start_date: First date in the index
+        :type start_date: datetime.date
+        :param end_date: Last date in the index (inclusive)
+        :type end_date: datetime.date
+        :param team_ids: Teams to include up front.  Teams seen in later
+            updates are added as they appear.
+        :type team_ids: list(int)
+        """
+        self.start_date = _as_date(start_date)
+        self.end_date = _as_date(end_date)
+        num_days = (self.end_date - self.start_date).days + 1
+        self.team_ids = []
+        self.team_pos = {}
+        self.games = np.zeros((0, num_days), dtype=np.int8)
+        self.opponents = np.zeros((0, num_days), dtype=np.int32)
+        self.day_games = [[] for _ in range(num_days)]
+        self.game_slots = {}
+        self._cumulative = None
+        for team_id in team_ids:
+            self._team_row(team_id)
+
+    @classmethod
+    def from_schedule(cls, r, start_date=None, end_date=None, team_ids=()):
+        """Build an index from a schedule response
+
+        :param r: Schedule JSON document
+        :param start_date: First date in the index.  Defaults to the first
+            date in the response.
+        :param end_date: Last date in the index.  Defaults to the last date
+            in the response.
+        :rtype: ScheduleIndex
+        """
+        dates = [d["date"] for d in r.get("dates", [])]
+        if start_date is None:
+            start_date = datetime.date.fromisoformat(min(dates))
+        if end_date is None:
+            end_date = datetime.date.fromisoformat(max(dates))
+        index = cls(start_date, end_date, team_ids)
+        index.update(r)
+        return index
+
+    def update(self, r):
+        """Apply a (partial) schedule response to the index
+
+        Every date in the response replaces what the index had for that
+        date, and a game that shows up on a new date is removed from its old
+        one.  This keeps the index current when games are postponed and
+        rescheduled.  Dates past the end of the index are added to it.
+
+        :param r: Schedule JSON document
+        """
+        for game_date in r.get("dates", []):
+            day = datetime.date.fromisoformat(game_date["date"])
+            if day < self.start_date:
+                continue
+            self._extend_to(day)
+            col = self._col(day)
+            for game_pk, _, _ in list(self.day_games[col]):
+                self._remove_game(game_pk)
+            for game in game_date["games"]:
+                if game["gamePk"] in self.game_slots:
+                    self._remove_game(game["gamePk"])
+                if game["status"]["detailedState"] in NOT_PLAYED_STATES:
+                    continue
+                self._add_game(col, game["gamePk"],
+                               game["teams"]["away"]["team"]["id"],
+                               game["teams"]["home"]["team"]["id"])
+        self._cumulative = None
+
+    def clear(self, start_date, end_date):
+        """Remove every game in a range of dates
+
+        Schedule responses leave out the dates without any games, so
+        before applying a fresh pull of a range, clear the range so that
+        games moved off of a date that is now empty don't linger.
+
+        :param start_date: First date to clear
+        :type start_date: datetime.date
+        :param end_date: Last date to clear (inclusive)
+        :type end_date: datetime.date
+        """
+        start = max(self._col(start_date), 0)
+        end = min(self._col(end_date), len(self.day_games) - 1)
+        for col in range(start, end + 1):
+            for game_pk, _, _ in list(self.day_games[col]):
+                self._remove_game(game_pk)
+        self._cumulative = None
+
+    def _add_game(self, col, game_pk, away_id, home_id):
+        away = self._team_row(away_id)
+        home = self._team_row(home_id)
+        self.games[[away, home], col] += 1
+        self.opponents[away, col] = home_id
+        self.opponents[home, col] = away_id
+        self.day_games[col].append((game_pk, away_id, home_id))
+        self.game_slots[game_pk] = (col, away, home)
+
+    def _remove_game(self, game_pk):
+        col, away, home = self.game_slots.pop(game_pk)
+        self.games[[away, home], col] -= 1
+        self.opponents[[away, home], col] = 0
+        self.day_games[col] = [g for g in self.day_games[col]
+                               if g[0] != game_pk]
+
+    def _team_row(self, team_id):
+        if team_id not in self.team_pos:
+            self.team_pos[team_id] = len(self.team_ids)
+            self.team_ids.append(team_id)
+            num_days = self.games.shape[1]
+            self.games = np.vstack(
+                [self.games, np.zeros((1, num_days), dtype=np.int8)])
+            self.opponents = np.vstack(
+                [self.opponents, np.zeros((1, num_days), dtype=np.int32)])
+        return self.team_pos[team_id]
+
+    def _extend_to(self, day):
+        extra = (day - self.end_date).days
+        if extra <= 0:
+            return
+        self.games = np.pad(self.games, ((0, 0), (0, extra)))
+        self.opponents = np.pad(self.opponents, ((0, 0), (0, extra)))
+        self.day_games.extend([] for _ in range(extra))
+        self.end_date = day
+
+    def _col(self, date):
+        return (_as_date(date) - self.start_date).days
+
+    def _cols(self, start_date, end_date):
+        start = self._col(start_date)
+        end = self._col(end_date)
+        if start < 0 or end >= len(self.day_games) or start > end:
+            raise ValueError("{} to {} is outside of the index".format(
+                start_date, end_date))
+        return start, end + 1
+
+    def covers(self, start_date, end_date):
+        """Return True if the range of dates is within the index"""
+        return self.start_date <= _as_date(start_date) and \
+            _as_date(end_date) <= self.end_date
+
+    @property
+    def dates(self):
+        """All of the dates in the index
+
+        :rtype: numpy.ndarray of datetime64[D]
+        """
+        return np.arange(np.datetime64(self.start_date),
+                         np.datetime64(self.end_date) + 1)
+
+    @property
+    def cumulative(self):
+        """Prefix sums of games per team along the date axis"""
+        if self._cumulative is None:
+            self._cumulative = np.zeros(
+                (len(self.team_ids), self.games.shape[1] + 1), dtype=np.int32)
+            np.cumsum(self.games, axis=1, out=self._cumulative[:, 1:])
+        return self._cumulative
+
+    def games_count_array(self, start_date, end_date):
+        """Number of games of each team in a range of dates
+
+        :return: Game counts in the same order as team_ids
+        :rtype: numpy.ndarray
+        """
+        start, end = self._cols(start_date, end_date)
+        cum = self.cumulative
+        return cum[:, end] - cum[:, start]
+
+    def games_count(self, start_date, end_date):
+        """Returns a count of games for each team between a range of dates.
+
+        Teams without any games in the range are left out, the same as
+        Scraper.games_count.
+
+        :rtype: dict
+        """
+        counts = self.games_count_array(start_date, end_date)
+        return {self.team_ids[i]: int(counts[i])
+                for i in np.flatnonzero(counts)}
+
+    def games_count_windows(self, windows):
+        """Count the games of every team in many date ranges at once
+
+        :param windows: (start_date, end_date) of each range
+        :type windows: list(tuple)
+        :return: Game counts, one row per team and one column per window
+        :rtype: numpy.ndarray
+        """
+        bounds = np.array([self._cols(s, e) for s, e in windows])
+        cum = self.cumulative
+        return cum[:, bounds[:, 1]] - cum[:, bounds[:, 0]]
+
+    def games_per_week(self):
+        """Number of games each team plays in each ISO week
+
+        :return: One row per team and one column per (year, week)
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+        # DatetimeIndex.isocalendar needs a newer pandas than we support
+        weeks = [day.isocalendar()[:2] for day in self.dates.astype(object)]
+        df = pd.DataFrame(self.games, index=self.team_ids,
+                          columns=pd.MultiIndex.from_tuples(
+                              weeks, names=["year", "week"]))
+        return df.T.groupby(level=["year", "week"]).sum().T
+
+    def back_to_backs(self, team_id=None):
+        """Find the second night of back-to-back games
+
+        :param team_id: Team to look at.  Defaults to all teams.
+        :return: For a single team, the dates it plays on consecutive
+            nights.  Otherwise a team x date boolean matrix.
+        """
+        played = self.games > 0
+        b2b = np.zeros_like(played)
+        b2b[:, 1:] = played[:, 1:] & played[:, :-1]
+        if team_id is None:
+            return b2b
+        return self.dates[b2b[self.team_pos[team_id]]]
+
+    def games_per_day(self):
+        """Number of games on each date
+
+        :rtype: numpy.ndarray
+        """
+        return np.array([len(g) for g in self.day_games])
+
+    def off_nights(self, max_games=5):
+        """Dates with only a few games scheduled
+
+        :param max_games: Largest number of games for a date to count as an
+            off night
+        :type max_games: int
+        :return: Dates with between 1 and max_games games
+        :rtype: numpy.ndarray of datetime64[D]
+        """
+        per_day = self.games_per_day()
+        return self.dates[(per_day > 0) & (per_day <= max_games)]
+
+    def opponent(self, team_id, date):
+        """Return the team_id of a team's opponent on a date
+
+        :return: Opponent's team ID, or None if the team doesn't play
+        :raises ValueError: If the date is outside of the index
+        """
+        col, _ = self._cols(date, date)
+        opp = self.opponents[self.team_pos[team_id], col]
+        return int(opp) if opp else None
+
+    def games_on(self, date):
+        """Return the games on a date
+
+        :return: (gamePk, away team_id, home team_id) of each game
+        :rtype: list(tuple)
+        :raises ValueError: If the date is outside of the index
+        """
+        col, _ = self._cols(date, date)
+        return list(self.day_games[col])
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+
+"""
+A shared HTTP session for the endpoint adapters.
+
+All adapters go through one requests.Session so that connections are kept
+alive and pooled between calls.  Every request has a timeout, is retried
+with jittered exponential backoff on connection errors, 429 and 5xx
+responses, and is throttled by a per-host rate limiter.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RateLimiter:
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        """Limit the number of requests sent to each host
+
+        :param rate: Maximum number of requests per second to any one host.
+            None disables the limit.
+        :type rate: float
+        """
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        """Block until a request to the host is allowed
+
+        :param host: Host name the request is going to
+        :type host: str
+        """
+        delay = self.reserve(host)
+        if delay > 0:
+            self.sleep(delay)
+
+    def reserve(self, host):
+        """Take the next free slot for a request to the host
+
+        For callers that can't block, e.g. coroutines, which wait with
+        asyncio.sleep instead.
+
+        :param host: Host name the request is going to
+        :type host: str
+        :return: Seconds to wait before sending the request
+        :rtype: float
+        """
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = self.clock()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + 1.0 / self.rate
+        return slot - now
+
+
+class Session:
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, timeout=(5, 30), retries=3,
+                 backoff=0.5, max_backoff=30, rate=None):
+        """
+        :param pool_size: Number of connections kept open to each host
+        :type pool_size: int
+        :param timeout: Connect and read timeouts in seconds
+        :type timeout: tuple or float
+        :param retries: Number of times a failed request is retried
+        :type retries: int
+        :param backoff: Base delay in seconds between retries.  The delay
+            doubles on each attempt and is fully jittered.
+        :type backoff: float
+        :param max_backoff: Upper bound on the delay between retries
+        :type max_backoff: float
+        :param rate: Maximum requests per second to each host
+        :type rate: float
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = RateLimiter(rate)
+        self.sleep = time.sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, **kwargs):
+        """Send a GET request, retrying on transient failures
+
+        Accepts the same keyword arguments as requests.get.
+
+        :param url: URL to request
+        :type url: str
+        :return: The final response
+        :rtype: requests.Response
+        :raises: requests.RequestException if the request still fails after
+            all of the retries
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.limiter.wait(host)
+            response = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUS or \
+                        attempt >= self.retries:
+                    return response
+            self.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    def _delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None and retry_after.isdigit():
+                return min(int(retry_after), self.max_backoff)
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def close(self):
+        self.session.close()
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def default_session():
+    """Return the session shared by all of the endpoint adapters
+
+    :rtype: Session
+    """
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = Session()
+        return _default_session
+
+
+def set_default_session(session):
+    """Replace the shared session, e.g. to change the pool size or timeouts
+
+    :param session: Session to use from now on
+    :type session: Session
+    """
+    global _default_session
+    with _default_lock:
+        _default_session = session
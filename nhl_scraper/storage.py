@@ -0,0 +1,276 @@
+#!/usr/bin/python
+
+"""
+Columnar on-disk storage of scraped datasets.
+
+Each dataset is a directory of Parquet (or Feather) files, partitioned
+hive-style by columns such as season, date or source, e.g.
+skaters/season=20172018/part-....parquet.  The Arrow schema of the first
+write is kept alongside the files and later appends are cast to it, so all
+of the partitions share the same types.  Appends only write rows whose key
+isn't stored yet, and reads only load the columns and partitions asked for,
+from memory mapped files.
+"""
+import datetime
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+
+def season_of(date):
+    """Return the NHL season a date falls in, e.g. 20172018
+
+    Seasons are taken to roll over in July.
+
+    :type date: datetime.date
+    :rtype: int
+    """
+    start = date.year if date.month >= 7 else date.year - 1
+    return start * 10000 + start + 1
+
+
+class Store:
+    SCHEMA_FILE = "_schema.arrow"
+    FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
+    def __init__(self, root, format="parquet"):
+        """
+        :param root: Directory to keep the datasets in
+        :type root: str
+        :param format: "parquet" for compressed files, or "feather" for
+            uncompressed Arrow files that are the fastest to memory map
+        :type format: str
+        """
+        self.root = root
+        self.format = format
+        self.file_format = self.FORMATS[format]
+        self.fs = pyarrow.fs.LocalFileSystem(use_mmap=True)
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.path(name), self.SCHEMA_FILE))
+
+    def schema(self, name):
+        """Return the Arrow schema of a dataset, including its partitions
+
+        :rtype: pyarrow.Schema
+        """
+        with pa.memory_map(os.path.join(self.path(name),
+                                        self.SCHEMA_FILE)) as f:
+            return pa.ipc.read_schema(f)
+
+    def partition_by(self, name):
+        """Return the partition columns of a dataset
+
+        :rtype: list(str)
+        """
+        metadata = self.schema(name).metadata or {}
+        cols = metadata.get(b"partition_by", b"").decode("utf-8")
+        return cols.split(",") if cols else []
+
+    def dataset(self, name):
+        """Open a dataset for reading with pyarrow
+
+        :rtype: pyarrow.dataset.Dataset
+        """
+        schema = self.schema(name)
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(c) for c in self.partition_by(name)]),
+            flavor="hive")
+        return ds.dataset(self.path(name), schema=schema,
+                          format=self.file_format, partitioning=partitioning,
+                          filesystem=self.fs)
+
+    def append(self, name, df, partition_by=(), key=None):
+        """Add rows to a dataset, creating it if it doesn't exist
+
+        :param name: Name of the dataset
+        :type name: str
+        :param df: Rows to add.  The partition columns must be in the frame.
+        :type df: pandas.DataFrame
+        :param partition_by: Columns to partition the files by.  Only used
+            when the dataset is created.
+        :type partition_by: list(str)
+        :param key: Columns identifying a row.  If given, rows whose key is
+            already stored are skipped.
+        :type key: list(str)
+        :return: Number of rows written
+        :rtype: int
+        """
+        if key is not None and self.exists(name):
+            df = self._new_rows(name, df, list(key))
+        if len(df.index) == 0:
+            return 0
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.exists(name):
+            schema = self.schema(name)
+            partition_by = self.partition_by(name)
+            table = table.select(schema.names).cast(schema)
+        else:
+            schema = _storage_schema(table.schema, partition_by)
+            table = table.cast(schema)
+            self._write_schema(name, schema)
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(c) for c in partition_by]),
+            flavor="hive")
+        ds.write_dataset(
+            table, self.path(name), format=self.file_format,
+            partitioning=partitioning, filesystem=self.fs,
+            basename_template="part-{}-{{i}}.{}".format(
+                uuid.uuid4().hex, self.format),
+            existing_data_behavior="overwrite_or_ignore")
+        return table.num_rows
+
+    def _write_schema(self, name, schema):
+        os.makedirs(self.path(name), exist_ok=True)
+        tmp = os.path.join(self.path(name), "." + self.SCHEMA_FILE)
+        with pa.OSFile(tmp, "wb") as f:
+            f.write(schema.serialize())
+        os.replace(tmp, os.path.join(self.path(name), self.SCHEMA_FILE))
+
+    def _new_rows(self, name, df, key):
+        stored = self.keys(name, key)
+        if len(key) == 1:
+            is_new = [k not in stored for k in df[key[0]]]
+        else:
+            is_new = [k not in stored
+                      for k in zip(*(df[c] for c in key))]
+        return df[is_new]
+
+    def read(self, name, columns=None, filters=None):
+        """Load a dataset, or part of it, into a DataFrame
+
+        :param name: Name of the dataset
+        :type name: str
+        :param columns: Columns to load.  Defaults to all of them.
+        :type columns: list(str)
+        :param filters: Rows to load, as a pyarrow expression or a list of
+            (column, op, value) tuples.  Filters on partition columns skip
+            whole files.
+        :return: The rows, with the same dtypes they were written with
+        :rtype: pandas.DataFrame
+        """
+        if filters is not None and not isinstance(filters, ds.Expression):
+            filters = pq.filters_to_expression(filters)
+        table = self.dataset(name).to_table(columns=columns, filter=filters)
+        return table.to_pandas()
+
+    def keys(self, name, columns):
+        """Return the distinct values of some columns, reading only those
+
+        :param columns: One column, or a list of them
+        :return: Set of values, or of tuples when there are many columns
+        :rtype: set
+        """
+        if not self.exists(name):
+            return set()
+        single = isinstance(columns, str)
+        columns = [columns] if single else list(columns)
+        table = self.dataset(name).to_table(columns=columns)
+        values = [table.column(c).to_pylist() for c in columns]
+        if single:
+            return set(values[0])
+        return set(zip(*values))
+
+
+def _storage_schema(schema, partition_by):
+    """Make a written schema stable across appends
+
+    Dictionary (categorical) columns all get int32 indices, since pandas
+    picks the smallest type that fits each batch's categories, and the
+    partition columns are remembered in the schema's metadata.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(
+                pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    metadata = dict(schema.metadata or {})
+    metadata[b"partition_by"] = ",".join(partition_by).encode("utf-8")
+    return pa.schema(fields, metadata=metadata)
+
+
+def sync_box_scores(scraper, store, start_date, end_date, max_workers=8):
+    """Store the boxscores of the final games in a range of dates
+
+    Games that are already in the store aren't fetched again.  Skaters and
+    goalies go into the "skaters" and "goalies" datasets, partitioned by
+    season.
+
+    :param scraper: Scraper to fetch the schedule and boxscores with
+    :type scraper: nhl_scraper.nhl.Scraper
+    :param store: Store to write to
+    :type store: Store
+    :param start_date: First date to store
+    :type start_date: datetime.date
+    :param end_date: Last date to store (inclusive)
+    :type end_date: datetime.date
+    :return: gamePks of the games that were added
+    :rtype: list(int)
+    """
+    games = scraper.final_games(start_date, end_date)
+    stored = store.keys("skaters", "gamePk")
+    new_ids = [game_id for game_id, _ in games if game_id not in stored]
+    if not new_ids:
+        return []
+    skaters, goalies = scraper.box_score_tables(game_ids=new_ids,
+                                                max_workers=max_workers)
+    append_box_scores(store, skaters, goalies)
+    return new_ids
+
+
+def append_box_scores(store, skaters, goalies):
+    """Add skater and goalie tables to the store
+
+    The goalies are written first, so a game whose skaters are stored is
+    completely stored.
+
+    :param skaters: Skater table from boxscore.Normalizer
+    :type skaters: pandas.DataFrame
+    :param goalies: Goalie table from boxscore.Normalizer
+    :type goalies: pandas.DataFrame
+    :return: Number of rows written
+    :rtype: int
+    """
+    import pandas as pd
+    written = 0
+    for name, df in (("goalies", goalies), ("skaters", skaters)):
+        # Rows of games without a date get no season
+        seasons = [None if pd.isna(d) else season_of(d.date())
+                   for d in df["date"]]
+        df = df.assign(season=pd.array(
+            seasons, dtype="Int64" if None in seasons else "int64"))
+        written += store.append(name, df, partition_by=["season"],
+                                key=["gamePk", "id"])
+    return written
+
+
+def save_projections(store, source, df, date=None):
+    """Store a projections frame from one of the sources
+
+    Each day's projections are kept in their own partition of the
+    "<source>.<kind>" dataset, so older projections stay available.
+
+    :param source: Dataset to write to, e.g. "espn.skaters"
+    :type source: str
+    :param df: Projections, as returned by the source's parser
+    :type df: pandas.DataFrame
+    :param date: Date the projections were scraped.  Defaults to today.
+    :type date: datetime.date
+    :return: Number of rows written
+    :rtype: int
+    """
+    date = date or datetime.date.today()
+    df = df.reset_index(drop=True).assign(date=date.isoformat())
+    if store.exists(source) and \
+            date.isoformat() in store.keys(source, "date"):
+        return 0
+    return store.append(source, df, partition_by=["date"])
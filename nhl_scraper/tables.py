@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+"""
+Helpers for turning scraped HTML tables into DataFrames.
+
+Besides the dtype conversion shared by all of the parsers, this has the
+lxml extraction helpers used by the parsers' fast path.  They pull out just
+the tables they need in a single pass over the page, instead of building a
+full BeautifulSoup tree.  pandas and lxml are only loaded when a page is
+parsed.
+"""
+import io
+
+# Placeholders the sites show in place of a missing stat
+MISSING_VALUES = ["--", "—", "-", ""]
+
+
+def to_numeric_columns(df, columns=None):
+    """Convert columns of scraped text into numbers
+
+    The placeholders in MISSING_VALUES become NaN.  Columns of integers get
+    the nullable Int64 dtype, columns with decimals get float64.  A column
+    with any value that isn't a number is left as text.
+
+    :param df: Frame of scraped strings.  It is modified in place.
+    :type df: pandas.DataFrame
+    :param columns: Columns to convert.  Defaults to all of them.
+    :type columns: list
+    :return: The converted frame
+    :rtype: pandas.DataFrame
+    """
+    for col in df.columns if columns is None else columns:
+        numbers = _parse_numbers(df[col].tolist())
+        if numbers is not None:
+            df[col] = numbers
+    return df
+
+
+def _parse_numbers(values):
+    import pandas as pd
+    is_float = False
+    numbers = []
+    for value in values:
+        value = str(value).strip().replace(",", "")
+        if value in MISSING_VALUES:
+            numbers.append(None)
+            continue
+        try:
+            if "." in value:
+                numbers.append(float(value))
+                is_float = True
+            else:
+                numbers.append(int(value))
+        except ValueError:
+            return None
+    if is_float:
+        return pd.array([float("nan") if n is None else n for n in numbers],
+                        dtype="float64")
+    return pd.array(numbers, dtype="Int64")
+
+
+def find_tables(html, indexes):
+    """Extract tables from a page by their position in the document
+
+    The page is parsed incrementally and parsing stops as soon as the last
+    wanted table has been read.
+
+    :param html: Page source.  Bytes are decoded as UTF-8, which is how the
+        scrapers save the pages.
+    :type html: bytes or str
+    :param indexes: Position of each table to return, counting from 0 in
+        document order (the same order as BeautifulSoup's find_all)
+    :type indexes: list(int)
+    :return: Table elements keyed by their index
+    :rtype: dict
+    :raises: IndexError if the page doesn't have enough tables
+    """
+    from lxml import etree
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    wanted = set(indexes)
+    found = {}
+    open_tables = {}
+    count = -1
+    for event, el in etree.iterparse(io.BytesIO(html), events=("start", "end"),
+                                     tag="table", html=True,
+                                     encoding="utf-8"):
+        if event == "start":
+            count += 1
+            if count in wanted:
+                open_tables[id(el)] = count
+        elif id(el) in open_tables:
+            found[open_tables.pop(id(el))] = el
+            if len(found) == len(wanted):
+                return found
+    raise IndexError("Page has {} tables, wanted {}".format(
+        count + 1, sorted(wanted - set(found))))
+
+
+def find_first(html, xpath):
+    """Parse a page and return the first element matching an XPath
+
+    :raises: IndexError if nothing matches
+    """
+    from lxml import etree
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    root = etree.HTML(html, parser=etree.HTMLParser(encoding="utf-8"))
+    return root.xpath(xpath)[0]
+
+
+class XPath:
+    def __init__(self, path):
+        """An XPath query that is compiled the first time it is used
+
+        For the queries kept as class attributes of the parsers, so that
+        importing a parser doesn't load lxml.
+
+        :param path: XPath expression
+        :type path: str
+        """
+        self.path = path
+        self._compiled = None
+
+    def __call__(self, el):
+        if self._compiled is None:
+            from lxml import etree
+            self._compiled = etree.XPath(self.path)
+        return self._compiled(el)
+
+
+def has_class(name):
+    """XPath predicate matching elements that have a CSS class
+
+    Mirrors BeautifulSoup, which matches any one of an element's classes.
+    """
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {} ')" \
+        .format(name)
+
+
+def text(el):
+    """Return the stripped text of an element and all of its children
+
+    Equivalent to BeautifulSoup's el.text.strip().
+    """
+    return "".join(el.itertext()).strip()
+
+
+def body_rows(table):
+    """Return the rows in the tbody of a table"""
+    return table.xpath("./tbody/tr")
@@ -23,7 +23,11 @@ setup(name='nhl_scraper',
           'License :: OSI Approved :: MIT License',
           'Programming Language :: Python :: 3.7',
       ],
-      install_requires=['pandas', 'objectpath', 'requests'],
+      install_requires=['numpy', 'pandas', 'requests'],
+      extras_require={'async': ['aiohttp'], 'storage': ['pyarrow']},
+      entry_points={
+          'console_scripts': ['nhl-scraper=nhl_scraper.cli:main'],
+      },
       python_requires='>=3',
       include_package_data=True,
       zip_safe=True)
@@ -0,0 +1,76 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import os
+import re
+import pytest
+from nhl_scraper import nhl
+
+
+def minify(html):
+    return re.sub(r">\s+", ">", re.sub(r"\s+<", "<", html))
+
+
+def sample_file(fn):
+    return os.path.dirname(os.path.realpath(__file__)) + "/" + fn
+
+
+@pytest.fixture
+def nhl_scraper():
+    s = nhl.Scraper()
+
+    # Put the mock adapter in so we don't make calls out
+    mock = MockNhlEndpointAdapter()
+
+    cached_dates = [datetime.datetime(2018, 1, 14),
+                    datetime.datetime(2018, 1, 15),
+                    datetime.datetime(2018, 1, 16)]
+    for cached_date in cached_dates:
+        mock.add_date(cached_date)
+
+    s.set_endpoint_adapter(mock)
+    return s
+
+
+class MockNhlEndpointAdapter:
+    def __init__(self):
+        self.dir_path = os.path.dirname(os.path.realpath(__file__))
+        self.schedule_cache = {}
+        self.schedule_calls = 0
+        self.players_cache = None
+
+    def teams_endpoint(self):
+        fn = "sample.nhl.teams.json"
+        with open(self.dir_path + "/" + fn, "r") as f:
+            return json.load(f)
+
+    def schedule_endpoint(self, startDate, endDate):
+        self.schedule_calls += 1
+        dates = []
+        cur_date = datetime.date.fromisoformat(startDate)
+        while cur_date <= datetime.date.fromisoformat(endDate):
+            if cur_date not in self.schedule_cache:
+                raise RuntimeError(
+                    "{} is not in the schedule cache".format(cur_date))
+            dates += self.schedule_cache[cur_date]["dates"]
+            cur_date = cur_date + datetime.timedelta(days=1)
+        return {"dates": dates}
+
+    def add_date(self, date):
+        ds = date.strftime("%Y%m%d")
+        fn = "sample.nhl.schedule.{}.json".format(ds)
+        with open(self.dir_path + "/" + fn, "r") as f:
+            self.schedule_cache[date.date()] = json.load(f)
+
+    def boxscore_endpoint(self, game_id):
+        fn = "sample.nhl.boxscore.{}.json".format(game_id)
+        with open(self.dir_path + "/" + fn, "r") as f:
+            return json.load(f)
+
+    def players_endpoint(self, team_ids):
+        if self.players_cache is None:
+            fn = "sample.nhl.players.json"
+            with open(self.dir_path + "/" + fn, "r") as f:
+                self.players_cache = json.load(f)
+        return self.players_cache
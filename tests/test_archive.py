@@ -0,0 +1,47 @@
+#!/usb/bin/python
+
+import gzip
+import os
+import pytest
+from nhl_scraper.archive import HtmlArchive
+
+
+def test_put_get(archive):
+    digest = archive.put("<html>é</html>", "espn.skaters.pg0")
+    assert(len(digest) == 64)
+    assert(digest in archive)
+    assert(archive.get(digest) == "<html>é</html>".encode("utf-8"))
+    with open(archive.path(digest), "rb") as f:
+        assert(gzip.decompress(f.read()) == "<html>é</html>".encode("utf-8"))
+
+
+def test_same_page_stored_once(archive):
+    d1 = archive.put(b"<html>1</html>", "cbssports.goalies")
+    d2 = archive.put(b"<html>1</html>", "cbssports.goalies")
+    assert(d1 == d2)
+    files = [f for _, _, fs in os.walk(archive.root) for f in fs
+             if f.endswith(".html.gz")]
+    assert(len(files) == 1)
+    assert(len(archive.index()) == 2)
+
+
+def test_latest(archive):
+    archive.put(b"<html>1</html>", "cbssports.goalies")
+    archive.clock = lambda: 2000.0
+    archive.put(b"<html>2</html>", "cbssports.goalies")
+    archive.put(b"<html>3</html>", "cbssports.defense")
+    assert(archive.latest("cbssports.goalies") == b"<html>2</html>")
+    assert(archive.index()[1]["time"] == 2000.0)
+    with pytest.raises(KeyError):
+        archive.latest("espn.goalies.pg0")
+
+
+def test_missing(archive):
+    with pytest.raises(KeyError):
+        archive.get("0" * 64)
+    assert(archive.index() == [])
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HtmlArchive(str(tmp_path / "archive"), clock=lambda: 1000.0)
@@ -0,0 +1,153 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper import backfill, cli, storage
+from nhl_scraper.backfill import Backfill, Checkpoint, SharedRateLimiter
+from nhl_scraper.replay import ReplayAdapter
+
+SEASON = 20172018
+DIR_PATH = os.path.dirname(os.path.realpath(__file__))
+
+
+def test_parse_seasons():
+    assert(backfill.parse_seasons("2016-2018") ==
+           [20162017, 20172018, 20182019])
+    assert(backfill.parse_seasons("20172018, 2015") == [20152016, 20172018])
+    with pytest.raises(ValueError):
+        backfill.parse_seasons("2018-2016")
+
+
+def test_shards():
+    games = [(1, datetime.date(2018, 1, 14)), (2, datetime.date(2018, 1, 14)),
+             (3, datetime.date(2018, 1, 16))]
+    shards = backfill.shards(SEASON, games, shard_days=1)
+    assert(shards == [("20172018.2018-01-14", games[:2]),
+                      ("20172018.2018-01-16", games[2:])])
+    # Week long shards start on Sundays
+    assert(backfill.shards(SEASON, games) ==
+           [("20172018.2018-01-14", games)])
+
+
+def test_shared_rate_limiter():
+    clock = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+    limiter = SharedRateLimiter(4, clock=lambda: clock[0], sleep=sleep)
+    for _ in range(3):
+        limiter.wait("statsapi.web.nhl.com")
+    # Another host shares the same limit
+    limiter.wait("example.com")
+    assert(sleeps == [0.25, 0.5, 0.75])
+
+
+def test_checkpoint_ignores_partial_line(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    Checkpoint(path).mark("a", [2, 1])
+    with open(path, "a") as f:
+        f.write('{"shard": "b", "gam')
+    assert(Checkpoint(path).done == {1, 2})
+
+
+def test_make_adapter(recordings):
+    limiter = SharedRateLimiter(5)
+    ea = backfill.make_adapter(base_url="http://localhost:8000/api/v1/",
+                               limiter=limiter)
+    assert(ea.NHL_URL == "http://localhost:8000/api/v1")
+    assert(ea.session.limiter is limiter)
+    ea = backfill.make_adapter(replay=recordings)
+    assert(ea.adapter is None)
+
+
+def test_backfill(store, recordings):
+    bf = Backfill(store, processes=0, shard_days=1, replay=recordings)
+    assert(bf.run([SEASON]) == 10)
+    assert(len(store.keys("skaters", "gamePk")) == 10)
+    assert(store.keys("goalies", "season") == {SEASON})
+    # Nothing is left to fetch on the next run
+    bf = Backfill(store, processes=0, shard_days=1, replay=recordings)
+    assert(bf.pending([SEASON]) == [])
+    assert(bf.run([SEASON]) == 0)
+
+
+def test_resume_after_failure(store, recordings):
+    # The boxscores of the 16th weren't recorded, so that shard fails
+    missing = [g for g, d in season_games() if d.day == 16]
+    for game_id in missing:
+        os.rename(recorded_boxscore(recordings, game_id),
+                  recorded_boxscore(recordings, game_id) + ".bak")
+    bf = Backfill(store, processes=0, shard_days=1, replay=recordings)
+    with pytest.raises(KeyError):
+        bf.run([SEASON])
+    assert(len(bf.checkpoint.done) == 4)
+    for game_id in missing:
+        os.rename(recorded_boxscore(recordings, game_id) + ".bak",
+                  recorded_boxscore(recordings, game_id))
+    # The stored shard isn't fetched again
+    bf = Backfill(store, processes=0, shard_days=1, replay=recordings)
+    assert([name for name, _ in bf.pending([SEASON])] ==
+           ["20172018.2018-01-16"])
+    assert(bf.run([SEASON]) == 6)
+    assert(len(store.read("skaters").index) ==
+           10 * len(store.read("skaters", filters=[
+               ("gamePk", "==", missing[0])]).index))
+
+
+def test_backfill_processes(store, recordings):
+    bf = Backfill(store, processes=2, threads=2, shard_days=1,
+                  replay=recordings)
+    assert(bf.run([SEASON]) == 10)
+    assert(len(store.keys("skaters", "gamePk")) == 10)
+
+
+def test_cli(tmp_path, recordings, capsys):
+    root = str(tmp_path / "cli")
+    assert(cli.main(["backfill", "--seasons", "2017", "--store", root,
+                     "--processes", "0", "--replay", recordings]) == 0)
+    assert("Stored 10 games" in capsys.readouterr().out)
+    assert(storage.Store(root).keys("skaters", "season") == {SEASON})
+
+
+class SeasonEndpointAdapter:
+    """Serves the sample days as a season, with the same boxscore for
+    every game"""
+    def schedule_endpoint(self, season):
+        dates = []
+        for day in ["20180114", "20180115", "20180116"]:
+            with open(DIR_PATH +
+                      "/sample.nhl.schedule.{}.json".format(day)) as f:
+                dates += json.load(f)["dates"]
+        return {"dates": dates}
+
+    def boxscore_endpoint(self, game_id):
+        with open(DIR_PATH + "/sample.nhl.boxscore.2017020681.json") as f:
+            return json.load(f)
+
+
+def season_games():
+    r = SeasonEndpointAdapter().schedule_endpoint(str(SEASON))
+    return [(g["gamePk"], datetime.date.fromisoformat(d["date"]))
+            for d in r["dates"] for g in d["games"]]
+
+
+def recorded_boxscore(root, game_id):
+    return ReplayAdapter(root).path("boxscore_endpoint", (game_id,))
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    root = str(tmp_path / "recordings")
+    recorder = ReplayAdapter(root, adapter=SeasonEndpointAdapter())
+    recorder.schedule_endpoint(season=str(SEASON))
+    for game_id, _ in season_games():
+        recorder.boxscore_endpoint(game_id)
+    return root
+
+
+@pytest.fixture
+def store(tmp_path):
+    return storage.Store(str(tmp_path / "store"))
@@ -0,0 +1,54 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper import boxscore
+
+
+def test_toi_seconds():
+    assert(boxscore.toi_seconds("19:45") == 1185)
+    assert(boxscore.toi_seconds("64:37") == 3877)
+    assert(boxscore.toi_seconds("") is None)
+
+
+def test_skaters(sample_boxscore):
+    skaters, _ = boxscore.normalize(
+        [(sample_boxscore, 2017020681, datetime.date(2018, 1, 14))])
+    # Scratched players are left out
+    assert(len(skaters.index) == 7)
+    mantha = skaters[skaters.name == "Anthony Mantha"].iloc[0]
+    assert(mantha["goals"] == 2)
+    assert(mantha["ppg"] == 1)
+    assert(mantha["toi"] == 17 * 60 + 2)
+    assert(mantha["date"] == datetime.datetime(2018, 1, 14))
+    assert(str(skaters.goals.dtype) == "Int64")
+    assert(str(skaters.position.dtype) == "category")
+
+
+def test_goalies(sample_boxscore):
+    _, goalies = boxscore.normalize([sample_boxscore])
+    assert(len(goalies.index) == 2)
+    howard = goalies[goalies.name == "Jimmy Howard"].iloc[0]
+    forsberg = goalies[goalies.name == "Anton Forsberg"].iloc[0]
+    assert(howard["so"] == 1)
+    assert(howard["ga"] == 0)
+    assert(forsberg["so"] == 0)
+    assert(forsberg["ga"] == 4)
+    assert(forsberg["toi"] == 58 * 60 + 40)
+
+
+def test_many_games(sample_boxscore):
+    skaters, goalies = boxscore.normalize(
+        [(sample_boxscore, game_id, None) for game_id in range(50)])
+    assert(len(skaters.index) == 50 * 7)
+    assert(len(goalies.index) == 50 * 2)
+    assert(skaters.groupby("gamePk").goals.sum().eq(4).all())
+
+
+@pytest.fixture
+def sample_boxscore():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.boxscore.2017020681.json", "r") as f:
+        return json.load(f)
@@ -0,0 +1,171 @@
+#!/usb/bin/python
+
+import os
+import time
+import threading
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from nhl_scraper import browser
+
+
+def test_wait_for_rows(driver):
+    driver.pages = [[], [], ["Player 0", "Player 1"]]
+    rows = browser.wait_for_rows(driver, timeout=5)
+    assert(len(rows) == 2)
+    assert(driver.calls == 3)
+
+
+def test_wait_for_rows_timeout(driver):
+    with pytest.raises(TimeoutException):
+        browser.wait_for_rows(driver, timeout=0.3)
+
+
+def test_wait_for_change(driver):
+    driver.pages = [["Player 0"], [], ["Player 0"], ["Player 50"]]
+    before = browser.first_row_text(driver)
+    rows = browser.wait_for_change(driver, before, timeout=5)
+    assert(rows[0].text == "Player 50")
+
+
+def test_pool_reuses_drivers(pool):
+    with pool.driver() as d1:
+        pass
+    with pool.driver() as d2:
+        pass
+    assert(d1 is d2)
+    assert(len(pool.drivers) == 1)
+
+
+def test_pool_size_limit(pool):
+    pool.size = 2
+    seen = []
+    lock = threading.Lock()
+
+    def fn(driver, item):
+        with lock:
+            seen.append(driver)
+        time.sleep(0.05)
+        return item * 2
+
+    assert(pool.map(fn, range(6)) == [0, 2, 4, 6, 8, 10])
+    assert(len(set(map(id, seen))) == 2)
+    assert(len(pool.drivers) == 2)
+
+
+def test_pool_discards_broken_driver(pool):
+    with pytest.raises(WebDriverException):
+        with pool.driver() as d1:
+            raise WebDriverException("browser crashed")
+    assert(d1.quit_called)
+    with pool.driver() as d2:
+        pass
+    assert(d1 is not d2)
+
+
+def test_pool_discard_wakes_waiter(pool):
+    acquired = []
+    d1 = pool.acquire()
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()),
+                              daemon=True)
+    waiter.start()
+    time.sleep(0.05)
+    assert(acquired == [])
+    pool.discard(d1)
+    waiter.join(timeout=5)
+    # The waiting thread starts a new driver in the freed slot
+    assert(not waiter.is_alive())
+    assert(acquired[0] is not d1)
+    assert(pool.drivers == acquired)
+
+
+def test_pool_releases_after_other_errors(pool):
+    with pytest.raises(ValueError):
+        with pool.driver() as d1:
+            raise ValueError("bad page")
+    assert(not d1.quit_called)
+    # The only slot is free again instead of blocking forever
+    with pool.driver() as d2:
+        pass
+    assert(d1 is d2)
+    assert(len(pool.drivers) == 1)
+
+
+def test_pool_releases_on_generator_close(pool):
+    def pages():
+        with pool.driver() as driver:
+            yield driver
+            yield driver
+    gen = pages()
+    d1 = next(gen)
+    gen.close()
+    assert(pool.acquire() is d1)
+
+
+def test_pool_close(pool):
+    with pool.driver() as d1:
+        pass
+    pool.close()
+    assert(d1.quit_called)
+    assert(pool.drivers == [])
+
+
+def test_stand_in_page(chrome_pool):
+    url = "file://" + os.path.dirname(os.path.realpath(__file__)) + \
+        "/sample.browser.paged.html"
+    with chrome_pool.driver() as driver:
+        start = time.time()
+        driver.get(url + "?delay=300")
+        rows = browser.wait_for_rows(driver, timeout=5)
+        assert(rows[0].text.startswith("Player 0 "))
+        before = browser.first_row_text(driver)
+        browser.click(driver, By.ID, "next")
+        rows = browser.wait_for_change(driver, before, timeout=5)
+        assert(rows[0].text.startswith("Player 50 "))
+        assert(len(rows) == 50)
+        # Two 300ms renders, well below the old fixed 5s sleep per page
+        assert(time.time() - start < 4)
+
+
+class FakeRow:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeDriver:
+    """Returns the next list of rows from pages on each lookup"""
+    def __init__(self):
+        self.pages = []
+        self.calls = 0
+        self.quit_called = False
+
+    def find_elements(self, by, selector):
+        self.calls += 1
+        rows = self.pages.pop(0) if len(self.pages) > 1 else \
+            (self.pages[0] if self.pages else [])
+        return [FakeRow(t) for t in rows]
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+
+@pytest.fixture
+def pool():
+    return browser.DriverPool(factory=FakeDriver)
+
+
+@pytest.fixture
+def chrome_pool():
+    pool = browser.DriverPool(headless=True)
+    try:
+        with pool.driver():
+            pass
+    except WebDriverException as e:
+        pytest.skip("Chrome is not available: {}".format(e.msg))
+    yield pool
+    pool.close()
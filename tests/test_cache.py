@@ -0,0 +1,143 @@
+#!/usb/bin/python
+
+import json
+import os
+import pytest
+from nhl_scraper import nhl
+from nhl_scraper.cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_get(response_cache):
+    response_cache.put("teams", {"teams": [1, 2]}, ttl=None)
+    assert(response_cache.get("teams") == {"teams": [1, 2]})
+    assert(response_cache.get("schedule") is None)
+    stats = response_cache.stats()
+    assert(stats["hits"] == 1)
+    assert(stats["misses"] == 1)
+    assert(stats["entries"] == 1)
+
+
+def test_expiry(response_cache):
+    response_cache.put("schedule", {"dates": []}, ttl=60)
+    response_cache.put("boxscore", {"teams": {}}, ttl=None)
+    response_cache.clock.now += 61
+    assert(response_cache.get("schedule") is None)
+    assert(response_cache.get("boxscore") == {"teams": {}})
+
+
+def test_persistent(tmp_path):
+    fn = str(tmp_path / "nhl.cache.db")
+    rc = ResponseCache(fn)
+    rc.put("teams", {"teams": []})
+    rc.close()
+    assert(ResponseCache(fn).get("teams") == {"teams": []})
+
+
+def test_size_eviction(response_cache):
+    doc = {"data": "".join(str(n) for n in range(2000))}
+    response_cache.put("a", doc)
+    response_cache.clock.now += 1
+    response_cache.put("b", doc)
+    response_cache.clock.now += 1
+    response_cache.get("a")
+    response_cache.max_bytes = response_cache.stats()["bytes"] - 1
+    response_cache.clock.now += 1
+    response_cache.put("c", {"data": 1})
+    # "b" is the least recently used entry
+    assert(response_cache.get("b") is None)
+    assert(response_cache.get("a") == doc)
+    assert(response_cache.stats()["evictions"] == 1)
+
+
+def test_access_times_batched(response_cache):
+    response_cache.ACCESS_BATCH = 2
+    response_cache.put("a", {"data": 1})
+    response_cache.put("b", {"data": 2})
+    changes = response_cache.conn.total_changes
+    response_cache.clock.now += 1
+    # A single hit doesn't write to the database
+    response_cache.get("a")
+    assert(response_cache.conn.total_changes == changes)
+    response_cache.get("b")
+    assert(response_cache.conn.total_changes == changes + 2)
+    assert(response_cache.conn.execute(
+        "SELECT MIN(accessed) FROM responses").fetchone()[0] ==
+        response_cache.clock.now)
+
+
+def test_access_times_written_on_close(tmp_path):
+    fn = str(tmp_path / "nhl.cache.db")
+    clock = Clock()
+    rc = ResponseCache(fn, clock=clock)
+    rc.put("teams", {"teams": []})
+    clock.now += 1
+    rc.get("teams")
+    rc.close()
+    rc = ResponseCache(fn)
+    assert(rc.conn.execute("SELECT accessed FROM responses").fetchone()[0] ==
+           clock.now)
+
+
+def test_caching_adapter_ttls(monkeypatch, response_cache):
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.schedule.20180114.json", "r") as f:
+        schedule = json.load(f)
+    responses = {
+        "schedule?&startDate=2018-01-14&endDate=2018-01-14": schedule,
+        "game/2017020681/boxscore": {"teams": {}},
+        "game/2099020001/boxscore": {"teams": {}},
+    }
+    calls = []
+
+    def get(self, api):
+        calls.append(api)
+        return responses[api]
+    monkeypatch.setattr(nhl.EndpointAdapter, "get", get)
+
+    ea = nhl.CachingEndpointAdapter(response_cache)
+    ea.schedule_endpoint(startDate="2018-01-14", endDate="2018-01-14")
+    ea.boxscore_endpoint(2017020681)
+    ea.boxscore_endpoint(2099020001)
+    response_cache.clock.now += 24 * 60 * 60
+    ea.schedule_endpoint(startDate="2018-01-14", endDate="2018-01-14")
+    ea.boxscore_endpoint(2017020681)
+    ea.boxscore_endpoint(2099020001)
+    # Past schedule and final boxscore come from the cache.  The boxscore of
+    # a game that isn't known to be final has expired.
+    assert(calls == ["schedule?&startDate=2018-01-14&endDate=2018-01-14",
+                     "game/2017020681/boxscore",
+                     "game/2099020001/boxscore",
+                     "game/2099020001/boxscore"])
+
+
+def test_final_games_persist(monkeypatch, tmp_path):
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.schedule.20180114.json", "r") as f:
+        schedule = json.load(f)
+    monkeypatch.setattr(nhl.EndpointAdapter, "get",
+                        lambda self, api: schedule)
+    fn = str(tmp_path / "nhl.cache.db")
+    rc = ResponseCache(fn)
+    nhl.CachingEndpointAdapter(rc).schedule_endpoint(
+        startDate="2018-01-14", endDate="2018-01-14")
+    rc.close()
+
+    # A new process that only asks for boxscores
+    ea = nhl.CachingEndpointAdapter(ResponseCache(fn))
+    assert(2017020681 in ea.final_games)
+    assert(ea.ttl("game/2017020681/boxscore", {"teams": {}}) is None)
+    assert(ea.ttl("game/2099020001/boxscore", {"teams": {}}) ==
+           ea.TTLS["boxscore_live"])
+
+
+@pytest.fixture
+def response_cache():
+    return ResponseCache(":memory:", clock=Clock())
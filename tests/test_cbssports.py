@@ -0,0 +1,47 @@
+#!/usb/bin/python
+
+import pytest
+from nhl_scraper import cbssports
+from tests.conftest import minify, sample_file
+
+
+def test_parse_skaters(cbs_forwards):
+    df = cbs_forwards.parse(0)
+    assert(len(df.index) == 10)
+    assert(df[df.name == "Auston Matthews"].iloc(0)[0]["Tm"] == "TOR")
+    assert(df[df.name == "Auston Matthews"].iloc(0)[0]["G"] == 41)
+    assert(df.FPTS.dtype == "float64")
+
+
+def test_parse_goalies():
+    df = cbssports.Parser(sample_file("sample.cbssports.goalies.html")) \
+        .parse(0)
+    assert(len(df.index) == 5)
+    # The "—" placeholder becomes a missing value
+    assert(df.SO.isna().sum() == 1)
+    assert(str(df.SO.dtype) == "Int64")
+
+
+@pytest.mark.parametrize("fn", ["sample.cbssports.forwards.html",
+                                "sample.cbssports.goalies.html"])
+def test_backends_match(fn):
+    lxml_df = cbssports.Parser(sample_file(fn), backend="lxml").parse(0)
+    bs4_df = cbssports.Parser(sample_file(fn), backend="bs4").parse(0)
+    assert(lxml_df.equals(bs4_df))
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+@pytest.mark.parametrize("fn", ["sample.cbssports.forwards.html",
+                                "sample.cbssports.goalies.html"])
+def test_parse_page_source(fn, backend):
+    """Pages straight from the browser aren't prettified"""
+    with open(sample_file(fn)) as f:
+        html = minify(f.read())
+    from_file = cbssports.Parser(sample_file(fn)).parse(0)
+    from_html = cbssports.Parser(html=html, backend=backend).parse(0)
+    assert(from_file.equals(from_html))
+
+
+@pytest.fixture
+def cbs_forwards():
+    return cbssports.Parser(sample_file("sample.cbssports.forwards.html"))
@@ -0,0 +1,150 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import pytest
+from nhl_scraper import espn
+from tests.conftest import minify, sample_file
+
+
+def test_parse_skaters(espn_skaters):
+    df = espn_skaters.parse(0)
+    assert(len(df.index) == 11)
+    assert(df[df.Name == "Connor McDavid"].iloc(0)[0]["Tm"] == "Edm")
+    assert(df[df.Name == "Connor McDavid"].iloc(0)[0]["G"] == 30)
+    assert(str(df.G.dtype) == "Int64")
+    # Players without projections are dropped
+    assert("Roman Josi" not in df.Name.tolist())
+
+
+def test_parse_index_offset(espn_skaters):
+    df = espn_skaters.parse(100)
+    assert(df.index[0] == 100)
+
+
+def test_parse_goalies():
+    df = espn.Parser(sample_file("sample.espn.goalies.html")).parse(0)
+    assert(len(df.index) == 4)
+    assert(df["SV%"].dtype == "float64")
+    assert(df[df.Name == "Tuukka Rask"].iloc(0)[0]["W"] == 23)
+
+
+@pytest.mark.parametrize("fn", ["sample.espn.skaters.html",
+                                "sample.espn.goalies.html"])
+def test_backends_match(fn):
+    lxml_df = espn.Parser(sample_file(fn), backend="lxml").parse(0)
+    bs4_df = espn.Parser(sample_file(fn), backend="bs4").parse(0)
+    assert(lxml_df.equals(bs4_df))
+
+
+def test_missing_table(tmp_path):
+    fn = tmp_path / "page.html"
+    fn.write_text("<html><body><table></table></body></html>")
+    with pytest.raises(IndexError):
+        espn.Parser(str(fn)).parse(0)
+
+
+def test_api_skaters(espn_api):
+    df = espn_api.projections(False)
+    assert(df.Name.tolist() == ["Connor McDavid", "Nathan MacKinnon",
+                                "Auston Matthews"])
+    mcdavid = df[df.Name == "Connor McDavid"].iloc(0)[0]
+    assert(mcdavid["Tm"] == "Edm")
+    assert(mcdavid["G"] == 30)
+    assert(mcdavid["SOG"] == 213)
+    assert(str(df.G.dtype) == "Int64")
+    # Only last season's projection for Matthews: 2019 is ignored
+    assert(df[df.Name == "Auston Matthews"].iloc(0)[0]["G"] == 45)
+
+
+def test_api_goalies(espn_api):
+    df = espn_api.projections(True, 10)
+    assert(df.index.tolist() == [10, 11])
+    assert(df["SV%"].dtype == "float64")
+    assert(df[df.Name == "Andrei Vasilevskiy"].iloc(0)[0]["GAA"] == 3.32)
+    assert(df[df.Name == "Tuukka Rask"].iloc(0)[0]["W"] == 23)
+
+
+def test_api_same_layout_as_pages(espn_api):
+    for pick_goalies, fn in [(False, "sample.espn.skaters.html"),
+                             (True, "sample.espn.goalies.html")]:
+        page_df = espn.Parser(sample_file(fn)).parse(0)
+        api_df = espn_api.projections(pick_goalies)
+        assert(page_df.columns.tolist() == api_df.columns.tolist())
+        assert(page_df.dtypes.tolist() == api_df.dtypes.tolist())
+
+
+def test_api_paging(espn_api):
+    espn_api.PAGE_SIZE = 2
+    assert(len(espn_api.players(False)) == 4)
+    assert(espn_api.ea.offsets == [0, 2, 4])
+
+
+def test_current_season():
+    assert(espn.current_season(datetime.date(2019, 10, 1)) == 2020)
+    assert(espn.current_season(datetime.date(2020, 3, 1)) == 2020)
+
+
+class MockEspnEndpointAdapter:
+    def __init__(self):
+        with open(sample_file("sample.espn.api.players.json")) as f:
+            self.players = json.load(f)["players"]
+        self.offsets = []
+
+    def players_endpoint(self, season, slot_ids, offset, limit):
+        self.offsets.append(offset)
+        players = [p for p in self.players
+                   if set(p["player"]["eligibleSlots"]) & set(slot_ids)]
+        return {"players": players[offset:offset + limit]}
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+@pytest.mark.parametrize("fn", ["sample.espn.skaters.html",
+                                "sample.espn.goalies.html"])
+def test_parse_page_source(fn, backend):
+    """Pages straight from the browser aren't prettified"""
+    with open(sample_file(fn)) as f:
+        html = minify(f.read())
+    from_file = espn.Parser(sample_file(fn)).parse(0)
+    assert(from_file.equals(espn.Parser(html=html, backend=backend).parse(0)))
+
+
+def test_parse_pages():
+    with open(sample_file("sample.espn.skaters.html")) as f:
+        html = minify(f.read())
+    df = espn.parse_pages(iter([html, html]))
+    assert(len(df.index) == 22)
+    assert(df.index.tolist() == list(range(22)))
+
+
+def test_pages_wait_for_view_change(monkeypatch):
+    from nhl_scraper import browser
+    calls = []
+    for name in ("wait_for_rows", "first_row_text", "click",
+                 "wait_for_change"):
+        monkeypatch.setattr(browser, name,
+                            lambda driver, *args, name=name:
+                            calls.append((name,) + args))
+
+    class Driver:
+        page_source = "<html></html>"
+
+        def get(self, url):
+            pass
+    sc = espn.ProjectionScraper(pool=browser.DriverPool(factory=Driver))
+    assert(list(sc._iter_pages(Driver(), False, 1)) == ["<html></html>"])
+    # The skater view is only captured once its rows replaced the old ones
+    assert([c[0] for c in calls] == ["wait_for_rows", "first_row_text",
+                                     "click", "wait_for_change"])
+
+
+@pytest.fixture
+def espn_skaters():
+    return espn.Parser(sample_file("sample.espn.skaters.html"))
+
+
+@pytest.fixture
+def espn_api():
+    sc = espn.ApiScraper(2020)
+    sc.set_endpoint_adapter(MockEspnEndpointAdapter())
+    return sc
@@ -0,0 +1,148 @@
+#!/usb/bin/python
+
+import datetime
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from nhl_scraper import cbssports, espn
+from nhl_scraper.fantasy import FantasyProjector, weekly_windows
+from nhl_scraper.resolver import PlayerResolver
+
+SCORING = {"G": 3, "A": 2, "SOG": 0.5, "W": 4, "GA": -1}
+WINDOWS = [(datetime.date(2018, 1, 14), datetime.date(2018, 1, 14)),
+           (datetime.date(2018, 1, 15), datetime.date(2018, 1, 16))]
+
+
+def test_weekly_windows():
+    windows = weekly_windows(datetime.date(2018, 1, 10),
+                             datetime.date(2018, 1, 23))
+    assert(windows == [
+        (datetime.date(2018, 1, 10), datetime.date(2018, 1, 14)),
+        (datetime.date(2018, 1, 15), datetime.date(2018, 1, 21)),
+        (datetime.date(2018, 1, 22), datetime.date(2018, 1, 23))])
+
+
+def test_rates_single_source(projector, espn_skaters):
+    projector.add_source("espn", espn_skaters)
+    players = projector.players
+    mcdavid = players.index[players.name == "Connor McDavid"][0]
+    assert(players.team[mcdavid] == "EDM")
+    assert(players.team_id[mcdavid] == 22)
+    rates = projector.rates()
+    assert(rates.shape == (len(espn_skaters.index), len(SCORING)))
+    assert(rates[mcdavid, 0] == pytest.approx(30 / 82))
+    # Goalie stats aren't in the skater table
+    assert(rates[mcdavid, 3] == 0)
+
+
+def test_blend(projector, espn_skaters, cbs_forwards):
+    projector.add_source("espn", espn_skaters, weight=3)
+    projector.add_source("cbssports", cbs_forwards, weight=1)
+    players = projector.players
+    # Players in both sources are matched up, even with different team codes
+    assert(len(players.index) < len(espn_skaters.index) +
+           len(cbs_forwards.index))
+    kucherov = players.index[players.name == "Nikita Kucherov"][0]
+    assert(players.team[kucherov] == "TBL")
+    rates = projector.rates()
+    assert(rates[kucherov, 0] == pytest.approx((3 * 46 + 19) / 4 / 82))
+
+
+def test_missing_values_left_out_of_blend(projector):
+    projector.add_source("cbssports", pd.DataFrame({
+        "name": ["A Goalie"], "Tm": ["DET"], "W": [30], "SO": [pd.NA]}))
+    projector.add_source("espn", pd.DataFrame({
+        "Name": ["A Goalie"], "Tm": ["Det"], "W": [pd.NA]}).astype(
+            {"W": "Int64"}))
+    assert(projector.rates()[0, 3] == pytest.approx(30 / 82))
+
+
+def test_same_name_on_other_teams(projector):
+    ahos = pd.DataFrame({"Name": ["Sebastian Aho", "Sebastian Aho"],
+                         "Tm": ["Car", "NYI"], "G": [82, 0]})
+    projector.add_source("espn", ahos)
+    assert(projector.players.team.tolist() == ["CAR", "NYI"])
+    assert(projector.rates()[:, 0].tolist() == [1, 0])
+
+
+def test_players_matched_on_player_id(nhl_scraper):
+    index = nhl_scraper.schedule_index(datetime.date(2018, 1, 14),
+                                       datetime.date(2018, 1, 16))
+    teams = pd.DataFrame({"id": [2, 12], "abbrev": ["NYI", "CAR"]})
+    resolver = PlayerResolver(pd.DataFrame({
+        "name": ["Sebastian Aho", "Sebastian Aho"], "teamId": [12, 2],
+        "playerId": [8478427, 8480222]}), teams)
+    fp = FantasyProjector(SCORING, teams, index, resolver=resolver)
+    fp.add_source("espn", pd.DataFrame({
+        "Name": ["Sebastian Aho", "Sebastian Aho"], "Tm": ["Car", "NYI"],
+        "G": [82, 0]}))
+    # The same player in another source
+    fp.add_source("cbssports", pd.DataFrame({
+        "name": ["Sebastian Aho"], "Tm": ["CAR"], "G": [41]}))
+    players = fp.players
+    assert(players.playerId.tolist() == [8478427, 8480222])
+    assert(players.team.tolist() == ["CAR", "NYI"])
+    assert(fp.rates()[:, 0].tolist() == pytest.approx([(82 + 41) / 2 / 82,
+                                                       0]))
+
+
+def test_project_and_points(projector, espn_skaters):
+    projector.add_source("espn", espn_skaters)
+    projected = projector.project(WINDOWS)
+    assert(projected.shape == (len(espn_skaters.index), len(SCORING), 2))
+    players = projector.players
+    matthews = players.index[players.name == "Auston Matthews"][0]
+    goals = espn_skaters.G[espn_skaters.Name == "Auston Matthews"].iloc[0]
+    # Toronto only plays on the 16th
+    assert(projector.games(WINDOWS)[matthews].tolist() == [0, 1])
+    assert(projected[matthews, 0].tolist() ==
+           pytest.approx([0, goals / 82]))
+    points = projector.points(WINDOWS)
+    assert(points.loc[matthews, "name"] == "Auston Matthews")
+    assert(points.loc[matthews, WINDOWS[0][0]] == 0)
+    assert(points.loc[matthews, WINDOWS[1][0]] == pytest.approx(
+        np.dot(projected[matthews, :, 1], [3, 2, .5, 4, -1])))
+
+
+def test_rate_stats_rejected(nhl_scraper):
+    with pytest.raises(ValueError):
+        FantasyProjector({"G": 1, "GAA": -1}, nhl_scraper.teams(), None)
+
+
+def test_season_of_weekly_windows(nhl_scraper):
+    index = nhl_scraper.schedule_index(datetime.date(2018, 1, 14),
+                                       datetime.date(2018, 1, 16))
+    teams = nhl_scraper.teams()
+    rng = np.random.default_rng(0)
+    abbrevs = teams.abbrev.tolist()
+    df = pd.DataFrame({"Name": ["Player {}".format(i) for i in range(900)],
+                       "Tm": [abbrevs[i % len(abbrevs)] for i in range(900)]})
+    for stat in SCORING:
+        df[stat] = rng.integers(0, 50, 900)
+    fp = FantasyProjector(SCORING, teams, index)
+    fp.add_source("espn", df, weight=0.6)
+    fp.add_source("espn", df, weight=0.4)
+    # A season's worth of windows, over the three days of the sample
+    windows = [WINDOWS[i % 2] for i in range(26)]
+    start = time.perf_counter()
+    points = fp.points(windows)
+    assert(time.perf_counter() - start < 1)
+    assert(points.shape == (900, 4 + 26))
+
+
+@pytest.fixture
+def projector(nhl_scraper):
+    index = nhl_scraper.schedule_index(datetime.date(2018, 1, 14),
+                                       datetime.date(2018, 1, 16))
+    return FantasyProjector(SCORING, nhl_scraper.teams(), index)
+
+
+@pytest.fixture
+def espn_skaters():
+    return espn.Parser("tests/sample.espn.skaters.html").parse(0)
+
+
+@pytest.fixture
+def cbs_forwards():
+    return cbssports.Parser("tests/sample.cbssports.forwards.html").parse(0)
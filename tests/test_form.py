@@ -0,0 +1,130 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from nhl_scraper import boxscore, storage
+from nhl_scraper.form import PlayerForm
+
+FIRST_DAY = datetime.date(2017, 10, 4)
+
+
+def test_rolling_matches_pandas(nights):
+    form = PlayerForm()
+    for skaters, goalies in nights:
+        assert(form.add(skaters, goalies) == 1)
+    df = form.skaters()
+    history = pd.concat([s for s, _ in nights], ignore_index=True)
+    for window in (5, 10, 20):
+        last = history.groupby("id").tail(window)
+        expected = last.groupby("id")[["goals", "toi"]].mean()
+        got = df.set_index("id")
+        assert(np.allclose(got["goals_{}".format(window)],
+                           expected.loc[got.index, "goals"].astype(float)))
+        assert(np.allclose(got["toi_{}".format(window)],
+                           expected.loc[got.index, "toi"].astype(float)))
+        assert((got["gp_{}".format(window)] == window).all())
+
+
+def test_batch_equals_incremental(nights):
+    one_by_one = PlayerForm()
+    for skaters, goalies in nights:
+        one_by_one.add(skaters, goalies)
+    batch = PlayerForm()
+    assert(batch.add(*[pd.concat(frames) for frames in zip(*nights)]) ==
+           len(nights))
+    assert(batch.skaters().equals(one_by_one.skaters()))
+    assert(batch.goalies().equals(one_by_one.goalies()))
+
+
+def test_games_added_once(nights):
+    form = PlayerForm()
+    form.add(*nights[0])
+    assert(form.add(*nights[0]) == 0)
+    assert((form.skaters()["gp_5"] == 1).all())
+
+
+def test_out_of_order_game(nights):
+    in_order = PlayerForm()
+    out_of_order = PlayerForm()
+    for skaters, goalies in nights[:12]:
+        in_order.add(skaters, goalies)
+    for skaters, goalies in nights[:5] + nights[6:12] + nights[5:6]:
+        out_of_order.add(skaters, goalies)
+    assert(out_of_order.skaters().equals(in_order.skaters()))
+
+
+def test_fewer_games_than_window(nights):
+    form = PlayerForm(windows=(2, 5))
+    for skaters, goalies in nights[:3]:
+        form.add(skaters, goalies)
+    df = form.skaters()
+    assert(df.columns.tolist()[:6] ==
+           ["id", "name", "position", "team_id", "gp_2", "goals_2"])
+    assert((df["gp_2"] == 2).all())
+    assert((df["gp_5"] == 3).all())
+
+
+def test_goalie_form(nights):
+    form = PlayerForm()
+    for skaters, goalies in nights[:4]:
+        form.add(skaters, goalies)
+    df = form.goalies().set_index("id")
+    goalies = pd.concat([g for _, g in nights[:4]])
+    totals = goalies.groupby("id")[["saves", "shots"]].sum()
+    expected = totals["saves"] / totals["shots"]
+    assert(np.allclose(df["sv_pct_5"], expected.loc[df.index].astype(float)))
+    assert((df["gp_20"] == 4).all())
+
+
+def test_join_players_and_teams(nights, teams):
+    form = PlayerForm()
+    form.add(*nights[0])
+    larkin = 8477946
+    players = pd.DataFrame({"teamId": [10], "playerId": [larkin],
+                            "name": ["Dylan Larkin"], "position": ["C"]})
+    df = form.skaters(players=players, teams=teams).set_index("id")
+    # Traded on the roster, otherwise the team of the last game
+    assert(df.loc[larkin, "team"] == "TOR")
+    assert(set(df.drop(larkin)["team"]) <= {"DET", "CHI"})
+
+
+def test_update_from_store(tmp_path, nights):
+    store = storage.Store(str(tmp_path))
+    for skaters, goalies in nights[:10]:
+        storage.append_box_scores(store, skaters, goalies)
+    form = PlayerForm.from_store(store, seasons=[20172018])
+    assert(len(form.games) == 10)
+    assert(form.update(store) == 0)
+    for skaters, goalies in nights[10:]:
+        storage.append_box_scores(store, skaters, goalies)
+    assert(form.update(store) == len(nights) - 10)
+    expected = PlayerForm()
+    for skaters, goalies in nights:
+        expected.add(skaters, goalies)
+    assert(np.allclose(form.skaters()["goals_10"],
+                       expected.skaters()["goals_10"]))
+
+
+@pytest.fixture
+def nights():
+    """Box score tables of one game a night, with varying goals"""
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.boxscore.2017020681.json") as f:
+        doc = json.load(f)
+    games = []
+    for n in range(25):
+        skaters, goalies = boxscore.normalize(
+            [(doc, 2017020000 + n, FIRST_DAY + datetime.timedelta(days=n))])
+        skaters["goals"] = pd.array((skaters["id"] + n) % 3, dtype="Int64")
+        goalies["saves"] = goalies["saves"] - n % 4
+        games.append((skaters, goalies))
+    return games
+
+
+@pytest.fixture
+def teams():
+    return pd.DataFrame({"id": [10, 16, 17], "abbrev": ["TOR", "CHI", "DET"]})
@@ -0,0 +1,49 @@
+#!/usb/bin/python
+
+import json
+import os
+import subprocess
+import sys
+
+HEAVY = ["pandas", "numpy", "requests", "selenium", "bs4", "pyarrow",
+         "lxml"]
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+
+
+def test_import_nhl_is_light():
+    assert(loaded("import nhl_scraper.nhl") == [])
+
+
+def test_parsers_defer_browser():
+    for module in ["espn", "cbssports", "rotowire"]:
+        modules = loaded("import nhl_scraper.{}".format(module))
+        assert("selenium" not in modules)
+        assert("bs4" not in modules)
+        assert("pandas" not in modules)
+        assert("lxml" not in modules)
+
+
+def test_records_without_pandas():
+    modules = loaded("""
+import datetime
+from nhl_scraper import nhl
+from tests.conftest import MockNhlEndpointAdapter
+mock = MockNhlEndpointAdapter()
+mock.add_date(datetime.datetime(2018, 1, 14))
+s = nhl.Scraper()
+s.set_endpoint_adapter(mock)
+assert s.games_count(datetime.date(2018, 1, 14), datetime.date(2018, 1, 14))
+assert s.games("2018-01-14", "2018-01-14", format="records")
+assert s.players(format="records")
+""")
+    assert("pandas" not in modules)
+
+
+def loaded(code):
+    """Run code in a new interpreter and return the heavy modules it loaded
+    """
+    code += "\nimport json, sys\nprint(json.dumps([m for m in {} if m in " \
+        "sys.modules]))".format(HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                         stdout=subprocess.PIPE).stdout
+    return json.loads(out.decode().splitlines()[-1])
@@ -0,0 +1,187 @@
+#!/usb/bin/python
+
+import asyncio
+import copy
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper import nhl
+from nhl_scraper.live import GameUpdate, LiveTracker, StatDelta
+
+GAME = 2017020681
+START = datetime.datetime(2018, 1, 15, 0, 30,
+                          tzinfo=datetime.timezone.utc).timestamp()
+
+
+def test_first_poll_reports_everyone(tracker):
+    events = tracker.poll()
+    assert(isinstance(events[0], GameUpdate))
+    assert(events[0].state == "Live")
+    deltas = [e for e in events if isinstance(e, StatDelta)]
+    # Every player with stats, except those who have all zeros
+    assert(len(deltas) == 9)
+    assert(tracker.interval == LiveTracker.LIVE_INTERVAL)
+
+
+def test_only_changes_reported(tracker, adapter):
+    tracker.poll()
+    doc = copy.deepcopy(adapter.boxscore)
+    larkin = doc["teams"]["away"]["players"]["ID8477946"]
+    larkin["stats"]["skaterStats"]["goals"] += 1
+    larkin["stats"]["skaterStats"]["shots"] += 1
+    larkin["stats"]["skaterStats"]["timeOnIce"] = "20:10"
+    adapter.boxscore = doc
+    events = tracker.poll()
+    deltas = [e for e in events if isinstance(e, StatDelta)]
+    assert(len(deltas) == 1)
+    assert(deltas[0].name == "Dylan Larkin")
+    assert(deltas[0].deltas == {"goals": 1, "shots": 1})
+    assert(deltas[0].totals["goals"] == 2)
+
+
+def test_not_modified(tracker, adapter):
+    tracker.poll()
+    adapter.modified = False
+    events = tracker.poll()
+    assert(not any(isinstance(e, StatDelta) for e in events))
+    assert(adapter.validators[-1] == ('"1"', None))
+
+
+def test_fallback_without_conditional_requests(tracker, adapter):
+    class PlainAdapter:
+        schedule_endpoint = adapter.schedule_endpoint
+        boxscore_endpoint = adapter.boxscore_endpoint
+    tracker.scraper.set_endpoint_adapter(PlainAdapter())
+    assert(len(tracker.poll()) == 10)
+    assert([e for e in tracker.poll() if isinstance(e, StatDelta)] == [])
+    assert(adapter.boxscore_calls == 2)
+
+
+def test_adaptive_interval(tracker, adapter):
+    adapter.linescore["currentPeriodTimeRemaining"] = "1:30"
+    tracker.poll()
+    assert(tracker.interval == LiveTracker.FAST_INTERVAL)
+    adapter.linescore["intermissionInfo"] = {"inIntermission": True}
+    tracker.poll()
+    assert(tracker.interval == LiveTracker.INTERMISSION_INTERVAL)
+
+
+def test_waiting_for_start(tracker, adapter):
+    adapter.state = "Preview"
+    tracker.clock = lambda: START - 120
+    assert(tracker.poll()[0].state == "Preview")
+    assert(tracker.interval == 120)
+    assert(adapter.boxscore_calls == 0)
+    tracker.clock = lambda: START - 3600
+    tracker.poll()
+    assert(tracker.interval == LiveTracker.IDLE_INTERVAL)
+
+
+def test_postponed_game_not_waited_for(tracker, adapter):
+    adapter.state = "Preview"
+    adapter.detailed_state = "Postponed"
+    tracker.run(lambda event: None, max_polls=5)
+    # Past its start time, but there is nothing left to poll for
+    assert(tracker.done)
+    assert(tracker.interval == LiveTracker.IDLE_INTERVAL)
+    assert(adapter.boxscore_calls == 0)
+
+
+def test_run_until_final(tracker, adapter):
+    events = []
+
+    def sleep(seconds):
+        adapter.state = "Final"
+    tracker.sleep = sleep
+    tracker.run(events.append)
+    # Polled once live, once more when final for the last stats, then done
+    assert(tracker.done)
+    assert(adapter.boxscore_calls == 2)
+    states = [e.state for e in events if isinstance(e, GameUpdate)]
+    assert(states == ["Live", "Final"])
+
+
+def test_async_events(tracker):
+    async def collect():
+        return [e async for e in tracker.events(max_polls=1)]
+    events = asyncio.run(collect())
+    assert(len([e for e in events if isinstance(e, StatDelta)]) == 9)
+
+
+def test_boxscore_if_modified():
+    class Response:
+        def __init__(self, status_code, headers):
+            self.status_code = status_code
+            self.headers = headers
+            self.content = b"{}"
+
+        def json(self):
+            return {"teams": {}}
+
+    class Session:
+        def __init__(self):
+            self.headers = []
+
+        def get(self, url, **kwargs):
+            self.headers.append(kwargs["headers"])
+            if "If-None-Match" in kwargs["headers"]:
+                return Response(304, {})
+            return Response(200, {"ETag": '"a"'})
+
+    session = Session()
+    ea = nhl.EndpointAdapter(session=session)
+    assert(ea.boxscore_if_modified(GAME) == ({"teams": {}}, '"a"', None))
+    assert(ea.boxscore_if_modified(GAME, '"a"') == (None, '"a"', None))
+    assert(session.headers == [{}, {"If-None-Match": '"a"'}])
+
+
+class MockLiveEndpointAdapter:
+    def __init__(self):
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        with open(dir_path + "/sample.nhl.boxscore.{}.json".format(GAME)) \
+                as f:
+            self.boxscore = json.load(f)
+        self.state = "Live"
+        self.detailed_state = "In Progress"
+        self.linescore = {"currentPeriod": 2,
+                          "currentPeriodTimeRemaining": "12:34",
+                          "intermissionInfo": {"inIntermission": False}}
+        self.modified = True
+        self.version = 0
+        self.validators = []
+        self.boxscore_calls = 0
+
+    def schedule_endpoint(self, startDate, endDate, expand=None):
+        return {"dates": [{"date": startDate, "games": [{
+            "gamePk": GAME, "gameDate": "2018-01-15T00:30:00Z",
+            "status": {"abstractGameState": self.state,
+                       "detailedState": self.detailed_state},
+            "linescore": dict(self.linescore),
+            "teams": {"away": {"team": {"id": 17}, "score": 2},
+                      "home": {"team": {"id": 16}, "score": 0}}}]}]}
+
+    def boxscore_if_modified(self, game_id, etag=None, last_modified=None):
+        self.boxscore_calls += 1
+        self.validators.append((etag, last_modified))
+        if etag is not None and not self.modified:
+            return None, etag, last_modified
+        self.version += 1
+        return self.boxscore, '"{}"'.format(self.version), None
+
+    def boxscore_endpoint(self, game_id):
+        self.boxscore_calls += 1
+        return self.boxscore
+
+
+@pytest.fixture
+def adapter():
+    return MockLiveEndpointAdapter()
+
+
+@pytest.fixture
+def tracker(adapter):
+    s = nhl.Scraper()
+    s.set_endpoint_adapter(adapter)
+    return LiveTracker(s, date=datetime.date(2018, 1, 14),
+                       clock=lambda: START + 3600, sleep=lambda s: None)
@@ -0,0 +1,106 @@
+#!/usb/bin/python
+
+import datetime
+import pytest
+from nhl_scraper import metrics, nhl
+
+
+def test_no_callbacks():
+    assert(not metrics.enabled())
+    with metrics.timer("parse", "teams"):
+        pass
+    metrics.emit("rows", "teams", 3)
+
+
+def test_scraper_events(summary, nhl_scraper):
+    nhl_scraper.teams()
+    nhl_scraper.teams()
+    nhl_scraper.players()
+    nhl_scraper.games_count(datetime.date(2018, 1, 14),
+                            datetime.date(2018, 1, 16))
+    nhl_scraper.games_count(datetime.date(2018, 1, 15),
+                            datetime.date(2018, 1, 16))
+    nhl_scraper.box_scores(2017020681)
+    assert(summary.hit_ratio("teams_cache") == 2 / 3)
+    assert(summary.hit_ratio("players_cache") == 0)
+    assert(summary.hit_ratio("schedule_cache") == 2 / 5)
+    assert(summary.totals[("rows", "players")] ==
+           len(nhl_scraper.players().index))
+    assert(summary.totals[("rows", "boxscore")] == 9)
+    assert(summary.histograms[("parse", "teams")].count == 1)
+    report = summary.report()
+    assert("teams_cache" in report)
+    assert("boxscore" in report)
+
+
+def test_adapter_events(summary):
+    class Response:
+        status_code = 200
+        content = b'{"teams": []}'
+
+        def json(self):
+            return {"teams": []}
+
+    class Session:
+        def get(self, url, **kwargs):
+            return Response()
+
+    ea = nhl.EndpointAdapter(session=Session())
+    ea.teams_endpoint()
+    ea.boxscore_endpoint(2017020681)
+    assert(summary.histograms[("latency", "teams")].count == 1)
+    assert(summary.histograms[("latency", "boxscore")].count == 1)
+    assert(summary.totals[("bytes", "teams")] == 13)
+
+
+def test_histogram():
+    h = metrics.Histogram(buckets=(1, 2, 5))
+    for v in (0.5, 1.5, 1.7, 4, 9):
+        h.observe(v)
+    assert(h.counts == [1, 2, 1, 1])
+    assert(h.quantile(0.5) == 2)
+    assert(h.quantile(1.0) == 9)
+    assert(h.min == 0.5 and h.max == 9)
+
+
+def test_prometheus(exporter):
+    metrics.emit("latency", "teams", 0.02)
+    metrics.emit("bytes", "teams", 100)
+    metrics.cache_lookup("teams_cache", True)
+    text = exporter.render()
+    assert('nhl_scraper_latency_seconds_bucket{name="teams",le="0.025"} 1'
+           in text)
+    assert('nhl_scraper_latency_seconds_count{name="teams"} 1' in text)
+    assert('nhl_scraper_bytes_total{name="teams"} 100' in text)
+    assert('nhl_scraper_cache_hits_total{name="teams_cache"} 1' in text)
+
+
+def test_statsd():
+    exporter = metrics.StatsdExporter()
+    try:
+        assert(exporter.format(metrics.Event("latency", "teams", 0.0125, {}))
+               == "nhl_scraper.latency.teams:12.5|ms")
+        assert(exporter.format(metrics.Event("cache", "teams_cache", 0, {}))
+               == "nhl_scraper.cache.teams_cache.miss:1|c")
+        assert(exporter.format(metrics.Event("rows", "players", 700, {}))
+               == "nhl_scraper.rows.players:700|c")
+        # Sending never raises, even with nothing listening
+        exporter(metrics.Event("rows", "players", 700, {}))
+    finally:
+        exporter.close()
+
+
+@pytest.fixture
+def summary():
+    s = metrics.Summary()
+    metrics.add_callback(s)
+    yield s
+    metrics.remove_callback(s)
+
+
+@pytest.fixture
+def exporter():
+    e = metrics.PrometheusExporter()
+    metrics.add_callback(e)
+    yield e
+    metrics.remove_callback(e)
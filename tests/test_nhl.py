@@ -1,11 +1,9 @@
 #!/usb/bin/python
 
+import copy
 import datetime
 import pickle
 import pytest
-import json
-import os
-from nhl_scraper import nhl
 
 
 def test_teams(nhl_scraper):
@@ -42,6 +40,64 @@ def test_players(nhl_scraper):
     assert(df[df["name"] == "Jason Spezza"].iloc(0)[0]["teamId"] == 10)
 
 
+def test_records_formats(nhl_scraper):
+    players = nhl_scraper.players(format='records')
+    df = nhl_scraper.players()
+    assert(len(players) == len(df.index))
+    assert(players[0] == df.iloc[0].to_dict())
+    games = nhl_scraper.games("2018-01-14", "2018-01-16", format='records')
+    assert(len(games) == 10)
+    assert(games[0]["date"] == datetime.date(2018, 1, 14))
+    assert([g["gamePk"] for g in games] ==
+           nhl_scraper.games("2018-01-14", "2018-01-16"))
+    df = nhl_scraper.games("2018-01-14", "2018-01-16", format='pandas')
+    assert(df.columns.tolist() == list(games[0]))
+    counts = nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
+                                     datetime.datetime(2018, 1, 16),
+                                     format='pandas')
+    assert(counts[17] == 2)
+    assert(counts.index.name == "team_id")
+    with pytest.raises(ValueError):
+        nhl_scraper.players(format='json')
+
+
+def test_players_memoized(nhl_scraper):
+    df = nhl_scraper.players()
+    assert(nhl_scraper.players() is df)
+
+
+def test_refresh_players(nhl_scraper, monkeypatch):
+    before = nhl_scraper.players()
+    rosters = copy.deepcopy(nhl_scraper.ea.players_endpoint([9, 10]))
+    ott, tor = rosters["teams"]
+    ryan = [p for p in ott["roster"]["roster"]
+            if p["person"]["fullName"] == "Bobby Ryan"][0]
+    ott["roster"]["roster"].remove(ryan)
+    tor["roster"]["roster"].append(ryan)
+    tor["roster"]["roster"] = [p for p in tor["roster"]["roster"]
+                               if p["person"]["fullName"] != "Jake Muzzin"]
+    tor["roster"]["roster"].append(
+        {"person": {"id": 1, "fullName": "New Guy"},
+         "position": {"abbreviation": "C"}})
+    monkeypatch.setattr(nhl_scraper.ea, "players_endpoint",
+                        lambda team_ids: rosters)
+
+    moves = nhl_scraper.refresh_players([9, 10])
+    by_type = {m["type"]: m for m in moves}
+    assert(len(moves) == 3)
+    assert(by_type["add"]["name"] == "New Guy")
+    assert(by_type["remove"]["name"] == "Jake Muzzin")
+    assert(by_type["team_change"]["name"] == "Bobby Ryan")
+    assert(by_type["team_change"]["fromTeamId"] == 9)
+    assert(by_type["team_change"]["toTeamId"] == 10)
+
+    df = nhl_scraper.players()
+    assert(len(df.index) == len(before.index))
+    assert(df[df["name"] == "Bobby Ryan"].iloc(0)[0]["teamId"] == 10)
+    assert("Jake Muzzin" not in df["name"].tolist())
+    assert(nhl_scraper.refresh_players([9, 10]) == [])
+
+
 def test_pickle(nhl_scraper):
     dc = nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
                                  datetime.datetime(2018, 1, 16))
@@ -50,52 +106,96 @@ def test_pickle(nhl_scraper):
     assert(new_dc[17] == 2)
     assert(new_dc[11] == 0)
 
-@pytest.fixture
-def nhl_scraper():
-    s = nhl.Scraper()
 
-    # Put the mock adapter in so we don't make calls out
-    mock = MockNhlEndpointAdapter()
-
-    cached_dates = [datetime.datetime(2018, 1, 14),
-                    datetime.datetime(2018, 1, 15),
-                    datetime.datetime(2018, 1, 16)]
-    for cached_date in cached_dates:
-        mock.add_date(cached_date)
-
-    s.set_endpoint_adapter(mock)
-    return s
-
-
-
-class MockNhlEndpointAdapter:
-    def __init__(self):
-        self.dir_path = os.path.dirname(os.path.realpath(__file__))
-        self.schedule_cache = {}
-        self.players_cache = None
+def test_schedule_range_single_request(nhl_scraper):
+    nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
+                            datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 1)
+    # Days without any games are cached too
+    assert(nhl_scraper.schedule_cache[datetime.date(2018, 1, 15)] == [])
+    dc = nhl_scraper.games_count(datetime.datetime(2018, 1, 15),
+                                 datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 1)
+    assert(dc[17] == 1)
 
-    def teams_endpoint(self):
-        fn = "sample.nhl.teams.json"
-        with open(self.dir_path + "/" + fn, "r") as f:
-            return json.load(f)
 
-    def schedule_endpoint(self, date):
-        if date in self.schedule_cache:
-            return self.schedule_cache[date]
-        else:
-            raise RuntimeError("{} is not in the schedule cache".format(date))
+def test_schedule_range_chunked(nhl_scraper):
+    nhl_scraper.SCHEDULE_CHUNK_DAYS = 2
+    dc = nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
+                                 datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 2)
+    assert(dc[17] == 2)
 
-    def add_date(self, date):
-        ds = date.strftime("%Y%m%d")
-        fn = "sample.nhl.schedule.{}.json".format(ds)
-        with open(self.dir_path + "/" + fn, "r") as f:
-            self.schedule_cache[date] = json.load(f)
 
-    def players_endpoint(self, team_ids):
-        if self.players_cache is None:
-            fn = "sample.nhl.players.json"
-            with open(self.dir_path + "/" + fn, "r") as f:
-                self.players_cache = json.load(f)
-        return self.players_cache
+def test_schedule_index(nhl_scraper):
+    index = nhl_scraper.schedule_index(datetime.datetime(2018, 1, 14),
+                                       datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 1)
+    assert(index.opponent(17, datetime.date(2018, 1, 14)) == 16)
+    dc = nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
+                                 datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 1)
+    assert(len(dc) == 18)
+    assert(dc[17] == 2)
+    assert(dc[11] == 0)
+    nhl_scraper.refresh_schedule(datetime.datetime(2018, 1, 16),
+                                 datetime.datetime(2018, 1, 16))
+    assert(nhl_scraper.ea.schedule_calls == 2)
+    assert(nhl_scraper.schedule_index() is index)
 
 
+def test_refresh_schedule_date_without_games(nhl_scraper):
+    index = nhl_scraper.schedule_index(datetime.datetime(2018, 1, 14),
+                                       datetime.datetime(2018, 1, 16))
+    # Every game of the 14th was moved, so the date drops out of responses
+    nhl_scraper.ea.schedule_cache[datetime.date(2018, 1, 14)] = {
+        "dates": []}
+    nhl_scraper.refresh_schedule(datetime.datetime(2018, 1, 14),
+                                 datetime.datetime(2018, 1, 14))
+    assert(index.games_on(datetime.date(2018, 1, 14)) == [])
+    assert(nhl_scraper.games_count(datetime.datetime(2018, 1, 14),
+                                   datetime.datetime(2018, 1, 14)) == {})
+    assert(len(index.games_on(datetime.date(2018, 1, 16))) == 6)
+
+
+def test_postponed_games_not_counted(nhl_scraper):
+    day = nhl_scraper.ea.schedule_cache[datetime.date(2018, 1, 14)]
+    day["dates"][0]["games"][0]["status"]["detailedState"] = "Postponed"
+    start, end = datetime.date(2018, 1, 14), datetime.date(2018, 1, 16)
+    # The same counts with and without the schedule index
+    from_cache = nhl_scraper.games_count(start, end)
+    nhl_scraper.schedule_index(start, end)
+    assert(nhl_scraper.games_count(start, end) == from_cache)
+    assert(from_cache[17] == 1)
+
+
+def test_box_scores_batch(nhl_scraper):
+    df = nhl_scraper.box_scores_batch(game_ids=[2017020681])
+    assert(len(df.index) == 9)
+    assert(set(df.gamePk) == {2017020681})
+    assert(df[df.name == "Anthony Mantha"].iloc(0)[0]["goals"] == 2)
+
+
+def test_box_scores_batch_date_range(nhl_scraper, monkeypatch):
+    sample = nhl_scraper.ea.boxscore_endpoint(2017020681)
+    monkeypatch.setattr(nhl_scraper.ea, "boxscore_endpoint",
+                        lambda game_id: sample)
+    df = nhl_scraper.box_scores_batch(
+        start_date=datetime.datetime(2018, 1, 14),
+        end_date=datetime.datetime(2018, 1, 16), max_workers=4)
+    assert(df.gamePk.nunique() == 10)
+    assert(len(df.index) == 90)
+    assert(set(df.date.dt.day) == {14, 16})
+
+
+def test_box_scores_tables(nhl_scraper):
+    skaters, goalies = nhl_scraper.box_scores(2017020681, format='tables')
+    assert(len(skaters.index) == 7)
+    assert(goalies[goalies.name == "Jimmy Howard"].iloc(0)[0]["so"] == 1)
+
+
+def test_iter_box_scores(nhl_scraper):
+    nhl_scraper.game_dates[2017020681] = datetime.date(2018, 1, 14)
+    frames = list(nhl_scraper.iter_box_scores(game_ids=[2017020681]))
+    assert(len(frames) == 1)
+    assert(frames[0].date.iloc[0] == datetime.datetime(2018, 1, 14))
@@ -0,0 +1,208 @@
+#!/usb/bin/python
+
+import asyncio
+import datetime
+import time
+import pandas as pd
+import pytest
+from nhl_scraper import nhl_async, session
+from tests.conftest import MockNhlEndpointAdapter
+
+
+def test_teams(async_scraper):
+    df = asyncio.run(async_scraper.teams())
+    assert(len(df.index) == 31)
+
+
+def test_games_count(async_scraper):
+    dc = asyncio.run(async_scraper.games_count(
+        datetime.datetime(2018, 1, 14), datetime.datetime(2018, 1, 16)))
+    assert(len(dc) == 18)
+    assert(dc[17] == 2)
+    assert(dc[11] == 0)
+
+
+def test_players(async_scraper):
+    df = asyncio.run(async_scraper.players())
+    assert(df[df["name"] == "Jason Spezza"].iloc(0)[0]["teamId"] == 10)
+
+
+def test_box_scores_many(async_scraper):
+    df = asyncio.run(async_scraper.box_scores_many([2017020681]))
+    assert(set(df.gamePk) == {2017020681})
+    assert(df[df.name == "Anthony Mantha"].iloc(0)[0]["goals"] == 2)
+
+
+def test_box_scores_concurrent():
+    s = nhl_async.AsyncScraper(max_concurrency=16)
+    s.set_endpoint_adapter(SlowAsyncEndpointAdapter(0.2))
+    start = time.perf_counter()
+    df = asyncio.run(s.box_scores_many(list(range(16))))
+    elapsed = time.perf_counter() - start
+    assert(s.ea.max_in_flight == 16)
+    assert(elapsed < 16 * 0.2 / 2)
+    assert(len(df.index) == 0)
+
+
+def test_concurrency_cap():
+    s = nhl_async.AsyncScraper(max_concurrency=4)
+    s.set_endpoint_adapter(SlowAsyncEndpointAdapter(0.01))
+    asyncio.run(s.box_scores_many(list(range(16))))
+    assert(s.ea.max_in_flight == 4)
+
+
+def test_runs_on_new_event_loops():
+    s = nhl_async.AsyncScraper(max_concurrency=4)
+    s.set_endpoint_adapter(SlowAsyncEndpointAdapter(0.01))
+    # The semaphore of the first run is bound to its loop
+    asyncio.run(s.box_scores_many(list(range(8))))
+    asyncio.run(s.box_scores_many(list(range(8))))
+    assert(s.ea.max_in_flight == 4)
+
+
+def test_adapter_session_follows_event_loop():
+    pytest.importorskip("aiohttp")
+    ea = nhl_async.AsyncEndpointAdapter()
+
+    async def session():
+        return await ea._get_session()
+    first = asyncio.run(session())
+    second = asyncio.run(session())
+    assert(first is not second)
+    asyncio.run(ea.close())
+
+
+def test_same_formats_as_scraper(async_scraper, nhl_scraper):
+    start, end = datetime.date(2018, 1, 14), datetime.date(2018, 1, 16)
+    for format in ("list", "records", "pandas"):
+        got = asyncio.run(async_scraper.games("2018-01-14", "2018-01-16",
+                                              format=format))
+        expected = nhl_scraper.games("2018-01-14", "2018-01-16",
+                                     format=format)
+        assert(got.equals(expected) if format == "pandas" else
+               got == expected)
+    assert(asyncio.run(async_scraper.games_count(start, end, "pandas"))
+           .equals(nhl_scraper.games_count(start, end, "pandas")))
+    assert(asyncio.run(async_scraper.players(format="records")) ==
+           nhl_scraper.players(format="records"))
+    assert(asyncio.run(async_scraper.final_games(start, end)) ==
+           nhl_scraper.final_games(start, end))
+    skaters, goalies = asyncio.run(async_scraper.box_scores(
+        2017020681, format="tables"))
+    assert(len(skaters.index) == 7 and len(goalies.index) == 2)
+    with pytest.raises(ValueError):
+        asyncio.run(async_scraper.box_scores(2017020681, format="csv"))
+
+
+def test_box_score_tables(async_scraper):
+    asyncio.run(async_scraper.games("2018-01-14", "2018-01-14"))
+    skaters, _ = asyncio.run(async_scraper.box_score_tables([2017020681]))
+    assert(set(skaters.date) == {pd.Timestamp(2018, 1, 14)})
+
+
+def test_schedule_index(async_scraper):
+    index = asyncio.run(async_scraper.schedule_index(
+        datetime.date(2018, 1, 14), datetime.date(2018, 1, 16)))
+    assert(index.games_count(datetime.date(2018, 1, 14),
+                             datetime.date(2018, 1, 16))[17] == 2)
+    # games_count reads the index instead of fetching
+    async_scraper.set_endpoint_adapter(None)
+    dc = asyncio.run(async_scraper.games_count(
+        datetime.date(2018, 1, 14), datetime.date(2018, 1, 16)))
+    assert(dc[17] == 2)
+
+
+def test_no_blocking_methods():
+    s = nhl_async.AsyncScraper()
+    for name in ("iter_box_scores", "box_scores_batch", "refresh_schedule"):
+        assert(not hasattr(s, name))
+
+
+def test_adapter_retries(monkeypatch):
+    pytest.importorskip("aiohttp")
+    policy = session.Session(retries=2, backoff=1, rate=4)
+    policy.limiter.clock = lambda: 100.0
+    ea = nhl_async.AsyncEndpointAdapter(policy=policy)
+    fake = FakeClientSession([503, 429, 200])
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    async def get_session():
+        return fake
+    ea.sleep = sleep
+    monkeypatch.setattr(ea, "_get_session", get_session)
+    assert(asyncio.run(ea.teams_endpoint()) == {"teams": []})
+    assert(fake.calls == 3)
+    # A jittered backoff and a Retry-After, each followed by the wait for
+    # the next rate limited slot
+    assert(0 <= sleeps[0] <= 1)
+    assert(sleeps[1:] == [0.25, 2, 0.5])
+
+
+def test_adapter_gives_up(monkeypatch):
+    pytest.importorskip("aiohttp")
+    ea = nhl_async.AsyncEndpointAdapter(
+        policy=session.Session(retries=1, backoff=0))
+    fake = FakeClientSession([503, 503, 503])
+
+    async def get_session():
+        return fake
+
+    async def sleep(seconds):
+        pass
+    ea.sleep = sleep
+    monkeypatch.setattr(ea, "_get_session", get_session)
+    # The last response is returned, like session.Session.get does
+    assert(asyncio.run(ea.teams_endpoint()) == {"teams": []})
+    assert(fake.calls == 2)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.headers = {"Retry-After": "2"} if status == 429 else {}
+
+    async def json(self, content_type=None):
+        return {"teams": []}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeClientSession:
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = 0
+
+    def get(self, url, params=None):
+        self.calls += 1
+        return FakeResponse(self.statuses.pop(0))
+
+
+class SlowAsyncEndpointAdapter:
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def boxscore_endpoint(self, game_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        return {"teams": {}}
+
+
+@pytest.fixture
+def async_scraper():
+    s = nhl_async.AsyncScraper()
+    mock = MockNhlEndpointAdapter()
+    for day in [14, 15, 16]:
+        mock.add_date(datetime.datetime(2018, 1, day))
+    s.set_endpoint_adapter(mock)
+    return s
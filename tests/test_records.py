@@ -0,0 +1,113 @@
+#!/usb/bin/python
+
+import copy
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper import boxscore, records
+
+GAME = 2017020681
+DATE = datetime.date(2018, 1, 14)
+
+
+def test_games(schedule):
+    games = list(records.games(schedule))
+    assert(len(games) == 4)
+    game = games[0]
+    assert(game == records.Game(GAME, DATE, 20172018, "R", "Final", 17, 16,
+                                4, 0))
+    assert(game.date is games[-1].date)
+
+
+def test_linescores(schedule):
+    assert(list(records.linescores(schedule)) == [])
+    game = schedule["dates"][0]["games"][0]
+    game["linescore"] = {
+        "periods": [{"num": n, "away": {"goals": g, "shotsOnGoal": 10},
+                     "home": {"goals": 0, "shotsOnGoal": 8}}
+                    for n, g in ((1, 1), (2, 3), (3, 0))],
+        "teams": {"away": {"goals": 4, "shotsOnGoal": 30},
+                  "home": {"goals": 0, "shotsOnGoal": 24}},
+        "hasShootout": False}
+    ls = list(records.linescores(schedule))
+    assert(len(ls) == 1)
+    assert(ls[0].away_period_goals == (1, 3, 0))
+    assert(ls[0].home_shots == 24)
+    assert(ls[0].periods == 3)
+    assert(not ls[0].shootout)
+
+
+def test_player_lines_match_tables(doc):
+    lines = list(records.player_lines(doc, GAME, DATE))
+    skaters = [p for p in lines if isinstance(p, records.SkaterLine)]
+    goalies = [p for p in lines if isinstance(p, records.GoalieLine)]
+    sk, gl = boxscore.normalize([(doc, GAME, DATE)])
+    assert(len(skaters) == len(sk.index))
+    assert(len(goalies) == len(gl.index))
+    assert(sum(p.goals for p in skaters) == sk.goals.sum())
+    assert(sum(p.toi for p in skaters) == sk.toi.sum())
+    assert([p.decision for p in goalies] == gl.decision.tolist())
+    df = records.to_frame(skaters, records.SkaterLine)
+    assert(df.columns.tolist() == sk.columns.tolist())
+    assert(df["+/-"].tolist() == sk["+/-"].tolist())
+    assert(str(df.name.dtype) == "category")
+
+
+def test_strings_interned(doc):
+    first = list(records.player_lines(doc, GAME, DATE))
+    again = list(records.player_lines(json.loads(json.dumps(doc)), GAME,
+                                      DATE))
+    assert(all(a.name is b.name and a.position is b.position
+               for a, b in zip(first, again)))
+
+
+def test_records_have_no_dict(doc):
+    line = next(records.player_lines(doc, GAME, DATE))
+    assert(not hasattr(line, "__dict__"))
+
+
+def test_iter_games(nhl_scraper):
+    nhl_scraper.SCHEDULE_CHUNK_DAYS = 2
+    games = list(nhl_scraper.iter_games(datetime.date(2018, 1, 14),
+                                        datetime.date(2018, 1, 16)))
+    assert(len(games) == 10)
+    assert(nhl_scraper.ea.schedule_calls == 2)
+    assert(sorted(g.gamePk for g in games) ==
+           sorted(nhl_scraper.games("2018-01-14", "2018-01-16")))
+
+
+def test_iter_linescores(nhl_scraper, schedule):
+    class LinescoreAdapter:
+        def schedule_endpoint(self, startDate, endDate, expand=None):
+            assert(expand == "schedule.linescore")
+            r = copy.deepcopy(schedule)
+            for game in r["dates"][0]["games"]:
+                game["linescore"] = {"teams": {"away": {}, "home": {}}}
+            return r
+    nhl_scraper.set_endpoint_adapter(LinescoreAdapter())
+    ls = list(nhl_scraper.iter_linescores(DATE, DATE))
+    assert(len(ls) == 4)
+    assert(ls[0].periods == 0)
+
+
+def test_iter_player_lines(nhl_scraper):
+    nhl_scraper.games("2018-01-14", "2018-01-14")
+    lines = list(nhl_scraper.iter_player_lines(game_ids=[GAME]))
+    assert({line.gamePk for line in lines} == {GAME})
+    assert({line.date for line in lines} == {DATE})
+    assert(len(lines) == 9)
+
+
+@pytest.fixture
+def schedule():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.schedule.20180114.json") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def doc():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.nhl.boxscore.{}.json".format(GAME)) as f:
+        return json.load(f)
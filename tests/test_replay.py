@@ -0,0 +1,73 @@
+#!/usb/bin/python
+
+import datetime
+import pytest
+from nhl_scraper import espn, nhl, rotowire
+from nhl_scraper.archive import HtmlArchive
+from nhl_scraper.replay import ReplayAdapter, replay_pages
+from tests.conftest import MockNhlEndpointAdapter, sample_file
+from tests.test_rotowire import Clock, MockRotowireEndpointAdapter
+
+
+def test_record_then_replay(tmp_path, live):
+    recorder = ReplayAdapter(str(tmp_path), adapter=live)
+    recorded = run_nhl(recorder)
+    assert(recorder.misses == recorder.calls)
+
+    replayer = ReplayAdapter(str(tmp_path))
+    assert(run_nhl(replayer) == recorded)
+    assert(replayer.misses == 0)
+    assert(replayer.calls == recorder.calls)
+    assert(replayer.calls_by_method["boxscore_endpoint"] == 1)
+
+
+def test_recorded_calls_not_forwarded(tmp_path, live):
+    recorder = ReplayAdapter(str(tmp_path), adapter=live)
+    recorder.teams_endpoint()
+    recorder.teams_endpoint()
+    assert(recorder.calls == 2)
+    assert(recorder.misses == 1)
+
+
+def test_missing_recording(tmp_path):
+    replayer = ReplayAdapter(str(tmp_path))
+    with pytest.raises(KeyError):
+        replayer.boxscore_endpoint(2017020681)
+    with pytest.raises(AttributeError):
+        replayer.session
+
+
+def test_replay_rotowire(tmp_path):
+    with open(sample_file("sample.rotowire.starting-goalies.html")) as f:
+        live = MockRotowireEndpointAdapter(f.read())
+    for adapter in (ReplayAdapter(str(tmp_path), adapter=live),
+                    ReplayAdapter(str(tmp_path))):
+        sc = rotowire.Scraper(clock=Clock())
+        sc.set_endpoint_adapter(adapter)
+        assert(sc.starter("BOS", datetime.date(2018, 1, 14))["name"] ==
+               "Tuukka Rask")
+
+
+def test_replay_pages(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    with open(sample_file("sample.espn.skaters.html"), "rb") as f:
+        archive.put(f.read(), "espn.skaters.pg0")
+    df = espn.parse_pages(replay_pages(archive, ["espn.skaters.pg0"]))
+    assert(len(df.index) == 11)
+
+
+def run_nhl(adapter):
+    sc = nhl.Scraper()
+    sc.set_endpoint_adapter(adapter)
+    return (sc.teams().to_dict(),
+            sc.games_count(datetime.date(2018, 1, 14),
+                           datetime.date(2018, 1, 16)),
+            sc.box_scores_batch(game_ids=[2017020681]).to_dict())
+
+
+@pytest.fixture
+def live():
+    mock = MockNhlEndpointAdapter()
+    for day in (14, 15, 16):
+        mock.add_date(datetime.datetime(2018, 1, day))
+    return mock
@@ -0,0 +1,90 @@
+#!/usb/bin/python
+
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper import cbssports, espn, rotowire
+from nhl_scraper.resolver import PlayerResolver, normalize_name, \
+    normalize_team
+from tests.conftest import sample_file
+
+
+def test_normalize_name():
+    assert(normalize_name("Pierre-Édouard Bellemare") ==
+           "pierre edouard bellemare")
+    assert(normalize_name("T.J. Brodie") == "tj brodie")
+    assert(normalize_name("Ryan O'Reilly") == "ryan oreilly")
+    assert(normalize_name("Jacob de la Rose Jr.") == "jacob de la rose")
+
+
+def test_normalize_team():
+    assert(normalize_team("Tor") == "TOR")
+    assert(normalize_team("TB") == "TBL")
+    assert(normalize_team("Wsh") == "WSH")
+    assert(normalize_team("WAS") == "WSH")
+
+
+def test_resolve(resolver, nhl_scraper):
+    players = nhl_scraper.players()
+    spezza = players[players["name"] == "Jason Spezza"].iloc(0)[0]
+    assert(resolver.resolve("Jason Spezza", "Tor") == spezza["playerId"])
+    assert(resolver.resolve("JASON SPEZZA") == spezza["playerId"])
+    # Fuzzy fallback
+    assert(resolver.resolve("Jason Spezzza", "TOR") == spezza["playerId"])
+    assert(resolver.resolve("Connor McDavid", "Edm") is None)
+
+
+def test_resolve_espn(resolver):
+    df = espn.Parser(sample_file("sample.espn.skaters.html")).parse(0)
+    ids = resolver.resolve_frame(df, source="espn")
+    assert(ids.index.equals(df.index))
+    matched = df[ids.notna()]
+    assert(set(matched.Name) == {"Auston Matthews", "Mitch Marner"})
+
+
+def test_resolve_cbssports(resolver):
+    df = cbssports.Parser(sample_file("sample.cbssports.goalies.html")) \
+        .parse(0)
+    ids = resolver.resolve_frame(df, source="cbssports")
+    assert(ids[df.name == "Frederik Andersen"].notna().all())
+    assert(ids.isna().sum() == 4)
+
+
+def test_resolve_rotowire(resolver):
+    with open(sample_file("sample.rotowire.starting-goalies.html")) as f:
+        df = rotowire.Parser(f.read()).parse(datetime.date(2018, 1, 14))
+    ids = resolver.resolve_frame(df, source="rotowire")
+    assert(ids.loc["Frederik Andersen"].nunique() == 1)
+    assert(ids.loc["Michael Hutchinson"] > 0)
+
+
+def test_cache_file(nhl_scraper, tmp_path):
+    fn = str(tmp_path / "resolver.json")
+    r = PlayerResolver.from_scraper(nhl_scraper, cache_file=fn)
+    assert(os.path.exists(fn))
+    loaded = PlayerResolver.from_scraper(None, cache_file=fn)
+    assert(loaded.resolve("Jason Spezza") == r.resolve("Jason Spezza"))
+    assert(loaded.resolve("Spezza", "TOR") == r.resolve("Spezza", "TOR"))
+
+
+def test_stale_cache_file_rebuilt(nhl_scraper, tmp_path):
+    fn = str(tmp_path / "resolver.json")
+    with open(fn, "w") as f:
+        json.dump({"saved": 0, "teams": [[10, "TOR"]],
+                   "players": [["Jason Spezza", 10, 1]]}, f)
+    # Too old, so the rosters are pulled again
+    r = PlayerResolver.from_scraper(nhl_scraper, cache_file=fn)
+    assert(r.resolve("Jason Spezza") != 1)
+    with open(fn) as f:
+        assert(json.load(f)["saved"] > 0)
+    # Unreadable files are rebuilt too
+    with open(fn, "w") as f:
+        f.write("{")
+    r = PlayerResolver.from_scraper(nhl_scraper, cache_file=fn)
+    assert(r.resolve("Jason Spezza") is not None)
+
+
+@pytest.fixture
+def resolver(nhl_scraper):
+    return PlayerResolver.from_scraper(nhl_scraper)
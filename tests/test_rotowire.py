@@ -0,0 +1,109 @@
+#!/usb/bin/python
+
+import datetime
+import os
+import pytest
+from nhl_scraper import rotowire
+
+
+def test_parse(goalies_page):
+    df = rotowire.Parser(goalies_page).parse(datetime.date(2018, 1, 14))
+    assert(len(df.index) == 12)
+    rask = df.loc["Tuukka Rask"]
+    assert(rask.iloc[0]["date"] == datetime.date(2018, 1, 14))
+    assert(rask.iloc[0]["opponent_team"] == "TOR")
+    assert(rask.iloc[1]["opponent_team"] == "TB")
+    assert(rask.iloc[1]["starting_status"] == "Likely")
+    assert(rask.iloc[0]["team"] == "BOS")
+
+
+def test_backends_match(goalies_page):
+    today = datetime.date(2018, 1, 14)
+    lxml_df = rotowire.Parser(goalies_page, backend="lxml").parse(today)
+    bs4_df = rotowire.Parser(goalies_page, backend="bs4").parse(today)
+    assert(lxml_df.equals(bs4_df))
+
+
+def test_starting_goalies_ttl(scraper):
+    df = scraper.starting_goalies()
+    # The matrix starts on the day the page was fetched
+    assert(df.loc["Tuukka Rask"].iloc[0]["date"] == FETCH_DATE)
+    scraper.clock.now += 100
+    assert(scraper.starting_goalies() is df)
+    assert(scraper.ea.requests == [(None, None)])
+
+
+def test_starting_goalies_not_modified(scraper):
+    df = scraper.starting_goalies()
+    # A day later the page hasn't changed, so it still starts on the day it
+    # was first fetched
+    scraper.clock.now += 86400
+    scraper.ea.modified = False
+    assert(scraper.starting_goalies() is df)
+    assert(scraper.ea.requests[1] == ('"v1"', "Sun, 14 Jan 2018 12:00:00 GMT"))
+    assert(scraper.fetched_at == scraper.clock.now - 86400)
+
+
+def test_starting_goalies_modified(scraper):
+    df = scraper.starting_goalies()
+    scraper.clock.now += 86400
+    df2 = scraper.starting_goalies()
+    assert(df2 is not df)
+    assert(df2.loc["Tuukka Rask"].iloc[0]["date"] ==
+           FETCH_DATE + datetime.timedelta(days=1))
+
+
+def test_starter(scraper):
+    rask = scraper.starter("BOS", FETCH_DATE)
+    assert(rask["name"] == "Tuukka Rask")
+    assert(rask["opponent_team"] == "TOR")
+    assert(rask["starting_status"] == "Confirmed")
+    # Team codes from the other sources work too
+    assert(scraper.starter("TBL", FETCH_DATE + datetime.timedelta(days=1))
+           ["name"] == "Andrei Vasilevskiy")
+    assert(scraper.starter("TB", FETCH_DATE) is None)
+
+
+def test_starters_on(scraper):
+    df = scraper.starters_on(FETCH_DATE)
+    assert(df.index.tolist() == ["BOS", "TOR"])
+    assert(df.loc["TOR"]["name"] == "Frederik Andersen")
+    assert(len(scraper.starters_on(FETCH_DATE - datetime.timedelta(1))) == 0)
+
+
+FETCH_DATE = datetime.date(2018, 1, 14)
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime.datetime(2018, 1, 14, 12).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+class MockRotowireEndpointAdapter:
+    def __init__(self, html):
+        self.html = html
+        self.modified = True
+        self.requests = []
+
+    def starting_goalies_endpoint(self, etag=None, last_modified=None):
+        self.requests.append((etag, last_modified))
+        if etag is not None and not self.modified:
+            return None, etag, last_modified
+        return self.html, '"v1"', "Sun, 14 Jan 2018 12:00:00 GMT"
+
+
+@pytest.fixture
+def scraper(goalies_page):
+    sc = rotowire.Scraper(ttl=300, clock=Clock())
+    sc.set_endpoint_adapter(MockRotowireEndpointAdapter(goalies_page))
+    return sc
+
+
+@pytest.fixture
+def goalies_page():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(dir_path + "/sample.rotowire.starting-goalies.html", "r") as f:
+        return f.read()
@@ -0,0 +1,103 @@
+#!/usb/bin/python
+
+import copy
+import datetime
+import json
+import os
+import pytest
+from nhl_scraper.schedule import ScheduleIndex
+
+
+def test_games_count(index):
+    dc = index.games_count(datetime.date(2018, 1, 14),
+                           datetime.date(2018, 1, 16))
+    assert(len(dc) == 18)
+    assert(dc[17] == 2)
+    assert(dc[3] == 2)
+    assert(11 not in dc)
+
+
+def test_games_count_windows(index):
+    windows = [(datetime.date(2018, 1, 14), datetime.date(2018, 1, 14)),
+               (datetime.date(2018, 1, 15), datetime.date(2018, 1, 16)),
+               (datetime.date(2018, 1, 14), datetime.date(2018, 1, 16))]
+    counts = index.games_count_windows(windows)
+    det = index.team_pos[17]
+    assert(counts[det].tolist() == [1, 1, 2])
+    assert((counts[:, 2] == counts[:, 0] + counts[:, 1]).all())
+
+
+def test_opponent(index):
+    assert(index.opponent(17, datetime.date(2018, 1, 14)) == 16)
+    assert(index.opponent(16, datetime.date(2018, 1, 14)) == 17)
+    assert(index.opponent(17, datetime.date(2018, 1, 15)) is None)
+
+
+def test_games_on(index):
+    assert(len(index.games_on(datetime.date(2018, 1, 14))) == 4)
+    assert((2017020681, 17, 16) in index.games_on(datetime.date(2018, 1, 14)))
+    assert(index.games_on(datetime.date(2018, 1, 15)) == [])
+
+
+@pytest.mark.parametrize("date", [datetime.date(2018, 1, 13),
+                                  datetime.date(2018, 1, 17)])
+def test_dates_outside_index(index, date):
+    with pytest.raises(ValueError):
+        index.games_on(date)
+    with pytest.raises(ValueError):
+        index.opponent(17, date)
+
+
+def test_back_to_backs_and_off_nights(index):
+    assert(len(index.back_to_backs(17)) == 0)
+    assert(index.off_nights(max_games=4).tolist() ==
+           [datetime.date(2018, 1, 14)])
+    assert(index.games_per_day().tolist() == [4, 0, 6])
+
+
+def test_games_per_week(index):
+    weeks = index.games_per_week()
+    assert(weeks.loc[17, (2018, 2)] == 1)
+    assert(weeks.loc[17, (2018, 3)] == 1)
+
+
+def test_postponed_game(index, schedule):
+    day = copy.deepcopy(schedule["dates"][0])
+    postponed = day["games"][0]
+    postponed["status"]["detailedState"] = "Postponed"
+    index.update({"dates": [day]})
+    assert(index.opponent(17, datetime.date(2018, 1, 14)) is None)
+    assert(len(index.games_on(datetime.date(2018, 1, 14))) == 3)
+    # Rescheduled past the end of the index
+    later = copy.deepcopy(schedule["dates"][0])
+    later["date"] = "2018-02-01"
+    later["games"] = [later["games"][0]]
+    index.update({"dates": [later]})
+    assert(index.end_date == datetime.date(2018, 2, 1))
+    assert(index.opponent(17, datetime.date(2018, 2, 1)) == 16)
+    assert(index.games_count(datetime.date(2018, 1, 14),
+                             datetime.date(2018, 2, 1))[17] == 2)
+
+
+def test_clear(index):
+    index.clear(datetime.date(2018, 1, 10), datetime.date(2018, 1, 15))
+    assert(index.games_per_day().tolist() == [0, 0, 6])
+    assert(index.games_count(datetime.date(2018, 1, 14),
+                             datetime.date(2018, 1, 16))[17] == 1)
+    assert(2017020681 not in index.game_slots)
+
+
+@pytest.fixture
+def schedule():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    dates = []
+    for day in ["20180114", "20180115", "20180116"]:
+        with open(dir_path + "/sample.nhl.schedule.{}.json".format(day)) as f:
+            dates += json.load(f)["dates"]
+    return {"dates": dates}
+
+
+@pytest.fixture
+def index(schedule):
+    return ScheduleIndex.from_schedule(schedule, datetime.date(2018, 1, 14),
+                                       datetime.date(2018, 1, 16))
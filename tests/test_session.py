@@ -0,0 +1,71 @@
+#!/usb/bin/python
+
+import pytest
+import requests
+from nhl_scraper.session import RateLimiter, Session
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_retry_then_success(session):
+    session.session.responses = [FakeResponse(503), FakeResponse(429),
+                                 FakeResponse(200)]
+    assert(session.get("https://example.com/x").status_code == 200)
+    assert(len(session.delays) == 2)
+    assert(session.session.kwargs[0]["timeout"] == session.timeout)
+
+
+def test_retry_after_header(session):
+    session.session.responses = [FakeResponse(429, {"Retry-After": "7"}),
+                                 FakeResponse(200)]
+    session.get("https://example.com/x")
+    assert(session.delays == [7])
+
+
+def test_retries_exhausted(session):
+    session.session.responses = [FakeResponse(500)] * 4
+    assert(session.get("https://example.com/x").status_code == 500)
+    assert(len(session.delays) == 3)
+
+
+def test_connection_error(session):
+    session.session.responses = [requests.ConnectionError()] * 4
+    with pytest.raises(requests.ConnectionError):
+        session.get("https://example.com/x")
+
+
+def test_rate_limiter():
+    now = [0.0]
+    slept = []
+    rl = RateLimiter(2, clock=lambda: now[0], sleep=slept.append)
+    rl.wait("a.com")
+    rl.wait("a.com")
+    rl.wait("b.com")
+    rl.wait("a.com")
+    assert(slept == [0.5, 1.0])
+
+
+class FakeRequestsSession:
+    def __init__(self):
+        self.responses = []
+        self.kwargs = []
+
+    def get(self, url, **kwargs):
+        self.kwargs.append(kwargs)
+        resp = self.responses.pop(0)
+        if isinstance(resp, Exception):
+            raise resp
+        return resp
+
+
+@pytest.fixture
+def session():
+    s = Session(retries=3)
+    s.session = FakeRequestsSession()
+    s.delays = []
+    s.sleep = s.delays.append
+    return s
@@ -0,0 +1,120 @@
+#!/usb/bin/python
+
+import datetime
+import os
+import pandas as pd
+import pytest
+from nhl_scraper import espn, storage
+
+
+def test_season_of():
+    assert(storage.season_of(datetime.date(2018, 1, 14)) == 20172018)
+    assert(storage.season_of(datetime.date(2018, 10, 3)) == 20182019)
+
+
+@pytest.mark.parametrize("format", ["parquet", "feather"])
+def test_round_trip(tmp_path, format, frames):
+    store = storage.Store(str(tmp_path), format=format)
+    skaters, _ = frames
+    assert(store.append("skaters", skaters, partition_by=["season"]) == 7)
+    df = store.read("skaters")
+    assert(df.dtypes.to_dict() == skaters.dtypes.to_dict())
+    assert(df.reset_index(drop=True).equals(skaters.reset_index(drop=True)))
+    files = [f for _, _, fs in os.walk(store.path("skaters")) for f in fs
+             if f.endswith("." + format)]
+    assert(len(files) == 1)
+    assert(os.path.isdir(os.path.join(store.path("skaters"),
+                                      "season=20172018")))
+
+
+def test_append_skips_stored_keys(store, frames):
+    skaters, _ = frames
+    store.append("skaters", skaters, partition_by=["season"],
+                 key=["gamePk", "id"])
+    assert(store.append("skaters", skaters, key=["gamePk", "id"]) == 0)
+    later = skaters.assign(gamePk=2018020001, season=20182019)
+    assert(store.append("skaters", later, key=["gamePk", "id"]) == 7)
+    assert(store.keys("skaters", "gamePk") == {2017020681, 2018020001})
+    assert(len(store.read("skaters").index) == 14)
+
+
+def test_appends_keep_schema(store, frames):
+    skaters, _ = frames
+    store.append("skaters", skaters.iloc[:1], partition_by=["season"])
+    # More categories than the first write, and a column order change
+    store.append("skaters", skaters.iloc[1:][skaters.columns[::-1]])
+    df = store.read("skaters")
+    assert(len(df.index) == 7)
+    assert(str(df.name.dtype) == "category")
+
+
+def test_read_pruned(store, frames):
+    skaters, _ = frames
+    store.append("skaters", skaters, partition_by=["season"])
+    store.append("skaters", skaters.assign(gamePk=2018020001,
+                                           season=20182019))
+    df = store.read("skaters", columns=["id", "goals"],
+                    filters=[("season", "=", 20182019), ("goals", ">", 0)])
+    assert(df.columns.tolist() == ["id", "goals"])
+    assert(len(df.index) == 3)
+
+
+def test_sync_box_scores(store, nhl_scraper, monkeypatch):
+    sample = nhl_scraper.ea.boxscore_endpoint(2017020681)
+    fetched = []
+    monkeypatch.setattr(nhl_scraper.ea, "boxscore_endpoint",
+                        lambda game_id: fetched.append(game_id) or sample)
+    added = storage.sync_box_scores(nhl_scraper, store,
+                                    datetime.date(2018, 1, 14),
+                                    datetime.date(2018, 1, 14))
+    assert(len(added) == 4)
+    added = storage.sync_box_scores(nhl_scraper, store,
+                                    datetime.date(2018, 1, 14),
+                                    datetime.date(2018, 1, 16))
+    # Only the games of the 16th are fetched
+    assert(len(added) == 6)
+    assert(len(fetched) == 10)
+    assert(storage.sync_box_scores(nhl_scraper, store,
+                                   datetime.date(2018, 1, 14),
+                                   datetime.date(2018, 1, 16)) == [])
+    goalies = store.read("goalies", columns=["gamePk", "so"])
+    assert(goalies.gamePk.nunique() == 10)
+
+
+def test_append_box_scores(store, frames):
+    skaters, goalies = [df.drop(columns=["season"]) for df in frames]
+    columns = skaters.columns.tolist()
+    assert(storage.append_box_scores(store, skaters, goalies) == 9)
+    # The caller's tables aren't given a season column
+    assert(skaters.columns.tolist() == columns)
+    assert(store.keys("skaters", "season") == {20172018})
+    undated = goalies.assign(gamePk=2017020682, date=pd.NaT)
+    assert(storage.append_box_scores(store, skaters.iloc[:0], undated) == 2)
+    assert(len(store.read("goalies").index) == 4)
+
+
+def test_save_projections(store):
+    df = espn.Parser(os.path.dirname(os.path.realpath(__file__)) +
+                     "/sample.espn.skaters.html").parse(0)
+    day = datetime.date(2018, 1, 14)
+    assert(storage.save_projections(store, "espn.skaters", df, day) == 11)
+    assert(storage.save_projections(store, "espn.skaters", df, day) == 0)
+    storage.save_projections(store, "espn.skaters", df,
+                             day + datetime.timedelta(days=1))
+    stored = store.read("espn.skaters", filters=[("date", "=", "2018-01-14")])
+    assert(stored.Name.tolist() == df.Name.tolist())
+
+
+@pytest.fixture
+def store(tmp_path):
+    return storage.Store(str(tmp_path))
+
+
+@pytest.fixture
+def frames(nhl_scraper):
+    skaters, goalies = nhl_scraper.box_scores(2017020681, format='tables')
+    for df in (skaters, goalies):
+        df["date"] = pd.to_datetime([datetime.date(2018, 1, 14)] *
+                                    len(df.index))
+        df["season"] = 20172018
+    return skaters, goalies